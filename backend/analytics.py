@@ -0,0 +1,329 @@
+""" Incremental occupancy analytics over the desk event log.
+
+`desk_events` is an append-only copy of the desk change log, filled by a
+trigger on `desk_changes` (migration 8). Every mutation path that calls
+`log_desk_changes` is therefore recorded with no extra call, and the history
+outlives change-log compaction.
+
+The aggregator folds new events into the `occupancy_hourly` and
+`occupancy_daily` rollups, keyed by UTC bucket, floor and tech area: bookings,
+releases, occupied desk-seconds, desk-seconds (utilisation is their ratio) and
+the most desks occupied at once. An area's desk and occupied counts only
+change at events, so a run integrates them from where the last run stopped up
+to now and touches only the rollup rows in that span. `analytics_desk_state`
+holds each desk's area and status as of the watermark, so old events are never
+read again. Dashboards read the rollups only.
+
+Progress is two watermarks in `sync_state`: the last event `seq` folded in and
+the time (Unix seconds) occupancy was integrated through. A run claims its
+span with a conditional UPDATE of both, so every worker may run the
+aggregator and each span is written exactly once.
+
+Usage (from backend/):
+    python analytics.py              # fold in every pending event once
+    python analytics.py --backfill   # rebuild all rollups from the whole event log
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import case, delete, func, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+from config import Config
+from database import SessionLocal
+from models import Desk, DeskEvent, SyncState, AnalyticsDeskState, OccupancyHourly, OccupancyDaily
+
+logger = logging.getLogger(__name__)
+
+SEQ_KEY = "analytics_event_seq"
+THROUGH_KEY = "analytics_through"
+EPOCH = datetime(1970, 1, 1)
+HOUR = timedelta(hours=1)
+EVENT_KEYS = ("desk_id", "floor", "tech_area", "status", "deleted")
+
+# -------------------- 🟢 EVENT CAPTURE --------------------
+
+_CAPTURE = "INSERT INTO desk_events(desk_id, floor, tech_area, status, deleted, snapshot, occurred_at)"
+
+SQLITE_DDL = (
+    f"""CREATE TRIGGER IF NOT EXISTS desk_events_capture AFTER INSERT ON desk_changes BEGIN
+        {_CAPTURE} VALUES (new.desk_id, new.floor, new.tech_area, new.status, new.deleted, 0, new.changed_at);
+    END""",
+)
+
+POSTGRES_DDL = (
+    f"""CREATE OR REPLACE FUNCTION desk_events_capture() RETURNS trigger AS $$
+    BEGIN
+        {_CAPTURE} VALUES (NEW.desk_id, NEW.floor, NEW.tech_area, NEW.status, NEW.deleted, false, NEW.changed_at);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS desk_events_capture ON desk_changes",
+    "CREATE TRIGGER desk_events_capture AFTER INSERT ON desk_changes FOR EACH ROW EXECUTE FUNCTION desk_events_capture()",
+)
+
+def create_event_capture(conn):
+    """ Create the desk_changes -> desk_events trigger for the connection's dialect (others record no events) """
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(conn.dialect.name, ())
+    for statement in ddl:
+        conn.execute(text(statement))
+
+def start_analytics(conn, now: datetime = None):
+    """ Record every desk's current state as a snapshot event and set both watermarks, once """
+    if conn.execute(select(SyncState.key).where(SyncState.key == SEQ_KEY)).first():
+        return
+    now = now or datetime.utcnow()
+    columns = [Desk.desk_id, Desk.floor, Desk.tech_area, Desk.status, literal(False), literal(True), literal(now)]
+    conn.execute(insert(DeskEvent).from_select([*EVENT_KEYS, "snapshot", "occurred_at"], select(*columns)))
+    conn.execute(insert(SyncState), [{"key": SEQ_KEY, "value": 0}, {"key": THROUGH_KEY, "value": _seconds(now)}])
+
+# -------------------- 🔵 FOLDING EVENTS --------------------
+
+def _seconds(at: datetime):
+    return int((at - EPOCH).total_seconds())
+
+def _hour(at: datetime):
+    return at.replace(minute=0, second=0, microsecond=0)
+
+class Rollup:
+    """ Hourly deltas: (bucket, floor, tech_area) -> [bookings, releases, occupied_seconds, desk_seconds, peak_occupied] """
+
+    def __init__(self):
+        self.rows = {}
+
+    def row(self, at: datetime, area):
+        key = (_hour(at), *area)
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = [0, 0, 0.0, 0.0, 0]
+        return row
+
+    def accrue(self, area, desks: int, occupied: int, start: datetime, end: datetime):
+        """ `desks` desks in `area`, `occupied` of them occupied, for all of [start, end) """
+        if not desks:
+            return
+        while start < end:
+            boundary = min(end, _hour(start) + HOUR)
+            row = self.row(start, area)
+            seconds = (boundary - start).total_seconds()
+            row[2] += occupied * seconds
+            row[3] += desks * seconds
+            row[4] = max(row[4], occupied)
+            start = boundary
+
+    def daily(self):
+        """ The same deltas summed per UTC day """
+        days = {}
+        for (bucket, floor, tech_area), (bookings, releases, occupied, desks, peak) in self.rows.items():
+            day = days.setdefault((bucket.replace(hour=0), floor, tech_area), [0, 0, 0.0, 0.0, 0])
+            day[0] += bookings
+            day[1] += releases
+            day[2] += occupied
+            day[3] += desks
+            day[4] = max(day[4], peak)
+        return days
+
+def fold(events, state: dict, counts: dict, start: datetime, end: datetime):
+    """ Rollup deltas for [start, end) from `events` in seq order.
+
+    `counts` maps each area (floor, tech_area) to its (desks, occupied) at
+    `start`; `state` maps desk_id to its (floor, tech_area, occupied) before
+    the first event and is updated in place (None once a desk is deleted).
+    Event times are clamped into [start, end].
+    """
+    rollup = Rollup()
+    areas = {area: [start, desks, occupied] for area, (desks, occupied) in counts.items()}
+
+    def shift(area, at, desks, occupied):
+        cursor = areas.setdefault(area, [start, 0, 0])
+        rollup.accrue(area, cursor[1], cursor[2], cursor[0], at)
+        cursor[0], cursor[1], cursor[2] = at, cursor[1] + desks, cursor[2] + occupied
+        row = rollup.row(at, area)
+        row[4] = max(row[4], cursor[2])
+
+    for desk_id, floor, tech_area, status, deleted, snapshot, occurred_at in events:
+        at = min(max(occurred_at, start), end)
+        before = state.get(desk_id)
+        after = None if deleted else (floor, tech_area, status == "occupied")
+        if before == after:
+            continue
+        if before:
+            shift(before[:2], at, -1, -before[2])
+        if after:
+            shift(after[:2], at, 1, after[2])
+        was_occupied, is_occupied = bool(before and before[2]), bool(after and after[2])
+        if not snapshot and is_occupied and not was_occupied:
+            rollup.row(at, after[:2])[0] += 1
+        elif not snapshot and was_occupied and not is_occupied:
+            rollup.row(at, before[:2])[1] += 1
+        state[desk_id] = after
+
+    for area, (at, desks, occupied) in areas.items():
+        rollup.accrue(area, desks, occupied, at, end)
+    return rollup
+
+# -------------------- 🟣 APPLYING ROLLUPS --------------------
+
+def _merge(db: Session, model, deltas: dict):
+    """ Add `deltas` into `model`'s rows with one SELECT and at most one bulk INSERT and one bulk UPDATE """
+    if not deltas:
+        return
+    buckets = [bucket for bucket, _, _ in deltas]
+    existing = {
+        (row.bucket, row.floor, row.tech_area): row
+        for row in db.execute(
+            select(model.bucket, model.floor, model.tech_area, model.bookings, model.releases,
+                   model.occupied_seconds, model.desk_seconds, model.peak_occupied)
+            .where(model.bucket >= min(buckets), model.bucket <= max(buckets))
+        )
+    }
+    inserts, updates = [], []
+    for (bucket, floor, tech_area), (bookings, releases, occupied, desks, peak) in deltas.items():
+        row = {"bucket": bucket, "floor": floor, "tech_area": tech_area, "bookings": bookings, "releases": releases,
+               "occupied_seconds": occupied, "desk_seconds": desks, "peak_occupied": peak}
+        old = existing.get((bucket, floor, tech_area))
+        if old is None:
+            inserts.append(row)
+            continue
+        row.update(bookings=old.bookings + bookings, releases=old.releases + releases,
+                   occupied_seconds=old.occupied_seconds + occupied, desk_seconds=old.desk_seconds + desks,
+                   peak_occupied=max(old.peak_occupied, peak))
+        updates.append(row)
+    if inserts:
+        db.execute(insert(model), inserts)
+    if updates:
+        db.execute(update(model), updates)  # Bulk UPDATE by primary key
+
+def _save_state(db: Session, state: dict, known: set):
+    gone = [desk_id for desk_id, after in state.items() if after is None and desk_id in known]
+    rows = [{"desk_id": desk_id, "floor": after[0], "tech_area": after[1], "occupied": after[2]}
+            for desk_id, after in state.items() if after is not None]
+    if gone:
+        db.execute(delete(AnalyticsDeskState).where(AnalyticsDeskState.desk_id.in_(gone)))
+    if inserts := [row for row in rows if row["desk_id"] not in known]:
+        db.execute(insert(AnalyticsDeskState), inserts)
+    if updates := [row for row in rows if row["desk_id"] in known]:
+        db.execute(update(AnalyticsDeskState), updates)
+
+def _claim(db: Session, key: str, old: int, new: int):
+    statement = update(SyncState).where(SyncState.key == key, SyncState.value == old).values(value=new)
+    return db.execute(statement).rowcount == 1
+
+def aggregate(db: Session, now: datetime = None, batch_size: int = None):
+    """ Fold the next batch of settled events and the time since the last run into the rollups.
+
+    Returns the number of events folded, or None when analytics has not
+    been started or another run claimed the span first.
+    """
+    batch_size = batch_size or Config.ANALYTICS_BATCH_SIZE
+    watermarks = dict(db.execute(select(SyncState.key, SyncState.value).where(SyncState.key.in_((SEQ_KEY, THROUGH_KEY)))).all())
+    if len(watermarks) != 2:
+        return None
+    seq, through = watermarks[SEQ_KEY], watermarks[THROUGH_KEY]
+    start = EPOCH + timedelta(seconds=through)
+    settled = (now or datetime.utcnow()) - timedelta(seconds=Config.ANALYTICS_SETTLE_SECONDS)
+
+    fetched = db.execute(
+        select(DeskEvent.seq, *[getattr(DeskEvent, key) for key in EVENT_KEYS], DeskEvent.snapshot, DeskEvent.occurred_at)
+        .where(DeskEvent.seq > seq)
+        .order_by(DeskEvent.seq)
+        .limit(batch_size)
+    ).all()
+    events = []
+    for event in fetched:
+        if event.occurred_at > settled:
+            break  # Later events wait for the next run, keeping the folded seqs contiguous
+        events.append(event)
+    end = events[-1].occurred_at if len(events) == batch_size else settled
+    end = EPOCH + timedelta(seconds=max(through, _seconds(end)))
+    if not events and end == start:
+        return 0
+
+    desk_ids = list({event.desk_id for event in events})
+    state = {
+        row.desk_id: (row.floor, row.tech_area, row.occupied)
+        for row in db.execute(select(AnalyticsDeskState).where(AnalyticsDeskState.desk_id.in_(desk_ids))).scalars()
+    } if desk_ids else {}
+    known = set(state)
+    counts = {
+        (floor, tech_area): (desks, occupied)
+        for floor, tech_area, desks, occupied in db.execute(
+            select(AnalyticsDeskState.floor, AnalyticsDeskState.tech_area, func.count(),
+                   func.sum(case((AnalyticsDeskState.occupied, 1), else_=0)))
+            .group_by(AnalyticsDeskState.floor, AnalyticsDeskState.tech_area)
+        )
+    }
+    rollup = fold([event[1:] for event in events], state, counts, start, end)
+
+    # Claim the span; losing either watermark means another run folded it already
+    if not (_claim(db, SEQ_KEY, seq, events[-1].seq if events else seq) and _claim(db, THROUGH_KEY, through, _seconds(end))):
+        db.rollback()
+        return None
+    _merge(db, OccupancyHourly, rollup.rows)
+    _merge(db, OccupancyDaily, rollup.daily())
+    _save_state(db, state, known)
+    db.commit()
+    return len(events)
+
+def aggregate_pending(db: Session, now: datetime = None, batch_size: int = None):
+    """ Run `aggregate` until the settled events are all folded in; returns the number folded """
+    batch_size = batch_size or Config.ANALYTICS_BATCH_SIZE
+    total = 0
+    while True:
+        folded = aggregate(db, now, batch_size)
+        total += folded or 0
+        if folded is None or folded < batch_size:
+            return total
+
+def backfill(db: Session, batch_size: int = None, progress=None):
+    """ Rebuild every rollup by replaying the event log from its first event; returns the number of events """
+    first = db.query(func.min(DeskEvent.occurred_at)).scalar() or datetime.utcnow()
+    db.execute(delete(OccupancyHourly))
+    db.execute(delete(OccupancyDaily))
+    db.execute(delete(AnalyticsDeskState))
+    db.execute(update(SyncState).where(SyncState.key == SEQ_KEY).values(value=0))
+    db.execute(update(SyncState).where(SyncState.key == THROUGH_KEY).values(value=_seconds(first)))
+    db.commit()
+
+    batch_size = batch_size or Config.ANALYTICS_BATCH_SIZE
+    total = 0
+    while True:
+        folded = aggregate(db, batch_size=batch_size)
+        total += folded or 0
+        if progress:
+            progress(total)
+        if folded is None or folded < batch_size:
+            return total
+
+# -------------------- 🔴 BACKGROUND AGGREGATOR --------------------
+
+def _aggregate_now():
+    db = SessionLocal()
+    try:
+        return aggregate_pending(db)
+    finally:
+        db.close()
+
+async def run_aggregator(interval: float):
+    """ Fold pending events into the rollups every `interval` seconds until cancelled """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_aggregate_now)
+        except Exception:
+            logger.exception("Occupancy aggregation failed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold desk events into the occupancy rollups")
+    parser.add_argument("--backfill", action="store_true", help="Drop the rollups and replay the whole event log")
+    parser.add_argument("--batch-size", type=int, help="Events folded per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.backfill:
+            total = backfill(db, args.batch_size, progress=lambda n: print(f"  {n} events folded", end="\r"))
+            print(f"✅ Rebuilt the occupancy rollups from {total} events")
+        else:
+            print(f"✅ Folded {aggregate_pending(db, batch_size=args.batch_size)} events into the occupancy rollups")
+    finally:
+        db.close()
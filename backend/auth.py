@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db
 from models import User
-from werkzeug.security import check_password_hash
+from schemas import TokenOut
+from config import Config
+from hashing import HashingBusy, password_hasher
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
 import jwt
-import os
 from datetime import datetime, timedelta
 
-SECRET_KEY = os.getenv("SECRET_KEY", "myjwtsecret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Token valid for 1 hour
 
@@ -20,39 +24,153 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, Config.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# -------------------- 🔵 TOKEN VERIFICATION --------------------
+# -------------------- 🟣 PRINCIPAL CACHE --------------------
 
-def verify_token(token: str, db: Session = Depends(get_db)):
-    """ Verify JWT token and return the user """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
+@dataclass(frozen=True)
+class Principal:
+    """ The authenticated caller, as resolved from a token """
+    id: int
+    username: str
+    role: str
+    tech_area: str
+
+class TokenCache:
+    """ Bounded LRU cache of token -> Principal with a per-entry TTL.
+
+    An entry never outlives the token's own `exp` claim. Entries are dropped
+    per user through `invalidate_user` whenever that user is changed, but only
+    in the process that made the change: other workers keep serving the old
+    principal (or a deleted user) until the entry's TTL runs out, so
+    `AUTH_CACHE_TTL` is the bound on cross-worker staleness.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = True
+        self._entries = OrderedDict()  # token -> (expires_at, principal)
+        self._lock = threading.Lock()
 
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
+    def get(self, token: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
 
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+    def put(self, token: str, principal: Principal, token_exp: float = None):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[token] = (expires_at, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
 
-        return user  # ✅ Successfully verified user
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            stale = [token for token, (_, principal) in self._entries.items() if principal.id == user_id]
+            for token in stale:
+                del self._entries[token]
 
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(Config.AUTH_CACHE_SIZE, Config.AUTH_CACHE_TTL)
+token_cache.enabled = Config.AUTH_CACHE_ENABLED
+
+def invalidate_user(user_id: int):
+    """ Forget cached principals for a user whose account has changed (this process only; see TokenCache) """
+    token_cache.invalidate_user(user_id)
+
+# -------------------- 🔵 TOKEN VERIFICATION --------------------
+
+def decode_token(token: str):
+    """ Decode a JWT and return its payload, raising 401 on any failure """
+    try:
+        return jwt.decode(token, Config.SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def _resolve(token: str):
+    """ Return (cached principal, None) or (None, verified payload) for a token """
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal, None
+
+    payload = decode_token(token)
+    user_id = payload.get("user_id")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return None, payload
+
+def _remember(token: str, payload: dict, user: User):
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    principal = Principal(id=user.id, username=user.username, role=user.role, tech_area=user.tech_area)
+    token_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+def verify_token(token: str, db: Session = Depends(get_db)):
+    """ Verify JWT token and return the calling Principal (cached) """
+    principal, payload = _resolve(token)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(User.id == payload["user_id"]).first()
+    return _remember(token, payload, user)  # ✅ Successfully verified user
+
+async def verify_token_async(token: str, db=Depends(get_async_db)):
+    """ Async twin of verify_token for handlers running on the async engine """
+    principal, payload = _resolve(token)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, payload["user_id"])
+    return _remember(token, payload, user)
+
+def verify_admin(principal: Principal = Depends(verify_token)):
+    """ Verify the token belongs to an admin user """
+    if principal.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return principal
+
+async def verify_admin_async(principal: Principal = Depends(verify_token_async)):
+    """ Async twin of verify_admin """
+    return verify_admin(principal)
+
 # -------------------- 🔴 LOGIN ENDPOINT --------------------
 
-@auth_router.post("/login")
+@auth_router.post("/login", response_model=TokenOut)
 def login(username: str, password: str, db: Session = Depends(get_db)):
-    """ Login user and generate access token """
+    """ Login user and generate access token (503 while the hashing pool is saturated) """
     user = db.query(User).filter(User.username == username).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user or not password_hasher.verify(user.password_hash, password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if password_hasher.needs_rehash(user.password_hash):
+        # Upgrade hashes made with an older method or cost while the plain password is at hand
+        try:
+            user.password_hash = password_hasher.hash(password)
+            db.commit()
+        except HashingBusy:
+            pass  # Upgrade on a later login instead of failing this one
+
     access_token = create_access_token({"user_id": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,109 @@
+""" Shared helpers for the benchmark scripts.
+
+Every benchmark runs against a throwaway SQLite file so the checked-in
+database.db is never touched. Call `use_temp_database()` BEFORE importing any
+application module, since `database.py` builds its engine at import time.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_temp_database():
+    """ Point DATABASE_URL at a fresh temporary SQLite file and return its path """
+    fd, path = tempfile.mkstemp(prefix="dmp_bench_", suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return path
+
+
+def seed(db, users=100, desks_per_floor=100, floors=("L1",), tech_areas=("PAID/GCIS", "CORE"), password="password"):
+    """ Insert a synthetic set of users and desks; returns the list of usernames """
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from models import User, Desk
+
+    password_hash = generate_password_hash(password)  # Hash once, reuse for every synthetic user
+    usernames = [f"user{i:06d}" for i in range(users)]
+    db.execute(insert(User), [
+        {"username": name, "password_hash": password_hash, "role": "user", "tech_area": tech_areas[i % len(tech_areas)]}
+        for i, name in enumerate(usernames)
+    ])
+    db.execute(insert(User), [{"username": "admin", "password_hash": password_hash, "role": "admin", "tech_area": tech_areas[0]}])
+    db.execute(insert(Desk), [
+        {"desk_id": f"{floor}.WS.{i:05d}", "floor": floor, "status": "available", "tech_area": tech_areas[i % len(tech_areas)]}
+        for floor in floors for i in range(desks_per_floor)
+    ])
+    db.commit()
+    return usernames
+
+
+def run_load(app, make_request, total=1000, concurrency=20, expected=None):
+    """ Fire `total` requests at `app` in-process with `concurrency` in flight.
+
+    `make_request(client, i)` must return an awaitable httpx response.
+    Responses count as errors when their status is not in `expected`
+    (default: any 5xx). Returns a dict with requests/sec and latency
+    percentiles in milliseconds.
+    """
+    return asyncio.run(run_load_async(app, make_request, total, concurrency, expected))
+
+
+async def run_load_async(app, make_request, total=1000, concurrency=20, expected=None):
+    """ Coroutine form of `run_load`, for callers that must stay on one event loop
+    (the async engine's connection pool is bound to the loop that created it) """
+    import httpx
+
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                response = await make_request(client, i)
+                latencies.append(time.perf_counter() - start)
+                failed = response.status_code not in expected if expected else response.status_code >= 500
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, errors)
+
+
+def summarize(latencies, elapsed, errors=0):
+    """ Reduce raw latencies (seconds) into throughput and percentile figures """
+    ordered = sorted(latencies)
+
+    def pct(p):
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def print_result(label, result):
+    print(
+        f"{label:<40} {result['rps']:>9.1f} req/s   "
+        f"p50 {result['p50_ms']:>7.2f} ms   p95 {result['p95_ms']:>7.2f} ms   p99 {result['p99_ms']:>7.2f} ms"
+        + (f"   errors {result['errors']}" if result.get("errors") else "")
+    )
@@ -0,0 +1,190 @@
+""" Occupancy analytics: backfill, incremental runs and dashboard reads over a year of events.
+
+Writes --days of synthetic history straight into `desk_events` (every desk is
+booked on most weekdays and released in the evening), times the backfill that
+builds the hourly and daily rollups, then times an incremental aggregator run
+after one more hour of bookings and the dashboard queries behind
+/analytics/occupancy and /analytics/summary.
+
+Before any timing, a small fixture with hand-computed rollups is folded in
+by the aggregator (in batches of three events, so spans cross run
+boundaries); the run exits non-zero if any hourly or daily row differs.
+
+Usage (from backend/):
+    python -m benchmarks.bench_analytics --desks 500 --days 365
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import use_temp_database, summarize, print_result
+
+FLOORS = ("L1", "L2", "L3", "L4", "L5")
+TECH_AREAS = ("PAID/GCIS", "CORE", "Payments Engineering", "Payment Services")
+
+
+def history(desks, days, end, rng):
+    """ desk_events rows: a snapshot of every desk, then daily bookings and releases """
+    start = end - timedelta(days=days)
+    rows = [{"desk_id": desk_id, "floor": floor, "tech_area": tech_area, "status": "available", "snapshot": True, "occurred_at": start}
+            for desk_id, floor, tech_area in desks]
+    for day in range(days):
+        midnight = start + timedelta(days=day)
+        if midnight.weekday() >= 5:
+            continue
+        for desk_id, floor, tech_area in desks:
+            if rng.random() < 0.3:
+                continue
+            booked = midnight + timedelta(hours=rng.uniform(7, 11))
+            released = booked + timedelta(hours=rng.uniform(2, 9))
+            for status, at in (("occupied", booked), ("available", released)):
+                rows.append({"desk_id": desk_id, "floor": floor, "tech_area": tech_area, "status": status, "occurred_at": at})
+    return rows
+
+
+# Floor F: area A has desks d1 and d2, area B has d3 (occupied when analytics starts).
+# d1 is booked 08:30-09:45 and then removed at 10:30; d2 is booked from 09:15 on;
+# d3 is released at 10:00. The aggregator runs up to 11:00.
+FIXTURE_START = datetime(2024, 1, 1, 8)
+FIXTURE_EVENTS = (
+    # desk_id, tech_area, status, minutes after 08:00, snapshot, deleted
+    ("d1", "A", "available", 0, True, False),
+    ("d2", "A", "available", 0, True, False),
+    ("d3", "B", "occupied", 0, True, False),
+    ("d1", "A", "occupied", 30, False, False),
+    ("d2", "A", "occupied", 75, False, False),
+    ("d1", "A", "available", 105, False, False),
+    ("d3", "B", "available", 120, False, False),
+    ("d1", "A", "available", 150, False, True),
+)
+# (hour, tech_area) -> bookings, releases, occupied_seconds, desk_seconds, peak_occupied
+FIXTURE_HOURLY = {
+    (8, "A"): (1, 0, 1800, 7200, 1),   # 2 desks; d1 from 08:30
+    (9, "A"): (1, 1, 5400, 7200, 2),   # d1 until 09:45, d2 from 09:15
+    (10, "A"): (0, 0, 3600, 5400, 1),  # d2 all hour; d1 gone after 10:30
+    (8, "B"): (0, 0, 3600, 3600, 1),   # The snapshot is not a booking
+    (9, "B"): (0, 0, 3600, 3600, 1),
+    (10, "B"): (0, 1, 0, 3600, 0),
+}
+FIXTURE_DAILY = {
+    "A": (2, 1, 10800, 19800, 2),
+    "B": (0, 1, 7200, 10800, 1),
+}
+
+
+def check_fixture(db):
+    """ Fold the fixture into empty rollups and return the rows that differ from the hand-computed ones """
+    from sqlalchemy import delete, insert, select, update
+    from models import AnalyticsDeskState, DeskEvent, OccupancyDaily, OccupancyHourly, SyncState
+    from analytics import SEQ_KEY, THROUGH_KEY, aggregate_pending
+
+    db.execute(insert(DeskEvent), [
+        {"desk_id": desk_id, "floor": "F", "tech_area": tech_area, "status": status, "snapshot": snapshot,
+         "deleted": deleted, "occurred_at": FIXTURE_START + timedelta(minutes=minutes)}
+        for desk_id, tech_area, status, minutes, snapshot, deleted in FIXTURE_EVENTS
+    ])
+    db.execute(update(SyncState).where(SyncState.key == SEQ_KEY).values(value=0))
+    db.execute(update(SyncState).where(SyncState.key == THROUGH_KEY).values(value=int((FIXTURE_START - datetime(1970, 1, 1)).total_seconds())))
+    db.commit()
+    aggregate_pending(db, now=FIXTURE_START + timedelta(hours=3), batch_size=3)
+
+    expected = {(FIXTURE_START.replace(hour=hour), "F", area): row for (hour, area), row in FIXTURE_HOURLY.items()}
+    expected_daily = {(FIXTURE_START.replace(hour=0), "F", area): row for area, row in FIXTURE_DAILY.items()}
+    problems = []
+    for model, want in ((OccupancyHourly, expected), (OccupancyDaily, expected_daily)):
+        got = {
+            (row.bucket, row.floor, row.tech_area): (row.bookings, row.releases, row.occupied_seconds, row.desk_seconds, row.peak_occupied)
+            for row in db.execute(select(model)).scalars()
+        }
+        for key in sorted(set(got) | set(want)):
+            if got.get(key) != want.get(key):
+                problems.append(f"{model.__tablename__} {key[0]:%Y-%m-%d %H:%M} {key[2]}: got {got.get(key)}, expected {want.get(key)}")
+
+    for model in (DeskEvent, OccupancyHourly, OccupancyDaily, AnalyticsDeskState):
+        db.execute(delete(model))
+    db.commit()
+    return problems
+
+
+def timed(fn, repeat):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--desks", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")  # Backfill batches are slow by design; keep the log quiet
+    os.environ["ANALYTICS_SETTLE_SECONDS"] = "0"
+    try:
+        from sqlalchemy import delete, func, insert, select, update
+        from database import SessionLocal
+        from migrations import upgrade
+        from models import DeskEvent, OccupancyHourly, SyncState
+        from analytics import THROUGH_KEY, aggregate_pending, backfill
+        from routes.analytics import occupancy, summary
+
+        upgrade()
+        rng = random.Random(7)
+        now = datetime.utcnow().replace(microsecond=0)
+        desks = [(f"{FLOORS[i % len(FLOORS)]}.WS.{i:05d}", FLOORS[i % len(FLOORS)], TECH_AREAS[i // len(FLOORS) % len(TECH_AREAS)])
+                 for i in range(args.desks)]
+        db = SessionLocal()
+        db.execute(delete(DeskEvent))  # Drop the migration's snapshot of the (empty) desks table
+        problems = check_fixture(db)
+        print(f"fixture rollups match: {not problems}")
+        if problems:
+            print("\n".join(problems))
+            db.close()
+            sys.exit(1)
+        rows = history(desks, args.days, now - timedelta(hours=1), rng)
+        for start in range(0, len(rows), 50000):
+            db.execute(insert(DeskEvent), rows[start:start + 50000])
+        db.commit()
+
+        began = time.perf_counter()
+        folded = backfill(db)
+        elapsed = time.perf_counter() - began
+        hourly = db.scalar(select(func.count()).select_from(OccupancyHourly))
+        print(f"backfill: {folded} events over {args.days} days -> {hourly} hourly rows in {elapsed:.1f} s ({folded / elapsed:,.0f} events/s)")
+
+        # One more hour of activity, folded in by a regular run
+        db.execute(update(SyncState).where(SyncState.key == THROUGH_KEY).values(value=int((now - datetime(1970, 1, 1)).total_seconds())))
+        db.execute(insert(DeskEvent), [
+            {"desk_id": desk_id, "floor": floor, "tech_area": tech_area, "status": "occupied", "occurred_at": now + timedelta(minutes=rng.uniform(0, 60))}
+            for desk_id, floor, tech_area in rng.sample(desks, min(len(desks), 100))
+        ])
+        db.commit()
+        began = time.perf_counter()
+        folded = aggregate_pending(db, now=now + timedelta(hours=1))
+        print(f"incremental run: {folded} events in {(time.perf_counter() - began) * 1000:.1f} ms")
+
+        year_ago = now - timedelta(days=args.days)
+        reads = {
+            "hourly series, last 7 days": lambda: occupancy(now - timedelta(days=7), now, "hour", None, None, None, db),
+            "daily series, one floor, year": lambda: occupancy(year_ago, now, "day", FLOORS[0], None, None, db),
+            "summary by floor, year": lambda: summary(year_ago, now, "floor", None, db),
+            "summary by tech area, year": lambda: summary(year_ago, now, "tech_area", None, db),
+        }
+        for name, read in reads.items():
+            print_result(name, timed(read, args.repeat))
+        db.close()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
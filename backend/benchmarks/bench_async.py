@@ -0,0 +1,76 @@
+""" Load-test the sync and async route stacks side by side.
+
+Each mode runs in a fresh interpreter (ASYNC_DB is read at import time)
+against its own temporary SQLite database, then the results are printed
+together so the concurrency difference is visible.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async --requests 3000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks._common import BACKEND_DIR, use_temp_database, seed, run_load_async, print_result
+
+
+def child(args):
+    db_path = use_temp_database()
+    try:
+        import main as app_module
+        from migrations import upgrade
+        from auth import create_access_token
+        from database import SessionLocal
+        from models import User
+
+        upgrade()  # main migrates in its lifespan, which the in-process load runner never starts
+        db = SessionLocal()
+        seed(db, users=200, desks_per_floor=args.desks, floors=("L1", "L2"), tech_areas=("PAID/GCIS",))
+        user = db.query(User).filter(User.username == "user000000").first()
+        token = create_access_token({"user_id": user.id})
+        db.close()
+
+        scenarios = {
+            "GET /desk/desks/{floor}": lambda client, i: client.get(f"/desk/desks/L{i % 2 + 1}"),
+            "GET /users/profile": lambda client, i: client.get("/users/profile", params={"token": token}),
+            "POST /desk/desk/update": lambda client, i: client.post(
+                f"/desk/desk/update/L1/L1.WS.{i % args.desks:05d}", params={"token": token},
+                json={"status": "occupied" if i % 2 == 0 else "available"}),
+            "GET /search/search/{name}": lambda client, i: client.get("/search/search/user0000"),
+        }
+
+        async def run_all():
+            return {name: await run_load_async(app_module.app, fn, args.requests, args.concurrency) for name, fn in scenarios.items()}
+
+        print(json.dumps(asyncio.run(run_all())))
+    finally:
+        os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--desks", type=int, default=300, help="Desks per floor")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    for mode in ("false", "true"):
+        env = dict(os.environ, ASYNC_DB=mode)
+        command = [sys.executable, "-m", "benchmarks.bench_async", "--child",
+                   "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--desks", str(args.desks)]
+        output = subprocess.run(command, env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        label = "async" if mode == "true" else "sync "
+        for name, result in results.items():
+            print_result(f"{label} {name}", result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+""" Compare request throughput with the decoded-token cache on and off.
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth --requests 2000 --concurrency 20
+"""
+import argparse
+import os
+
+from benchmarks._common import use_temp_database, seed, run_load, print_result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    try:
+        import main as app_module
+        from migrations import upgrade
+        from auth import create_access_token, token_cache
+        from database import SessionLocal
+        from models import User
+
+        upgrade()  # main migrates in its lifespan, which the in-process load runner never starts
+        db = SessionLocal()
+        seed(db, users=50, desks_per_floor=200, floors=("L1",), tech_areas=("PAID/GCIS",))
+        user = db.query(User).filter(User.username == "user000000").first()
+        token = create_access_token({"user_id": user.id})
+        db.close()
+
+        def profile(client, i):
+            return client.get("/users/profile", params={"token": token})
+
+        def update(client, i):
+            status = "occupied" if i % 2 == 0 else "available"
+            return client.post(f"/desk/desk/update/L1/L1.WS.{i % 200:05d}", params={"token": token}, json={"status": status})
+
+        for enabled in (False, True):
+            token_cache.enabled = enabled
+            token_cache.clear()
+            label = "cache on " if enabled else "cache off"
+            print_result(f"{label} GET /users/profile", run_load(app_module.app, profile, args.requests, args.concurrency))
+            print_result(f"{label} POST /desk/desk/update", run_load(app_module.app, update, args.requests, args.concurrency))
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+""" Booking contention benchmark: many users race for the same desks on one floor.
+
+Every request tries to book a desk chosen from a small pool, so most requests
+collide. The run fails (exit code 1) if any desk ends up granted to more than
+one user, or if the final table disagrees with the granted bookings.
+
+Usage (from backend/):
+    python -m benchmarks.bench_booking --users 300 --desks 40 --requests 3000 --concurrency 64
+"""
+import argparse
+import collections
+import os
+import sys
+
+from benchmarks._common import use_temp_database, seed, run_load, print_result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--desks", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    try:
+        import main as app_module
+        from migrations import upgrade
+        from auth import create_access_token
+        from database import SessionLocal
+        from models import User, Desk
+
+        upgrade()  # main migrates in its lifespan, which the in-process load runner never starts
+        db = SessionLocal()
+        seed(db, users=args.users, desks_per_floor=args.desks, floors=("L1",), tech_areas=("PAID/GCIS",))
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.role == "user")]
+        tokens = [create_access_token({"user_id": user_id}) for user_id in user_ids]
+        db.close()
+
+        outcomes = collections.Counter()
+        winners = collections.defaultdict(set)
+
+        async def book(client, i):
+            user = i % len(tokens)
+            desk_id = f"L1.WS.{(i * 7919) % args.desks:05d}"
+            response = await client.post(f"/desk/desk/update/L1/{desk_id}", params={"token": tokens[user]}, json={"status": "occupied"})
+            outcomes[response.status_code] += 1
+            if response.status_code == 200:
+                winners[desk_id].add(user_ids[user])
+            return response
+
+        print_result("POST /desk/desk/update (contended)", run_load(app_module.app, book, args.requests, args.concurrency))
+        print(f"status codes: {dict(sorted(outcomes.items()))}")
+
+        double_booked = {desk: users for desk, users in winners.items() if len(users) > 1}
+        db = SessionLocal()
+        occupied = {desk_id: user_id for desk_id, user_id in db.query(Desk.desk_id, Desk.user_id).filter(Desk.status == "occupied")}
+        db.close()
+        mismatched = [desk for desk, users in winners.items() if occupied.get(desk) not in users]
+
+        print(f"desks granted: {len(winners)}   double-bookings: {len(double_booked)}   table mismatches: {len(mismatched)}")
+        if double_booked or mismatched or len(occupied) != len(winners):
+            sys.exit(1)
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+""" Read latency during a login storm: inline hashing vs the bounded hashing pool.
+
+Measures GET /desk/desks/{floor} and GET /users/profile alone, then again
+while a storm of concurrent logins is in flight. "inline" hashes on the
+request threads with no admission limit (the old behaviour); "pool" uses the
+process pool with its default admission limit, so surplus logins get a fast
+503 instead of occupying the threadpool. Each mode runs in a fresh
+interpreter because the hashing settings are read at import time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hashing --reads 1000 --logins 300 --storm-concurrency 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks._common import BACKEND_DIR, use_temp_database, seed, run_load_async, print_result
+
+MODES = {
+    "inline": {"HASH_PROCESS_POOL": "false", "HASH_QUEUE_SIZE": "100000"},
+    "pool": {"HASH_PROCESS_POOL": "true"},
+}
+
+
+def child(args):
+    db_path = use_temp_database()
+    try:
+        import main as app_module
+        from migrations import upgrade
+        from auth import create_access_token
+        from database import SessionLocal
+        from hashing import password_hasher
+        from models import User
+
+        upgrade()  # main migrates in its lifespan, which the in-process load runner never starts
+        db = SessionLocal()
+        usernames = seed(db, users=args.logins, desks_per_floor=200, floors=("L1", "L2"), tech_areas=("PAID/GCIS",))
+        token = create_access_token({"user_id": db.query(User.id).filter(User.username == usernames[0]).scalar()})
+        db.close()
+
+        def read(client, i):
+            if i % 2:
+                return client.get("/users/profile", params={"token": token})
+            return client.get(f"/desk/desks/L{i % 4 // 2 + 1}")
+
+        def login(client, i):
+            return client.post("/auth/login", params={"username": usernames[i % len(usernames)], "password": "password"})
+
+        async def run_all():
+            await run_load_async(app_module.app, login, 2, 1)  # Start the pool outside the measurement
+            quiet = await run_load_async(app_module.app, read, args.reads, args.concurrency)
+            storm, reads = await asyncio.gather(
+                run_load_async(app_module.app, login, args.logins, args.storm_concurrency, expected={200, 503}),
+                run_load_async(app_module.app, read, args.reads, args.concurrency),
+            )
+            return {"reads (quiet)": quiet, "reads (login storm)": reads, "logins (storm)": storm, "rejected": password_hasher.rejected}
+
+        print(json.dumps(asyncio.run(run_all())))
+    finally:
+        os.remove(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent readers")
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--storm-concurrency", type=int, default=60)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    for mode, settings in MODES.items():
+        command = [sys.executable, "-m", "benchmarks.bench_hashing", "--child", "--reads", str(args.reads),
+                   "--concurrency", str(args.concurrency), "--logins", str(args.logins), "--storm-concurrency", str(args.storm_concurrency)]
+        output = subprocess.run(command, env=dict(os.environ, **settings), cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        rejected = results.pop("rejected")
+        for name, result in results.items():
+            print_result(f"{mode:<6} {name}", result)
+        print(f"{mode:<6} logins rejected with 503: {rejected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+""" Multi-floor availability: per-floor SQL queries vs the NumPy occupancy engine.
+
+Seeds a campus of --floors x --desks-per-floor desks with --history-days of
+past reservations plus two weeks of future ones, then times "free desks in
+tech area X for this window" answered by one `free_desks` query per floor
+(what a client does today) and by `OccupancyEngine.free_desks`. Also reports
+the engine's build time and the cost of an incremental update.
+
+Usage (from backend/):
+    python -m benchmarks.bench_occupancy --floors 20 --desks-per-floor 600
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import use_temp_database, seed, summarize, print_result
+
+
+def seed_reservations(db, desk_ids, user_ids, history_days, fill, epoch):
+    """ Morning/afternoon reservations for every desk; never overlapping on a desk or a user """
+    from sqlalchemy import insert
+    from models import Reservation
+
+    rng = random.Random(42)
+    rows = []
+    for day in range(-history_days, 14):
+        date = epoch + timedelta(days=day)
+        for half in ((9, 13), (13, 17)):
+            users = iter(rng.sample(user_ids, len(user_ids)))
+            for desk_id, floor, tech_area in desk_ids:
+                if rng.random() >= fill:
+                    continue
+                user_id = next(users, None)
+                if user_id is None:
+                    break
+                rows.append({
+                    "desk_id": desk_id, "floor": floor, "tech_area": tech_area, "user_id": user_id,
+                    "start_at": date.replace(hour=half[0]), "end_at": date.replace(hour=half[1]),
+                })
+        if len(rows) > 50000:
+            db.execute(insert(Reservation), rows)
+            rows = []
+    if rows:
+        db.execute(insert(Reservation), rows)
+    db.commit()
+
+
+def timed(fn, repeat):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--floors", type=int, default=20)
+    parser.add_argument("--desks-per-floor", type=int, default=600)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--history-days", type=int, default=60)
+    parser.add_argument("--fill", type=float, default=0.3, help="Share of desks reserved per half-day")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    try:
+        from sqlalchemy import func, select
+        from database import SessionLocal
+        from migrations import upgrade
+        from models import Desk, User, Reservation
+        from occupancy_engine import OccupancyEngine
+        from reservations import free_desks
+
+        upgrade()
+        floors = [f"L{i}" for i in range(1, args.floors + 1)]
+        tech_areas = ("PAID/GCIS", "CORE", "DATA", "INFRA")
+        db = SessionLocal()
+        seed(db, users=args.users, desks_per_floor=args.desks_per_floor, floors=floors, tech_areas=tech_areas)
+        desk_ids = db.execute(select(Desk.desk_id, Desk.floor, Desk.tech_area)).all()
+        user_ids = db.execute(select(User.id)).scalars().all()
+        now = datetime.utcnow()
+        epoch = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        seed_reservations(db, desk_ids, user_ids, args.history_days, args.fill, epoch)
+        total = db.execute(select(func.count(Reservation.id))).scalar()
+        print(f"{len(desk_ids)} desks on {len(floors)} floors, {total} reservations")
+
+        start_at = epoch + timedelta(days=1, hours=10)
+        end_at = start_at + timedelta(hours=2)
+
+        engine = OccupancyEngine()
+        began = time.perf_counter()
+        engine.ensure_built(db, now)
+        print(f"engine build: {(time.perf_counter() - began) * 1000:.1f} ms")
+
+        def per_floor_sql():
+            return sum(len(free_desks(db, floor, "CORE", start_at, end_at, now)) for floor in floors)
+
+        def vectorized():
+            return engine.free_desks("CORE", start_at, end_at, limit=10, now=now)["total"]
+
+        assert per_floor_sql() >= vectorized(), "the engine must never report more free desks than SQL"
+        print(f"free CORE desks tomorrow 10:00-12:00: sql {per_floor_sql()}, engine {vectorized()}")
+
+        print_result("per-floor SQL (all floors)", timed(per_floor_sql, max(1, args.repeat // 10)))
+        print_result("occupancy engine (all floors)", timed(vectorized, args.repeat))
+
+        reservation_ids = iter(range(10**9, 10**10))
+        desk_id, floor, _ = desk_ids[0]
+
+        def incremental():
+            reservation_id = next(reservation_ids)
+            engine.reserved(reservation_id, desk_id, floor, start_at, end_at)
+            engine.reservation_cancelled(reservation_id, desk_id, floor)
+
+        print_result("engine reserve + cancel", timed(incremental, args.repeat))
+        db.close()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
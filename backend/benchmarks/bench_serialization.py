@@ -0,0 +1,84 @@
+""" Serialization cost per 1k desks: ORM objects + jsonable_encoder vs tuples + a fast encoder.
+
+Seeds one floor of --desks desks and times building the JSON body for it
+the way a route returning ORM objects does (identity-mapped `Desk` objects
+walked by `jsonable_encoder`, then `JSONResponse`), against projected tuple
+rows encoded by the stdlib, by a Pydantic `response_model`, and by
+`responses.FastJSONResponse` (orjson when installed). Each path is timed
+with and without the database read; results are per 1k desks.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --desks 5000
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks._common import use_temp_database, seed, summarize, print_result
+
+
+def timed(fn, repeat, scale):
+    """ Latencies of `fn` scaled to 1k desks """
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - begin) * scale)
+    return summarize(latencies, (time.perf_counter() - started) * scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--desks", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    try:
+        from typing import List
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+        from pydantic import TypeAdapter
+        from database import SessionLocal
+        from migrations import upgrade
+        from models import Desk
+        from floor_cache import DESK_COLUMNS, DESK_KEYS
+        from responses import FastJSONResponse, orjson
+        from schemas import DeskOut
+
+        upgrade()
+        db = SessionLocal()
+        seed(db, users=10, desks_per_floor=args.desks, floors=("L1",))
+        print(f"{args.desks} desks, encoder: {'orjson' if orjson else 'stdlib json'}; figures per 1k desks")
+
+        desks = TypeAdapter(List[DeskOut])
+        objects = db.query(Desk).filter(Desk.floor == "L1").all()
+        rows = db.query(*DESK_COLUMNS).filter(Desk.floor == "L1").all()
+
+        def read_objects():
+            db.expunge_all()  # A fresh request session starts with an empty identity map
+            return db.query(Desk).filter(Desk.floor == "L1").all()
+
+        def read_rows():
+            return db.query(*DESK_COLUMNS).filter(Desk.floor == "L1").all()
+
+        encoders = {
+            "ORM objects + jsonable_encoder": (read_objects, lambda data: JSONResponse(jsonable_encoder(data)).body),
+            "tuples + json.dumps": (read_rows, lambda data: json.dumps([dict(zip(DESK_KEYS, row)) for row in data]).encode()),
+            "tuples + response_model": (read_rows, lambda data: desks.dump_json(desks.validate_python([dict(zip(DESK_KEYS, row)) for row in data]))),
+            "tuples + FastJSONResponse": (read_rows, lambda data: FastJSONResponse([dict(zip(DESK_KEYS, row)) for row in data]).body),
+        }
+        scale = 1000 / args.desks
+        for name, (read, encode) in encoders.items():
+            data = objects if read is read_objects else rows
+            print_result(f"encode  {name}", timed(lambda: encode(data), args.repeat, scale))
+            print_result(f"read+   {name}", timed(lambda: encode(read()), args.repeat, scale))
+        db.close()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
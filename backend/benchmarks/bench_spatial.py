@@ -0,0 +1,97 @@
+""" Nearest free desks: loading the floor and sorting in Python vs the grid index.
+
+Seeds one floor of --desks desks with random coordinates, tech areas and
+about --occupied of them taken, then times "the 5 nearest free desks in my
+tech area to a colleague's desk" answered by the naive way (load every desk
+on the floor, compute every distance, sort) against the per-floor grid in
+spatial_index.py. Both answers are checked against each other and the run
+exits non-zero if any query disagrees.
+
+Usage (from backend/):
+    python -m benchmarks.bench_spatial --desks 20000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+from benchmarks._common import use_temp_database, summarize, print_result
+
+TECH_AREAS = ("PAID/GCIS", "CORE", "Payments Engineering", "Payment Services")
+
+
+def timed(fn, anchors):
+    latencies, answers = [], []
+    started = time.perf_counter()
+    for anchor in anchors:
+        begin = time.perf_counter()
+        answers.append(fn(anchor))
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started), answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--desks", type=int, default=20000)
+    parser.add_argument("--occupied", type=float, default=0.6, help="Share of desks already taken")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    try:
+        from sqlalchemy import insert, select
+        from database import SessionLocal
+        from migrations import upgrade
+        from models import Desk
+        from spatial_index import spatial_index
+
+        upgrade()
+        rng = random.Random(7)
+        side = math.sqrt(args.desks) * 2  # About 2 m between neighbouring desks
+        rows = [
+            {"desk_id": f"L1.WS.{i:06d}", "floor": "L1", "tech_area": TECH_AREAS[i % len(TECH_AREAS)],
+             "status": "occupied" if rng.random() < args.occupied else "available",
+             "x": rng.uniform(0, side), "y": rng.uniform(0, side / 2), "zone": f"Z{i % 8}"}
+            for i in range(args.desks)
+        ]
+        db = SessionLocal()
+        db.execute(insert(Desk), rows)
+        db.commit()
+        anchors = [row for row in rng.sample(rows, args.queries)]
+        tech_area = TECH_AREAS[0]
+
+        def naive(anchor):
+            desks = db.execute(select(Desk.desk_id, Desk.tech_area, Desk.status, Desk.x, Desk.y).where(Desk.floor == "L1")).all()
+            nearby = sorted(
+                (math.hypot(x - anchor["x"], y - anchor["y"]), desk_id)
+                for desk_id, desk_tech_area, status, x, y in desks
+                if status == "available" and desk_tech_area == tech_area and x is not None
+            )
+            return [desk_id for _, desk_id in nearby[:args.k]]
+
+        def indexed(anchor):
+            found = spatial_index.nearest("L1", anchor["x"], anchor["y"], tech_area, args.k)
+            return [desk["desk_id"] for desk in found]
+
+        began = time.perf_counter()
+        spatial_index.ensure_built(db)
+        print(f"{args.desks} desks, {args.occupied:.0%} occupied; index built in {(time.perf_counter() - began) * 1000:.1f} ms")
+        naive_result, expected = timed(naive, anchors)
+        indexed_result, answers = timed(indexed, anchors)
+        print_result("load floor + sort in Python", naive_result)
+        print_result("grid index", indexed_result)
+        mismatched = [anchor["desk_id"] for anchor, got, want in zip(anchors, answers, expected) if got != want]
+        print(f"answers identical: {not mismatched}   mismatched queries: {len(mismatched)}")
+        db.close()
+        if mismatched:
+            print(f"first mismatch near {mismatched[0]}")
+            sys.exit(1)
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
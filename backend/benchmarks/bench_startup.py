@@ -0,0 +1,90 @@
+""" Cold start of the API process: import, app build, lifespan startup and first response.
+
+Every run is a fresh interpreter, so nothing is cached between runs. The child
+times `import main`, `main.create_app()`, the lifespan startup and the first
+GET /, and the parent adds the wall time of the whole process. Scenarios:
+
+    new database        empty SQLite file; startup applies every migration
+    migrated database   schema already current; startup only checks the version
+    AUTO_MIGRATE=false  schema already current; startup skips the check
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks._common import BACKEND_DIR, use_temp_database
+
+PHASES = ("import", "create_app", "startup", "first_response")
+
+
+def child():
+    began = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    app = main.create_app()
+    built = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+    client_ready = time.perf_counter()  # TestClient itself is not part of the server's cold start
+    client.__enter__()
+    started = time.perf_counter()
+    response = client.get("/")
+    responded = time.perf_counter()
+    assert response.status_code == 200, response.text
+    client.__exit__(None, None, None)
+    phases = dict(zip(PHASES, (imported - began, built - imported, started - client_ready, responded - started)))
+    print(json.dumps({name: seconds * 1000 for name, seconds in phases.items()}))
+
+
+def run_once(env):
+    began = time.perf_counter()
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], env=env, cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    phases = json.loads(output.strip().splitlines()[-1])
+    phases["process"] = (time.perf_counter() - began) * 1000
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child()
+
+    env = dict(os.environ, WARM_CACHES="false", ANALYTICS_INTERVAL="0")  # Background work only adds noise here
+    migrated = use_temp_database()
+    env["DATABASE_URL"] = os.environ["DATABASE_URL"]
+    scenarios = {"new database": [], "migrated database": [], "AUTO_MIGRATE=false": []}
+    paths = [migrated]
+    try:
+        run_once(env)  # Bring the shared database up to date
+        for _ in range(args.runs):
+            fresh = use_temp_database()
+            paths.append(fresh)
+            scenarios["new database"].append(run_once(dict(env, DATABASE_URL=os.environ["DATABASE_URL"])))
+            scenarios["migrated database"].append(run_once(env))
+            scenarios["AUTO_MIGRATE=false"].append(run_once(dict(env, AUTO_MIGRATE="false")))
+    finally:
+        for path in paths:
+            os.remove(path)
+
+    columns = PHASES + ("process",)
+    print(f"median of {args.runs} runs, ms".ljust(22) + "".join(name.rjust(16) for name in columns))
+    for name, runs in scenarios.items():
+        print(name.ljust(22) + "".join(f"{statistics.median(run[column] for run in runs):16.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
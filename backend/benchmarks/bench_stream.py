@@ -0,0 +1,123 @@
+""" Drive many concurrent SSE subscribers against a local server.
+
+Starts uvicorn on a free local port in a background thread and opens
+`--subscribers` streams on /desk/stream/L1. A few extra "stalled"
+subscribers open a stream and never read it. The script then issues
+`--updates` desk bookings and reports how many events each healthy
+subscriber received, the delivery latency, and how many subscribers the
+broker dropped. It exits non-zero if a healthy subscriber missed events.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream --subscribers 200 --updates 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+from benchmarks._common import use_temp_database, seed, summarize, print_result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--stalled", type=int, default=5, help="Subscribers that never read their stream")
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ["STREAM_QUEUE_SIZE"] = str(args.queue_size)
+    db_path = use_temp_database()
+    try:
+        import httpx
+        import uvicorn
+        import main as app_module
+        from migrations import upgrade
+        from auth import create_access_token
+        from database import SessionLocal
+        from desk_stream import desk_broker
+        from models import User
+
+        upgrade()  # main migrates in its lifespan, which only starts after seeding
+        db = SessionLocal()
+        seed(db, users=10, desks_per_floor=args.updates, floors=("L1",), tech_areas=("PAID/GCIS",))
+        token = create_access_token({"user_id": db.query(User.id).filter(User.username == "user000000").scalar()})
+        db.close()
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app_module.app, port=port, log_level="warning", limit_concurrency=None))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}"
+
+        sent_at = {}
+
+        async def subscriber(client, received, latencies, ready):
+            async with client.stream("GET", "/desk/stream/L1") as response:
+                ready.release()
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: ") and event == "desk":
+                        desk_id = json.loads(line[6:])["desk_id"]
+                        latencies.append(time.perf_counter() - sent_at[desk_id])
+                        received.append(desk_id)
+                        if len(received) == args.updates:
+                            return
+
+        async def stalled(client, ready):
+            async with client.stream("GET", "/desk/stream/L1"):
+                ready.release()
+                await asyncio.sleep(3600)
+
+        async def run():
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+            async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+                ready = asyncio.Semaphore(0)
+                received = [[] for _ in range(args.subscribers)]
+                latencies = []
+                tasks = [asyncio.create_task(subscriber(client, received[i], latencies, ready)) for i in range(args.subscribers)]
+                stuck = [asyncio.create_task(stalled(client, ready)) for _ in range(args.stalled)]
+                for _ in range(args.subscribers + args.stalled):
+                    await ready.acquire()
+                while desk_broker.subscriber_count() < args.subscribers + args.stalled:
+                    await asyncio.sleep(0.01)
+
+                started = time.perf_counter()
+                for i in range(args.updates):
+                    desk_id = f"L1.WS.{i:05d}"
+                    sent_at[desk_id] = time.perf_counter()
+                    await client.post(f"/desk/desk/update/L1/{desk_id}", params={"token": token}, json={"status": "occupied"})
+                await asyncio.wait_for(asyncio.gather(*tasks), timeout=120)
+                elapsed = time.perf_counter() - started
+                for task in stuck:
+                    task.cancel()
+                return received, latencies, elapsed
+
+        received, latencies, elapsed = asyncio.run(run())
+        complete = sum(1 for events in received if len(events) == args.updates)
+        result = summarize(latencies, elapsed)
+        result["rps"] = len(latencies) / elapsed  # Events delivered per second
+        print_result(f"{args.subscribers} subscribers x {args.updates} events", result)
+        print(f"complete subscribers: {complete}/{args.subscribers}   dropped by broker: {desk_broker.dropped_total}")
+        server.should_exit = True
+        if complete != args.subscribers:
+            sys.exit(1)
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
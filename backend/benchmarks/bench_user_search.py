@@ -0,0 +1,114 @@
+""" User search: leading-wildcard ILIKE plus a desk lookup vs the trigram index.
+
+Seeds --users realistic usernames (first name + surname + number), gives
+--desk-share of them a desk, then times the old `search_user` queries
+(`username ILIKE '%q%'`, then a second query for the desk) against the ranked
+trigram search that returns the top 10 users and their desks in one joined
+statement. Queries are taken from real usernames: exact, a substring, and a
+copy with one typo, which ILIKE can never find. Also reports the hit rate.
+
+Usage (from backend/):
+    python -m benchmarks.bench_user_search --users 100000
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks._common import use_temp_database, summarize, print_result
+
+FIRST = ("alice", "bruno", "chen", "deepa", "elena", "farid", "grace", "hiro", "ines", "jonas",
+         "kavya", "liam", "maria", "nikhil", "olga", "pablo", "qing", "rahul", "sofia", "tomas")
+LAST = ("anderson", "banerjee", "costa", "dubois", "eriksen", "fischer", "gupta", "hansen", "iyer", "jensen",
+        "kowalski", "lindqvist", "mukherjee", "novak", "okafor", "petrov", "rossi", "schmidt", "tanaka", "weber")
+
+
+def make_usernames(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(FIRST)}.{rng.choice(LAST)}{rng.randrange(10000)}")
+    return sorted(names)
+
+
+def with_typo(word, rng):
+    """ Swap two neighbouring letters, e.g. "mukherjee" -> "mukehrjee" """
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def timed(fn, queries):
+    latencies, hits = [], 0
+    started = time.perf_counter()
+    for query, expected in queries:
+        begin = time.perf_counter()
+        found = fn(query)
+        latencies.append(time.perf_counter() - begin)
+        hits += expected in found
+    return summarize(latencies, time.perf_counter() - started), hits / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--desk-share", type=float, default=0.3, help="Share of users holding a desk")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")  # Seeding batches are slow by design; keep the log quiet
+    try:
+        from sqlalchemy import insert, select
+        from database import SessionLocal
+        from migrations import upgrade
+        from models import Desk, User
+        from user_search import search_users
+
+        upgrade()
+        rng = random.Random(7)
+        usernames = make_usernames(args.users, rng)
+        db = SessionLocal()
+        began = time.perf_counter()
+        for start in range(0, len(usernames), 10000):  # The FTS triggers index every inserted row
+            db.execute(insert(User), [
+                {"username": name, "password_hash": "x", "role": "user", "tech_area": "CORE"}
+                for name in usernames[start:start + 10000]
+            ])
+        db.commit()
+        print(f"{len(usernames)} users inserted and indexed in {time.perf_counter() - began:.1f} s")
+
+        holders = rng.sample(db.execute(select(User.id)).scalars().all(), int(args.users * args.desk_share))
+        db.execute(insert(Desk), [
+            {"desk_id": f"L{i // 500 + 1}.WS.{i:06d}", "floor": f"L{i // 500 + 1}", "status": "occupied", "tech_area": "CORE", "user_id": user_id}
+            for i, user_id in enumerate(holders)
+        ])
+        db.commit()
+
+        sample = rng.sample(usernames, args.queries)
+        workloads = {
+            "exact": [(name, name) for name in sample],
+            "substring": [(name.split(".")[1], name.split(".")[1]) for name in sample],
+            "one typo": [(with_typo(name.split(".")[1], rng), name.split(".")[1]) for name in sample],
+        }
+
+        def legacy(query):
+            user = db.query(User).filter(User.username.ilike(f"%{query}%")).first()
+            if user is None:
+                return ""
+            db.query(Desk).filter(Desk.user_id == user.id).first()
+            return user.username
+
+        def trigram(query):
+            return " ".join(match["username"] for match in search_users(db, query, 10))
+
+        for label, queries in workloads.items():
+            for name, fn in (("ILIKE + desk query", legacy), ("trigram top-10 joined", trigram)):
+                result, hit_rate = timed(fn, queries)
+                print_result(f"{label:<10} {name}", result)
+                print(f"{'':<11}hit rate {hit_rate:.0%}")
+        db.close()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
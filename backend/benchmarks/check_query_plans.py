@@ -0,0 +1,220 @@
+""" Query-plan regression check for the statements the routes actually run.
+
+Upgrades a temporary SQLite database through migrations.py and seeds it, then
+drives every route through a TestClient (once on the sync routers, once with
+ASYNC_DB on), plus the analytics aggregator and a seed_db sync. A
+`before_cursor_execute` listener on both engines records each distinct SQL
+statement with the parameters it was first run with and the step that ran it.
+Every recorded statement then goes through EXPLAIN QUERY PLAN, and the check
+fails (exit code 1) if any plan contains a full table scan or a temporary
+B-tree sort that is not explicitly allowed below, with a reason, for the step
+that issued it. Nothing is rebuilt by hand, so the plans checked are the
+ones the code issues today; a route `drive` does not call is not checked, so
+new routes belong there.
+
+Usage (from backend/):
+    python -m benchmarks.check_query_plans
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks._common import use_temp_database, seed
+
+FULL_READ = "reads every row by design"
+CANDIDATES = "at most `limit` materialized candidates"
+RERANKED = {"SCAN candidates": CANDIDATES, "SCAN exact": CANDIDATES, "SCAN fuzzy": CANDIDATES,
+            "USE TEMP B-TREE FOR ORDER BY": "sorts only the candidates' rows"}
+
+# step -> {allowed plan fragment: reason}
+ALLOWED = {
+    "desks: user search": {"SCAN users_fts VIRTUAL TABLE": "FTS5 trigram MATCH lookup", **RERANKED},
+    "desks: short user search": RERANKED,
+    "desks: nearest free desks": {"SCAN desks": "builds the spatial index once; " + FULL_READ,
+                                  "USE TEMP B-TREE FOR ORDER BY": "sorts only the desks one user holds"},
+    "desks: available": {"SCAN desks": "builds the occupancy bitmaps once; " + FULL_READ},
+    "reservations: mine": {"USE TEMP B-TREE FOR ORDER BY": "sorts only the user's upcoming reservations"},
+    "admin: users page": {"SCAN users": "walks the primary key and stops at LIMIT"},
+    "admin: desks page": {"SCAN desks": "walks the primary key and stops at LIMIT"},
+    "admin: export users": {"SCAN users": FULL_READ},
+    "admin: load desks": {"SCAN desks": "import prefetch; " + FULL_READ},
+    "seed_db: sync floor file": {"SCAN desks": "diffs against every desk; " + FULL_READ},
+    "analytics: summary": {"USE TEMP B-TREE FOR GROUP BY": "groups one row per area and day in the range"},
+}
+SKIPPED = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "CREATE", "DROP", "ALTER")
+
+
+class Capture:
+    """ `before_cursor_execute` listener keeping the first (step, parameters) seen for each statement """
+
+    def __init__(self):
+        self.step = None  # Statements run outside a step (setup) are not checked
+        self.statements = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.step is None or statement.lstrip().upper().startswith(SKIPPED):
+            return
+        self.statements.setdefault(statement, (self.step, parameters[0] if executemany else parameters))
+
+
+def drive(client, capture, run: int, usernames):
+    """ Call every route once; `run` picks fresh users and desks so both passes start from the same state """
+    def call(step, method, path, expected=200, **kwargs):
+        capture.step = step
+        try:
+            response = client.request(method, path, **kwargs)
+        finally:
+            capture.step = None
+        if response.status_code != expected:
+            raise SystemExit(f"{step}: {method} {path} returned {response.status_code}, expected {expected}: {response.text[:200]}")
+        return response
+
+    def login(username):
+        return {"token": call("auth: login", "POST", "/auth/login", params={"username": username, "password": "password"}).json()["access_token"]}
+
+    me, colleague = usernames[2 * run], usernames[2 * run + 2]  # Both in PAID/GCIS, like the even-numbered desks
+    desk = lambda i: f"L2.WS.{i + 20 * run:05d}"
+    mine, theirs, admin = login(me), login(colleague), login("admin")
+    now = datetime.utcnow().replace(microsecond=0)
+    window = {"start_at": (now - timedelta(minutes=30)).isoformat(), "end_at": (now + timedelta(hours=1)).isoformat()}
+    later = {"start_at": (now + timedelta(days=1)).isoformat(), "end_at": (now + timedelta(days=1, hours=2)).isoformat()}
+
+    call("users: profile", "GET", "/users/profile", params=mine)
+    call("users: update password", "PUT", "/users/update-password", params=mine, json={"username": me, "password": "password"})
+
+    call("desks: floor snapshot", "GET", "/desk/desks/L2")
+    call("desks: floor snapshot", "GET", "/desk/desks/L2")
+    call("desks: book", "POST", f"/desk/desk/update/L2/{desk(0)}", params=mine, json={"status": "occupied"})
+    call("desks: conflict lookup", "POST", f"/desk/desk/update/L2/{desk(0)}", 409, params=theirs, json={"status": "occupied"})
+    call("desks: batch book", "POST", "/desk/batch-update/L2", params=mine, json={"desk_ids": [desk(2), desk(4)], "status": "occupied"})
+    call("desks: batch conflict", "POST", "/desk/batch-update/L2", 409, params=theirs, json={"desk_ids": [desk(2), desk(6)], "status": "occupied"})
+    call("desks: delta", "GET", "/desk/desks/L2", params={"since": 1})
+    call("desks: full delta", "GET", "/desk/desks/L2", params={"since": 0})
+    call("desks: user search", "GET", f"/desk/search/{me[:-1]}x", params={"limit": 5})
+    call("desks: user search", "GET", f"/desk/search/{me}")
+    call("desks: short user search", "GET", "/desk/search/us", params={"limit": 5})
+    call("search: occupied desk", "GET", f"/search/search/{me}")
+    call("desks: nearest free desks", "GET", f"/desk/nearest/{me}", params=theirs)
+    call("desks: available", "GET", "/desk/available", params={**theirs, **window})
+
+    call("reservations: free", "GET", "/reservations/free/L2", params={**theirs, **later})
+    reservation = call("reservations: book", "POST", f"/reservations/L2/{desk(8)}", 201, params=theirs, json=later).json()["id"]
+    call("reservations: conflict", "POST", f"/reservations/L2/{desk(8)}", 409, params=mine, json=later)
+    call("reservations: mine", "GET", "/reservations/mine", params=theirs)
+    call("reservations: cancel", "DELETE", f"/reservations/{reservation}", params=theirs)
+    call("desks: release", "POST", f"/desk/desk/update/L2/{desk(0)}", params=mine, json={"status": "available"})
+    call("desks: batch release", "POST", "/desk/batch-update/L2", params=mine, json={"desk_ids": [desk(2), desk(4)], "status": "available"})
+    call("search: catch up with changes", "GET", f"/search/search/{me}", 404)
+    call("desks: available after changes", "GET", "/desk/available", params={**theirs, **window})
+
+    page = call("admin: users page", "GET", "/admin/users/", params={**admin, "limit": 100}).json()
+    call("admin: users page", "GET", "/admin/users/", params={**admin, "limit": 100, "cursor": page["next_cursor"]})
+    call("admin: users by tech area", "GET", "/admin/users/CORE", params={**admin, "limit": 10, "cursor": 5})
+    page = call("admin: desks page", "GET", "/admin/desks/", params={**admin, "limit": 100}).json()
+    call("admin: desks page", "GET", "/admin/desks/", params={**admin, "limit": 100, "cursor": page["next_cursor"]})
+    call("admin: desks by tech area", "GET", "/admin/desks/CORE", params={**admin, "limit": 10, "cursor": 5})
+    call("admin: export users", "GET", "/admin/users/", params={**admin, "format": "csv"})
+    target = 51 + run  # seed() inserts users in order, so usernames[i] has id i + 1
+    call("admin: update tech area", "PUT", f"/admin/user/update-tech-area/{target}", params={**admin, "new_tech_area": "CORE"})
+    call("admin: update password", "PUT", f"/admin/user/update-password/{target}", params={**admin, "new_password": "password"})
+    call("admin: bulk desk status", "POST", "/admin/desks/bulk-status/L1", params=admin, json={"desk_ids": ["L1.WS.00001", "L1.WS.00003"], "status": "occupied"})
+    call("admin: reset floor", "POST", "/admin/reset-floor/L1", params=admin)
+    users = {"users": [{"username": f"imported{run}", "password": "x", "tech_area": "CORE", "role": "user"}]}
+    call("admin: load users", "POST", "/admin/load-users/", params=admin, files={"file": ("users.json", json.dumps(users))})
+    desks = {"desks": {f"L4.WS.{run:03d}": {"status": "available", "user": "", "tech_area": "CORE", "floor": "L4"}}}
+    call("admin: load desks", "POST", "/admin/load-desks/", params=admin, files={"file": ("desks.json", json.dumps(desks))})
+    call("admin: compact changes", "POST", "/admin/compact-changes", params={**admin, "max_age_hours": 0})
+
+    call("analytics: occupancy", "GET", "/analytics/occupancy", params={**admin, "start": (now - timedelta(days=2)).isoformat()})
+    call("analytics: occupancy", "GET", "/analytics/occupancy",
+         params={**admin, "start": (now - timedelta(days=60)).isoformat(), "granularity": "day", "floor": "L2"})
+    for by in ("floor", "tech_area"):
+        call("analytics: summary", "GET", "/analytics/summary", params={**admin, "start": (now - timedelta(days=60)).isoformat(), "by": by})
+
+    call("admin: delete user", "DELETE", f"/admin/user/{101 + 2 * run + 1}", params=admin)
+    call("users: delete account", "DELETE", "/users/delete", params=login(usernames[111 + 2 * run]))
+
+
+def background_jobs(capture, db):
+    """ The work that runs outside requests: the analytics aggregator and a seed_db floor-file sync """
+    from analytics import aggregate_pending
+    from seed_db import sync_floor_files
+
+    capture.step = "analytics: aggregate"
+    aggregate_pending(db, now=datetime.utcnow() + timedelta(hours=1))
+
+    capture.step = "seed_db: sync floor file"
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "L5.json")
+        for layout in ({"L5.WS.001": "CORE", "L5.WS.002": "CORE"}, {"L5.WS.001": "PAID/GCIS"}):  # Insert, then update + delete
+            with open(path, "w") as f:
+                json.dump({"desks": {desk_id: {"status": "available", "user": "", "tech_area": area, "x": 1.0, "y": 2.0}
+                                     for desk_id, area in layout.items()}}, f)
+            sync_floor_files(db, [path], workers=1)
+    capture.step = None
+
+
+def plan_problems(conn, sql, parameters, allowed):
+    details = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, parameters)]
+    problems = []
+    for detail in details:
+        is_scan = detail.startswith("SCAN ") and "USING INDEX" not in detail and "USING COVERING INDEX" not in detail
+        if (is_scan and "SCAN CONSTANT ROW" not in detail) or "USE TEMP B-TREE" in detail:
+            if not any(detail.startswith(fragment) for fragment in allowed):
+                problems.append(detail)
+    return details, problems
+
+
+def main():
+    db_path = use_temp_database()
+    os.environ.update(WARM_CACHES="false", ANALYTICS_INTERVAL="0", HASH_PROCESS_POOL="false", ANALYTICS_SETTLE_SECONDS="0")
+    try:
+        import warnings
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event, update
+        import main as app_module
+        from config import Config
+        from database import SessionLocal, engine, get_async_engine
+        from migrations import upgrade
+        from models import Desk
+
+        warnings.filterwarnings("ignore")
+        upgrade(engine)
+        db = SessionLocal()
+        usernames = seed(db, users=150, desks_per_floor=150, floors=("L1", "L2"), tech_areas=("PAID/GCIS", "CORE"))
+        db.execute(update(Desk).values(x=Desk.id % 30, y=Desk.id // 30, zone="Z1"))  # Place every desk for /desk/nearest
+        db.commit()
+
+        capture = Capture()
+        engines = (engine, get_async_engine().sync_engine)
+        for target in engines:
+            event.listen(target, "before_cursor_execute", capture)
+        for run, async_db in enumerate((False, True)):
+            Config.ASYNC_DB = async_db
+            with TestClient(app_module.create_app()) as client:
+                drive(client, capture, run, usernames)
+        background_jobs(capture, db)
+        db.close()
+        for target in engines:
+            event.remove(target, "before_cursor_execute", capture)
+
+        failures = 0
+        with engine.connect() as conn:
+            for sql, (step, parameters) in sorted(capture.statements.items(), key=lambda item: item[1][0]):
+                details, problems = plan_problems(conn, sql, parameters, ALLOWED.get(step, {}))
+                if not details:
+                    continue  # Plain INSERT ... VALUES: nothing to plan
+                mark = "❌" if problems else "✅"
+                print(f"{mark} {step:<28} {' '.join(sql.split())[:70]:<70} {' | '.join(details)}")
+                failures += bool(problems)
+        print(f"{len(capture.statements)} distinct statements captured; {failures} statement(s) with unexpected scans")
+        engine.dispose()
+        sys.exit(1 if failures else 0)
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
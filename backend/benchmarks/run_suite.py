@@ -0,0 +1,230 @@
+""" End-to-end HTTP benchmark suite with a regression gate.
+
+Seeds a synthetic campus into a temporary SQLite database, then drives the
+real `main.app` in-process with concurrent clients through login, profile,
+floor listing, contended booking, search, availability and admin import.
+Every scenario reports throughput and p50/p95/p99 latency.
+
+The campus is built by repeating the floor plan in data/L2.json (131 desks
+and its tech-area mix) until the requested size is reached:
+
+    --scale l2       data/L2.json as-is, 200 users
+    --scale campus   10k desks, 5k users
+    --scale max      100k desks, 50k users
+
+Results can be saved as a baseline and later runs compared against it; the
+exit code is 1 when any scenario's p95 grows, or its throughput drops, by
+more than --tolerance. Baselines are machine-specific, so record one on the
+machine that will run the gate.
+
+Usage (from backend/):
+    python -m benchmarks.run_suite --scale campus --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_suite --scale campus --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks._common import BACKEND_DIR, use_temp_database, run_load_async, print_result
+
+TEMPLATE = os.path.join(os.path.dirname(BACKEND_DIR), "data", "L2.json")
+SCALES = {"l2": (None, 200), "campus": (10000, 5000), "max": (100000, 50000)}
+PASSWORD = "password"
+
+
+# -------------------- 🟢 SYNTHETIC CAMPUS --------------------
+
+def load_template():
+    """ [(desk_id, tech_area)] for the reference floor in data/L2.json """
+    with open(TEMPLATE, encoding="utf-8") as f:
+        return [(desk_id, details["tech_area"]) for desk_id, details in json.load(f)["desks"].items()]
+
+
+def campus_desks(template, desks=None):
+    """ Yield desk rows: the template floor once, or repeated as floors L1..Ln until `desks` rows """
+    if desks is None:
+        for desk_id, tech_area in template:
+            yield {"desk_id": desk_id, "floor": "L2", "status": "available", "tech_area": tech_area}
+        return
+    for i in range(desks):
+        floor, (desk_id, tech_area) = i // len(template) + 1, template[i % len(template)]
+        yield {"desk_id": f"{floor}." + desk_id.split(".", 1)[1], "floor": f"L{floor}", "status": "available", "tech_area": tech_area}
+
+
+def seed_campus(db, template, desks=None, users=200):
+    """ Bulk-insert the campus; returns (floors, [(username, tech_area)]) """
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from models import User, Desk
+
+    password_hash = generate_password_hash(PASSWORD)  # Hash once, reuse for every synthetic user
+    people = [(f"user{i:06d}", template[i % len(template)][1]) for i in range(users)]
+    for start in range(0, users, 10000):
+        db.execute(insert(User), [
+            {"username": name, "password_hash": password_hash, "role": "user", "tech_area": tech_area}
+            for name, tech_area in people[start:start + 10000]
+        ])
+    db.execute(insert(User), [{"username": "admin", "password_hash": password_hash, "role": "admin", "tech_area": template[0][1]}])
+
+    floors, batch = [], []
+    for row in campus_desks(template, desks):
+        if not floors or floors[-1] != row["floor"]:
+            floors.append(row["floor"])
+        batch.append(row)
+        if len(batch) >= 10000:
+            db.execute(insert(Desk), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Desk), batch)
+    db.commit()
+    return floors, people
+
+
+# -------------------- 🔵 SCENARIOS --------------------
+
+def scenarios(db, floors, people, template):
+    """ {name: (make_request, share of --requests, expected statuses)} """
+    from auth import create_access_token
+    from models import User, Desk
+
+    ids = dict(db.query(User.username, User.id))
+    admin_token = create_access_token({"user_id": ids["admin"]})
+    tokens = [create_access_token({"user_id": ids[name]}) for name, _ in people[:500]]
+
+    # Contention: everyone in the first desk's tech area fights over five desks on the first floor
+    hot_area = template[0][1]
+    hot_desks = [desk_id for (desk_id,) in db.query(Desk.desk_id).filter(Desk.floor == floors[0], Desk.tech_area == hot_area).limit(5)]
+    contenders = [create_access_token({"user_id": ids[name]}) for name, tech_area in people if tech_area == hot_area][:200]
+
+    tomorrow = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    window = {"start_at": tomorrow.isoformat(), "end_at": (tomorrow + timedelta(hours=2)).isoformat()}
+
+    def login(client, i):
+        return client.post("/auth/login", params={"username": people[i % len(people)][0], "password": PASSWORD})
+
+    def profile(client, i):
+        return client.get("/users/profile", params={"token": tokens[i % len(tokens)]})
+
+    def floor_listing(client, i):
+        return client.get(f"/desk/desks/{floors[i % len(floors)]}")
+
+    def booking(client, i):
+        status = "occupied" if (i // len(hot_desks)) % 2 == 0 else "available"
+        return client.post(f"/desk/desk/update/{floors[0]}/{hot_desks[i % len(hot_desks)]}",
+                           params={"token": contenders[i % len(contenders)]}, json={"status": status})
+
+    def search(client, i):
+        return client.get(f"/search/search/{people[(i * 7919) % len(people)][0][:9]}")
+
+    def search_legacy(client, i):
+        return client.get(f"/desk/search/{people[(i * 7919) % len(people)][0][4:]}")
+
+    def available(client, i):
+        return client.get("/desk/available", params={"token": tokens[i % len(tokens)], **window})
+
+    def admin_import(client, i):
+        desks = {f"B{i}.WS.{j:04d}": {"floor": f"B{i}", "status": "available", "tech_area": hot_area} for j in range(500)}
+        payload = json.dumps({"desks": desks})
+        return client.post("/admin/load-desks/", params={"token": admin_token}, files={"file": ("desks.json", payload, "application/json")})
+
+    return {
+        "POST /auth/login": (login, 0.05, {200, 503}),  # 503 = hashing pool saturated (admission control)
+        "GET /users/profile": (profile, 1, {200}),
+        "GET /desk/desks/{floor}": (floor_listing, 1, {200}),
+        "POST /desk/desk/update (contended)": (booking, 1, {200, 409}),
+        "GET /search/search/{prefix}": (search, 1, {200, 404}),
+        "GET /desk/search/{username}": (search_legacy, 0.2, {200, 404}),
+        "GET /desk/available": (available, 1, {200}),
+        "POST /admin/load-desks (500 desks)": (admin_import, 0.01, {200}),
+    }
+
+
+# -------------------- 🔴 BASELINE GATE --------------------
+
+def compare(results, baseline, tolerance):
+    """ Print deltas against `baseline`; returns the names of regressed scenarios """
+    regressed = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        p95 = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps = result["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        slower = p95 > tolerance or rps < -tolerance
+        if slower:
+            regressed.append(name)
+        print(f"{'❌' if slower else '✅'} {name:<38} p95 {p95:+7.1%}   throughput {rps:+7.1%}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="l2")
+    parser.add_argument("--desks", type=int, help="Override the scale's desk count")
+    parser.add_argument("--users", type=int, help="Override the scale's user count")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per full-weight scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests before each GET scenario")
+    parser.add_argument("--only", action="append", help="Run scenarios whose name contains this text")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a saved results file")
+    parser.add_argument("--save-baseline", help="Write results to this file for later comparison")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95/throughput change (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    desks, users = SCALES[args.scale]
+    desks, users = args.desks or desks, args.users or users
+
+    db_path = use_temp_database()
+    try:
+        import main as app_module
+        from migrations import upgrade
+        from database import SessionLocal
+
+        upgrade()  # main migrates in its lifespan, which the in-process load runner never starts
+        template = load_template()
+        db = SessionLocal()
+        floors, people = seed_campus(db, template, desks, users)
+        print(f"campus: {desks or len(template)} desks on {len(floors)} floors, {users} users")
+        selected = {
+            name: scenario for name, scenario in scenarios(db, floors, people, template).items()
+            if not args.only or any(text in name for text in args.only)
+        }
+        db.close()
+
+        async def run_all():
+            # One event loop for every scenario, so the async engine (ASYNC_DB=true) keeps its pool
+            results = {}
+            for name, (make_request, share, expected) in selected.items():
+                total = max(args.concurrency, int(args.requests * share))
+                if name.startswith("GET") and args.warmup:
+                    await run_load_async(app_module.app, make_request, args.warmup, min(args.concurrency, args.warmup))  # Fill caches and indexes
+                results[name] = await run_load_async(app_module.app, make_request, total, min(args.concurrency, total), expected)
+                print_result(name, results[name])
+            return results
+
+        results = asyncio.run(run_all())
+        report = {"scale": args.scale, "desks": desks or len(template), "users": users, "results": results}
+        for path in filter(None, (args.output, args.save_baseline)):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+        failed = [name for name, result in results.items() if result["errors"]]
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+            if (baseline.get("desks"), baseline.get("users")) != (report["desks"], users):
+                print(f"⚠️ Baseline was recorded for {baseline.get('desks')} desks / {baseline.get('users')} users")
+            failed += compare(results, baseline["results"], args.tolerance)
+        if failed:
+            print(f"{len(failed)} scenario(s) failed: {', '.join(sorted(set(failed)))}")
+        sys.exit(1 if failed else 0)
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
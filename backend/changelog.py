@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from config import Config
+from models import Desk, DeskChange, SyncState, User
+from floor_cache import DESK_COLUMNS, DESK_KEYS
+
+COMPACTED_KEY = "desk_changes_compacted_seq"
+LAYOUT_KEY = "desk_layout_version"
+RESERVATIONS_KEY = "reservations_version"
+CHANGE_KEYS = ("desk_id", "floor", "status", "user_id", "tech_area")
+
+# -------------------- 🟢 RECORDING CHANGES --------------------
+
+def log_desk_changes(*criteria, deleted: bool = False):
+    """ INSERT ... SELECT that appends the current state of the desks matching `criteria`.
+
+    Execute it inside the mutating transaction, after the change has been
+    flushed and before commit, so the log entry commits (or rolls back)
+    together with the change itself. For deletions pass `deleted=True` and
+    execute it before the DELETE, while the rows still exist.
+    """
+    columns = [getattr(Desk, key) for key in CHANGE_KEYS] + [literal(deleted)]
+    return insert(DeskChange).from_select([*CHANGE_KEYS, "deleted"], select(*columns).where(*criteria))
+
+# -------------------- 🟡 VERSION COUNTERS --------------------
+#
+# `desk_hooks` only reaches the process that made a change. Writes the other
+# workers' in-memory indexes cannot follow through the change log also bump
+# a counter in `sync_state`, in the same transaction: bulk desk loads
+# (seed_db, the admin desk import) the layout version, reservations and
+# cancellations the reservations version. The indexes compare them on use
+# and rebuild when one has moved.
+
+def start_version(conn, key: str):
+    """ Create a version counter row, once """
+    if not conn.execute(select(SyncState.key).where(SyncState.key == key)).first():
+        conn.execute(insert(SyncState).values(key=key, value=0))
+
+def layout_version():
+    """ SELECT of the current layout version (a primary-key lookup) """
+    return select(SyncState.value).where(SyncState.key == LAYOUT_KEY)
+
+def bump_layout_version():
+    """ UPDATE advancing the layout version; execute it in the transaction that loads the desks """
+    return update(SyncState).where(SyncState.key == LAYOUT_KEY).values(value=SyncState.value + 1)
+
+def reservations_version():
+    """ SELECT of the current reservations version (a primary-key lookup) """
+    return select(SyncState.value).where(SyncState.key == RESERVATIONS_KEY)
+
+def bump_reservations_version():
+    """ UPDATE advancing the reservations version; execute it in the transaction that adds or removes reservations """
+    return update(SyncState).where(SyncState.key == RESERVATIONS_KEY).values(value=SyncState.value + 1)
+
+# -------------------- 🔵 READING DELTAS --------------------
+
+def high_water_mark(db: Session):
+    """ The newest seq a reader may move past without ever skipping a change.
+
+    SQLite commits in seq order, so that is simply the newest seq. On other
+    databases a transaction can commit after one that took a higher seq, so
+    seqs younger than `Config.CHANGE_LOG_SETTLE_SECONDS` are held back.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return db.query(func.max(DeskChange.seq)).scalar() or 0
+    settled = datetime.utcnow() - timedelta(seconds=Config.CHANGE_LOG_SETTLE_SECONDS)
+    return db.query(DeskChange.seq).filter(DeskChange.changed_at < settled).order_by(DeskChange.seq.desc()).limit(1).scalar() or 0
+
+def compacted_through(db: Session):
+    return db.query(SyncState.value).filter(SyncState.key == COMPACTED_KEY).scalar() or 0
+
+def _latest(rows):
+    """ Keep only each desk's newest state from change-log rows in seq order (desk_id first), in change order """
+    latest = {}
+    for row in rows:
+        latest.pop(row[0], None)
+        latest[row[0]] = row
+    return list(latest.values())
+
+def changes_after(db: Session, since: int, through: int):
+    """ (desk_id, floor, tech_area, status, username, deleted) for each desk changed in (since, through].
+
+    The in-memory indexes replay these to catch up with writes made by other
+    workers. Returns None when compaction already dropped part of that range,
+    so the caller must rebuild instead.
+    """
+    if since < compacted_through(db):
+        return None
+    rows = db.execute(
+        select(DeskChange.desk_id, DeskChange.floor, DeskChange.tech_area, DeskChange.status, User.username, DeskChange.deleted)
+        .outerjoin(User, User.id == DeskChange.user_id)
+        .where(DeskChange.seq > since, DeskChange.seq <= through)
+        .order_by(DeskChange.seq)
+    ).all()
+    return _latest(rows)
+
+def floor_delta(db: Session, floor: str, since: int):
+    """ Desks on `floor` changed after `since`.
+
+    `since=0` (a client's first sync) and any `since` below the compaction
+    watermark get the whole floor, flagged `full`, plus the current `seq`.
+    `seq` is `high_water_mark`, so changes after it (already in a full floor,
+    or not yet settled) are sent again by the next delta.
+    Desks removed from the floor come back with `deleted: true`.
+    """
+    seq = high_water_mark(db)
+    if since == 0 or since < compacted_through(db):
+        rows = db.query(*DESK_COLUMNS).filter(Desk.floor == floor).all()
+        return {"full": True, "since": since, "seq": seq, "desks": [dict(zip(DESK_KEYS, row)) for row in rows]}
+
+    rows = (
+        db.query(*[getattr(DeskChange, key) for key in CHANGE_KEYS], DeskChange.deleted)
+        .filter(DeskChange.floor == floor, DeskChange.seq > since, DeskChange.seq <= seq)
+        .order_by(DeskChange.seq)
+        .all()
+    )
+    desks = [dict(zip((*CHANGE_KEYS, "deleted"), row)) for row in _latest(rows)]
+    return {"full": False, "since": since, "seq": seq, "desks": desks}
+
+# -------------------- 🔴 COMPACTION --------------------
+
+def compact_desk_changes(db: Session, max_age_hours: float = None):
+    """ Delete log entries older than the retention window and advance the compaction watermark.
+
+    Clients whose `since` falls below the watermark get a full floor instead
+    of a delta, so no client can silently miss a change.
+    """
+    max_age_hours = Config.CHANGE_LOG_RETENTION_HOURS if max_age_hours is None else max_age_hours
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+
+    through = db.query(func.max(DeskChange.seq)).filter(DeskChange.changed_at < cutoff).scalar()
+    if not through:
+        return {"deleted": 0, "compacted_through": compacted_through(db)}
+
+    deleted = db.execute(delete(DeskChange).where(DeskChange.seq <= through)).rowcount
+    state = db.get(SyncState, COMPACTED_KEY)
+    if state is None:
+        db.add(SyncState(key=COMPACTED_KEY, value=through))
+    else:
+        state.value = max(state.value, through)
+    db.commit()
+    return {"deleted": deleted, "compacted_through": through}
@@ -1,10 +1,116 @@
+""" Settings for the API process, read from the environment and `.env`.
+
+`Config` is the one settings object. Each attribute is read from the
+environment on first access and then cached on the class, and `.env` is
+loaded just before the first read, so importing this module costs nothing
+and a test or benchmark may set environment variables up to the moment a
+setting is first used.
+"""
 import os
+import threading
 from dotenv import load_dotenv
 
-# Load .env file
-load_dotenv()
+_dotenv_lock = threading.Lock()
+_dotenv_loaded = False
+
+def _load_dotenv():
+    global _dotenv_loaded
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            load_dotenv()  # Finds the .env next to (or above) this file; never overrides real variables
+            _dotenv_loaded = True
+
+def flag(value: str):
+    return value.lower() == "true"
+
+class setting:
+    """ A `Config` attribute parsed from the environment variable of the same name on first access """
+
+    def __init__(self, default: str, parse=str, fallback: str = None):
+        self.default = default
+        self.parse = parse
+        self.fallback = fallback  # Older variable name still honoured
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        _load_dotenv()
+        default = os.getenv(self.fallback, self.default) if self.fallback else self.default
+        value = self.parse(os.getenv(self.name, default))
+        setattr(owner, self.name, value)  # Later reads are plain class attribute lookups
+        return value
 
 class Config:
-    SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")  # Fallback for security
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
-    DEBUG = os.getenv("DEBUG", "True").lower() == "true"
+    SECRET_KEY = setting("myjwtsecret")  # Signs access tokens; always set it outside development
+    DATABASE_URL = setting("sqlite:///./database.db")
+    DEBUG = setting("True", flag)
+
+    # Startup (main.py). With AUTO_MIGRATE off the schema is not checked at boot;
+    # run `python migrations.py` as a deploy step instead.
+    AUTO_MIGRATE = setting("True", flag)
+    WARM_CACHES = setting("True", flag)  # Build the availability bitmaps in the background after startup
+
+    # Decoded-token cache used by the shared auth dependency
+    AUTH_CACHE_ENABLED = setting("True", flag)
+    AUTH_CACHE_TTL = setting("5", int)  # Seconds; invalidation is per process, so other workers may lag by this much
+    AUTH_CACHE_SIZE = setting("10000", int)  # Max cached tokens
+
+    # Bulk import (/admin/load-users, /admin/load-desks)
+    IMPORT_BATCH_SIZE = setting("1000", int)  # Rows per bulk INSERT
+
+    # Connection pooling (ignored for in-memory SQLite). Size + overflow should cover
+    # FastAPI's 40-thread sync threadpool, or threads waiting on the pool starve the
+    # threads that would return connections to it.
+    DB_POOL_SIZE = setting("10", int)
+    DB_MAX_OVERFLOW = setting("30", int)
+    DB_POOL_TIMEOUT = setting("30", int)  # Seconds to wait for a connection
+    DB_POOL_RECYCLE = setting("1800", int)  # Seconds before a connection is replaced
+
+    # Serve the hot routes from async handlers on an async engine
+    ASYNC_DB = setting("False", flag)
+    ASYNC_DATABASE_URL = setting("")  # Derived from DATABASE_URL when empty
+
+    # Seconds a cached /desk/desks/{floor} snapshot may be served; 0 = for as long as the
+    # floor's newest desk_changes.seq is unchanged. Every read checks that seq, so writes
+    # from other workers and seed_db are seen; only raw SQL that skips the change log is not.
+    FLOOR_CACHE_TTL = setting("0", float)
+
+    # Most desks one batch booking (/desk/batch-update) or admin bulk status change may name
+    DESK_BATCH_MAX = setting("500", int)
+
+    # Desk change log used by /desk/desks/{floor}?since=<seq>
+    CHANGE_LOG_RETENTION_HOURS = setting("24", float)
+    # Seconds a change must be old before `seq` moves past it, so a transaction that commits
+    # late is never skipped (not used on SQLite, which commits in seq order)
+    CHANGE_LOG_SETTLE_SECONDS = setting("2", float)
+
+    # Server-sent desk events (/desk/stream/{floor})
+    STREAM_QUEUE_SIZE = setting("100", int)  # Events buffered per subscriber before it is dropped
+    STREAM_KEEPALIVE = setting("15", float)  # Seconds between keepalive comments
+
+    # Occupancy analytics (analytics.py, /analytics). Events younger than the settle delay are
+    # left for the next run, so a transaction that commits late is still folded in.
+    ANALYTICS_INTERVAL = setting("60", float)  # Seconds between aggregator runs; 0 = disabled
+    ANALYTICS_SETTLE_SECONDS = setting("5", float)
+    ANALYTICS_BATCH_SIZE = setting("5000", int)  # Events folded per run
+
+    # Time-windowed reservations (/reservations). Capping the duration bounds every overlap
+    # probe to reservations starting within RESERVATION_MAX_HOURS of the requested window.
+    RESERVATION_MAX_HOURS = setting("12", float)
+    RESERVATION_MAX_DAYS_AHEAD = setting("30", int)
+
+    # Width of a time slot in the in-memory occupancy engine (/desk/available)
+    OCCUPANCY_SLOT_MINUTES = setting("30", int)
+
+    # Request metrics and SQL accounting (/metrics)
+    METRICS_ENABLED = setting("True", flag)
+    QUERY_BUDGET = setting("10", int)  # Statements per request before it is logged as a likely N+1
+    SLOW_QUERY_MS = setting("200", float)  # Statements slower than this are logged (SQL text only, never parameters)
+
+    # Password hashing (hashing.py). Jobs beyond HASH_WORKERS + HASH_QUEUE_SIZE get an immediate 503.
+    HASH_METHOD = setting("scrypt")  # Any werkzeug method, e.g. "scrypt:16384:8:1" or "pbkdf2:sha256:600000"
+    HASH_WORKERS = setting("0", int, fallback="IMPORT_HASH_WORKERS")  # Hashing processes; 0 = one per CPU
+    HASH_QUEUE_SIZE = setting("0", int)  # Jobs allowed to wait for a worker; 0 = one per worker
+    HASH_PROCESS_POOL = setting("True", flag)  # False hashes on the calling thread
+    HASH_BULK_SLOTS = setting("0", int)  # Slots a bulk import may hold at once; 0 = half the workers
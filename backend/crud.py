@@ -1,6 +1,12 @@
+from datetime import datetime
+from sqlalchemy import or_, update
 from sqlalchemy.orm import Session
 from models import User, Desk
-from werkzeug.security import generate_password_hash, check_password_hash
+from hashing import password_hasher
+from desk_hooks import desk_hooks
+from reservations import cancel_user_reservations, reserved_now
+from changelog import log_desk_changes, bump_reservations_version
+from auth import invalidate_user
 
 # -------------------- 🟢 USER CRUD OPERATIONS --------------------
 
@@ -14,7 +20,7 @@ def get_user_by_id(db: Session, user_id: int):
 
 def create_user(db: Session, username: str, password: str, tech_area: str, role="user"):
     """Create a new user with hashed password."""
-    hashed_password = generate_password_hash(password)
+    hashed_password = password_hasher.hash(password)
     user = User(username=username, password_hash=hashed_password, tech_area=tech_area, role=role)
     db.add(user)
     db.commit()
@@ -25,8 +31,9 @@ def update_user_password(db: Session, user_id: int, new_password: str):
     """Update a user's password."""
     user = get_user_by_id(db, user_id)
     if user:
-        user.password_hash = generate_password_hash(new_password)
+        user.password_hash = password_hasher.hash(new_password)
         db.commit()
+        invalidate_user(user_id)
         return True
     return False
 
@@ -36,17 +43,28 @@ def update_user_tech_area(db: Session, user_id: int, new_tech_area: str):
     if user:
         user.tech_area = new_tech_area
         db.commit()
+        invalidate_user(user_id)
         return True
     return False
 
 def delete_user(db: Session, user_id: int):
-    """Delete a user from the database."""
+    """Delete a user: clear their desks (logged in the change feed), cancel their reservations, then drop caches."""
     user = get_user_by_id(db, user_id)
-    if user:
-        db.delete(user)
-        db.commit()
-        return True
-    return False
+    if not user:
+        return False
+    held = db.execute(
+        update(Desk).where(Desk.user_id == user_id).values(user_id=None)
+        .returning(Desk.desk_id).execution_options(synchronize_session=False)
+    ).scalars().all()
+    if held:
+        db.execute(log_desk_changes(Desk.desk_id.in_(held)))
+    if db.execute(cancel_user_reservations(user_id)).rowcount:
+        db.execute(bump_reservations_version())
+    db.delete(user)
+    db.commit()
+    invalidate_user(user_id)
+    desk_hooks.user_removed(user_id, user.username)
+    return True
 
 def get_users_by_tech_area(db: Session, tech_area: str):
     """Retrieve all users belonging to a specific tech area."""
@@ -62,21 +80,82 @@ def get_desks_by_tech_area(db: Session, tech_area: str):
     """Retrieve all desks for a given tech area."""
     return db.query(Desk).filter(Desk.tech_area == tech_area).all()
 
+def desk_transition(desk_id: str, status: str, user_id: int = None, floor: str = None, tech_area: str = None, now: datetime = None):
+    """Build the conditional UPDATE that moves a desk to `status` without locking.
+
+    Booking only matches an available desk (in `tech_area` when given) that
+    nobody else has reserved at `now` (default: the current time), and
+    releasing only matches an occupied desk held by `user_id` (any holder when
+    None). The statement returns the changed desk's (desk_id, tech_area): one
+    row on success, none on conflict.
+    """
+    stmt = update(Desk).where(Desk.desk_id == desk_id).returning(Desk.desk_id, Desk.tech_area).execution_options(synchronize_session=False)
+    if floor is not None:
+        stmt = stmt.where(Desk.floor == floor)
+    if status == "occupied":
+        stmt = stmt.where(Desk.status == "available", ~reserved_now(now or datetime.utcnow(), user_id))
+        if tech_area is not None:
+            stmt = stmt.where(Desk.tech_area == tech_area)
+        return stmt.values(status="occupied", user_id=user_id)
+    stmt = stmt.where(Desk.status == "occupied")
+    if user_id is not None:
+        stmt = stmt.where(Desk.user_id == user_id)
+    return stmt.values(status="available", user_id=None)
+
+def desk_batch_transition(desk_ids, status: str, user_id: int, floor: str, tech_area: str = None, now: datetime = None):
+    """Build one conditional UPDATE moving every desk in `desk_ids` on `floor` to `status` for `user_id`.
+
+    Booking matches desks that are free or already the user's, skipping
+    desks someone else has reserved at `now`; releasing matches only desks
+    the user holds. The statement returns one (desk_id, tech_area) row per
+    desk exactly when the whole batch applies; anything less means the
+    caller must roll back.
+    """
+    stmt = (
+        update(Desk)
+        .where(Desk.floor == floor, Desk.desk_id.in_(desk_ids))
+        .returning(Desk.desk_id, Desk.tech_area)
+        .execution_options(synchronize_session=False)
+    )
+    if status == "occupied":
+        stmt = stmt.where(or_(Desk.status == "available", Desk.user_id == user_id), ~reserved_now(now or datetime.utcnow(), user_id))
+        if tech_area is not None:
+            stmt = stmt.where(Desk.tech_area == tech_area)
+        return stmt.values(status="occupied", user_id=user_id)
+    return stmt.where(Desk.user_id == user_id).values(status="available", user_id=None)
+
+def bulk_desk_status(floor: str, status: str, desk_ids=None):
+    """Build the set-based UPDATE an admin uses to move desks on `floor` (all, or `desk_ids`) to `status` with no user.
+
+    Only rows that actually change are touched; it returns their (desk_id, tech_area).
+    """
+    stmt = update(Desk).where(Desk.floor == floor, or_(Desk.status != status, Desk.status.is_(None), Desk.user_id.is_not(None)))
+    if desk_ids is not None:
+        stmt = stmt.where(Desk.desk_id.in_(desk_ids))
+    return (
+        stmt.values(status=status, user_id=None)
+        .returning(Desk.desk_id, Desk.tech_area)
+        .execution_options(synchronize_session=False)
+    )
+
 def update_desk_status(db: Session, desk_id: str, status: str, user_id: int = None):
-    """Update the status of a desk (available/occupied)."""
+    """Atomically book or release a desk; returns None if it is missing or the update lost a race."""
+    if not db.execute(desk_transition(desk_id, status, user_id)).all():
+        db.rollback()
+        return None
+    db.execute(log_desk_changes(Desk.desk_id == desk_id))
+    db.commit()
+
     desk = db.query(Desk).filter(Desk.desk_id == desk_id).first()
-    if desk:
-        desk.status = status
-        desk.user_id = user_id if status == "occupied" else None
-        db.commit()
-        return desk
-    return None
+    username = desk.assigned_user.username if desk.assigned_user else None
+    desk_hooks.desk_changed(desk.desk_id, desk.floor, desk.tech_area, desk.status, username)
+    return desk
 
 def reset_all_desks_on_floor(db: Session, floor: str):
     """Reset all desks on a given floor to available status."""
-    desks = db.query(Desk).filter(Desk.floor == floor).all()
-    for desk in desks:
-        desk.status = "available"
-        desk.user_id = None
+    changed = [desk_id for desk_id, _ in db.execute(bulk_desk_status(floor, "available"))]
+    if changed:
+        db.execute(log_desk_changes(Desk.desk_id.in_(changed)))
     db.commit()
+    desk_hooks.floor_reset(floor)
     return True
@@ -2,11 +2,46 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import Config
+from metrics import instrument_engine
 
 # Use DATABASE_URL from config.py
 DATABASE_URL = Config.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Async drivers substituted for the plain URL schemes
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def engine_options(url: str):
+    """ Engine keyword arguments shared by the sync and async engines """
+    options = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            return options  # In-memory SQLite uses a single-connection pool
+    options.update(
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=not url.startswith("sqlite"),
+    )
+    return options
+
+def to_async_url(url: str):
+    """ Map a sync database URL onto its async driver (sqlite -> aiosqlite, postgresql -> asyncpg) """
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        dialect, driver = scheme.split("+", 1)
+        if driver in ("aiosqlite", "asyncpg", "aiomysql", "asyncmy", "psycopg_async"):
+            return url
+        scheme = dialect
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+engine = instrument_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -18,3 +53,26 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# -------------------- ⚡ ASYNC ENGINE --------------------
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_engine():
+    """ Build the async engine on first use so sync-only deployments never import its driver """
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = Config.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+        _async_engine = create_async_engine(url, **engine_options(url))
+        instrument_engine(_async_engine.sync_engine)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+# Dependency for getting an async DB session
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,77 @@
+""" Fan-out point for desk occupancy changes.
+
+Every mutation path (desk routes, admin routes, crud helpers, imports) calls
+one of the `desk_hooks` methods after its transaction commits. In-process
+caches subclass `DeskListener` and register themselves, so a new cache never
+needs another call added to each route.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeskListener:
+    """ Base class for in-process consumers of desk changes; every hook is a no-op by default """
+
+    def desk_changed(self, desk_id: str, floor: str, tech_area: str, status: str, username: str = None):
+        pass
+
+    def floor_reset(self, floor: str):
+        pass
+
+    def desks_loaded(self, floors):
+        pass
+
+    def user_removed(self, user_id: int, username: str):
+        pass
+
+    def reserved(self, reservation_id: int, desk_id: str, floor: str, start_at, end_at):
+        pass
+
+    def reservation_cancelled(self, reservation_id: int, desk_id: str, floor: str):
+        pass
+
+
+class DeskHooks:
+    def __init__(self):
+        self._listeners = []
+
+    def register(self, listener: DeskListener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+        return listener
+
+    def _emit(self, hook, *args):
+        for listener in self._listeners:
+            try:
+                getattr(listener, hook)(*args)
+            except Exception:
+                # A broken cache must never fail a write that has already committed
+                logger.exception("Desk listener %r failed in %s", listener, hook)
+
+    def desk_changed(self, desk_id: str, floor: str, tech_area: str, status: str, username: str = None):
+        """ A single desk was booked (`username` set) or released """
+        self._emit("desk_changed", desk_id, floor, tech_area, status, username)
+
+    def floor_reset(self, floor: str):
+        """ Every desk on `floor` was set back to available """
+        self._emit("floor_reset", floor)
+
+    def desks_loaded(self, floors):
+        """ Desks were bulk-inserted on the given floors """
+        self._emit("desks_loaded", set(floors))
+
+    def user_removed(self, user_id: int, username: str):
+        """ A user was deleted; any desk they held lost its user_id """
+        self._emit("user_removed", user_id, username)
+
+    def reserved(self, reservation_id: int, desk_id: str, floor: str, start_at, end_at):
+        """ A desk was reserved for [start_at, end_at) """
+        self._emit("reserved", reservation_id, desk_id, floor, start_at, end_at)
+
+    def reservation_cancelled(self, reservation_id: int, desk_id: str, floor: str):
+        """ A reservation was deleted before it ended """
+        self._emit("reservation_cancelled", reservation_id, desk_id, floor)
+
+
+desk_hooks = DeskHooks()
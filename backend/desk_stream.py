@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+from config import Config
+from desk_hooks import DeskListener, desk_hooks
+
+DROPPED = object()  # Sentinel queued when a subscriber falls too far behind
+
+# -------------------- 🟢 SUBSCRIPTIONS --------------------
+
+class Subscription:
+    """ One connected client: a bounded queue on the event loop that owns the connection """
+
+    __slots__ = ("loop", "queue", "floor", "tech_area", "dropped")
+
+    def __init__(self, loop, floor: str, tech_area: str = None, maxsize: int = 100):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.floor = floor
+        self.tech_area = tech_area
+        self.dropped = False
+
+    def wants(self, event: dict):
+        if event.get("floor") not in (None, self.floor):
+            return False
+        return not (self.tech_area and event.get("tech_area") not in (None, self.tech_area))
+
+class DeskEventBroker(DeskListener):
+    """ In-process fan-out of desk changes to per-floor subscribers.
+
+    Mutation paths run on threadpool threads as well as on the event loop, so
+    `publish` never touches a queue directly; it hands each event to the
+    subscriber's loop with `call_soon_threadsafe`. A subscriber whose queue is
+    full is dropped instead of buffering without bound; it receives a final
+    `dropped` event and should resync with `/desk/desks/{floor}?since=`.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.dropped_total = 0
+        self._lock = threading.Lock()
+        self._subscribers = {}  # floor -> set of Subscription
+
+    def subscribe(self, floor: str, tech_area: str = None):
+        """ Register a subscriber; must be called from the event loop that will consume it """
+        subscription = Subscription(asyncio.get_running_loop(), floor, tech_area, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(floor, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.floor)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.floor]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, event: dict):
+        """ Deliver `event` to every matching subscriber; safe to call from any thread """
+        floor = event.get("floor")
+        with self._lock:
+            if floor is None:
+                targets = [s for subscribers in self._subscribers.values() for s in subscribers]
+            else:
+                targets = list(self._subscribers.get(floor, ()))
+        for subscription in targets:
+            if subscription.wants(event):
+                try:
+                    subscription.loop.call_soon_threadsafe(self._offer, subscription, event)
+                except RuntimeError:
+                    self.unsubscribe(subscription)  # Its event loop has already closed
+
+    def _offer(self, subscription: Subscription, event: dict):
+        if subscription.dropped:
+            return
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            subscription.dropped = True
+            self.dropped_total += 1
+            self.unsubscribe(subscription)
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(DROPPED)
+
+    # Listener hooks fired by the mutation paths
+
+    def desk_changed(self, desk_id, floor, tech_area, status, username=None):
+        self.publish({"type": "desk", "floor": floor, "desk_id": desk_id, "status": status, "user": username, "tech_area": tech_area})
+
+    def floor_reset(self, floor):
+        self.publish({"type": "reset", "floor": floor})
+
+    def desks_loaded(self, floors):
+        for floor in floors:
+            self.publish({"type": "reload", "floor": floor})
+
+    def user_removed(self, user_id, username):
+        self.publish({"type": "user_removed", "user": username})
+
+
+desk_broker = desk_hooks.register(DeskEventBroker(Config.STREAM_QUEUE_SIZE))
+
+# -------------------- 🔵 SERVER-SENT EVENTS --------------------
+
+def format_sse(event: dict):
+    """ Encode one event as an SSE frame; `floor` is implied by the subscription and left out """
+    payload = {key: value for key, value in event.items() if key not in ("type", "floor") and value is not None}
+    return f"event: {event['type']}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+async def sse_events(request, subscription: Subscription, keepalive: float = None):
+    """ Yield SSE frames for `subscription` until the client disconnects or is dropped """
+    keepalive = keepalive or Config.STREAM_KEEPALIVE
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            if event is DROPPED:
+                yield "event: dropped\ndata: {}\n\n"
+                break
+            yield format_sse(event)
+    finally:
+        desk_broker.unsubscribe(subscription)
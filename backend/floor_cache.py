@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import time
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from config import Config
+from models import Desk, DeskChange
+from desk_hooks import DeskListener, desk_hooks
+from responses import dumps
+
+# Columns served by /desk/desks/{floor}, in response key order
+DESK_COLUMNS = (Desk.id, Desk.desk_id, Desk.floor, Desk.status, Desk.user_id, Desk.tech_area)
+DESK_KEYS = tuple(column.key for column in DESK_COLUMNS)
+
+def floor_seq(floor: str):
+    """ SELECT of the floor's newest change-log seq: one probe of ix_desk_changes_floor_seq """
+    return select(func.max(DeskChange.seq)).where(DeskChange.floor == floor)
+
+# -------------------- 🟢 FLOOR SNAPSHOTS --------------------
+
+class FloorSnapshot:
+    """ Pre-serialized JSON for one floor plus the strong ETag that identifies it """
+
+    __slots__ = ("version", "seq", "body", "etag", "built_at")
+
+    def __init__(self, version: int, seq: int, body: bytes):
+        self.version = version
+        self.seq = seq  # The floor's newest desk_changes.seq when it was built
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        self.built_at = time.monotonic()
+
+class FloorSnapshotCache(DeskListener):
+    """ Per-floor cache of serialized desk listings with a version counter.
+
+    Each local mutation bumps the floor's version and drops its snapshot. A
+    reader that built a snapshot from an older version will not store it, so
+    a concurrent write can never be overwritten by stale bytes. Writes made by
+    other workers or by seed_db are caught through the change log: a snapshot
+    is only served while the floor's newest `desk_changes.seq` (see
+    `floor_seq`) still matches the one it was built at. The ETag is a content
+    hash, so workers holding the same data agree on it.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl  # Seconds; 0 keeps snapshots for as long as the floor's seq is unchanged
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._snapshots = {}
+
+    def get(self, floor: str, seq: int):
+        """ The cached snapshot if it was built at the floor's current change-log `seq` """
+        snapshot = self._snapshots.get(floor)
+        if snapshot is None or snapshot.seq != seq:
+            return None
+        if self.ttl and time.monotonic() - snapshot.built_at > self.ttl:
+            return None
+        return snapshot
+
+    def version(self, floor: str):
+        return self._versions.get(floor, 0)
+
+    def store(self, floor: str, version: int, seq: int, rows):
+        """ Serialize `rows` (tuples in DESK_COLUMNS order, read after `seq`) and cache them if nothing changed meanwhile """
+        body = dumps([dict(zip(DESK_KEYS, row)) for row in rows])
+        snapshot = FloorSnapshot(version, seq, body)
+        with self._lock:
+            if self._versions.get(floor, 0) == version:
+                self._snapshots[floor] = snapshot
+        return snapshot
+
+    def bump(self, floor: str):
+        with self._lock:
+            self._versions[floor] = self._versions.get(floor, 0) + 1
+            self._snapshots.pop(floor, None)
+
+    def bump_all(self):
+        with self._lock:
+            for floor in set(self._versions) | set(self._snapshots):
+                self._versions[floor] = self._versions.get(floor, 0) + 1
+            self._snapshots.clear()
+
+    # Listener hooks fired by the mutation paths
+
+    def desk_changed(self, desk_id, floor, tech_area, status, username=None):
+        self.bump(floor)
+
+    def floor_reset(self, floor):
+        self.bump(floor)
+
+    def desks_loaded(self, floors):
+        for floor in floors:
+            self.bump(floor)
+
+    def user_removed(self, user_id, username):
+        self.bump_all()  # The user's desks (on any floor) lost their user_id
+
+
+floor_cache = desk_hooks.register(FloorSnapshotCache(Config.FLOOR_CACHE_TTL))
+
+# -------------------- 🔵 CONDITIONAL RESPONSES --------------------
+
+def snapshot_response(request: Request, snapshot: FloorSnapshot):
+    """ 304 when the client's If-None-Match already names this snapshot, else the cached bytes """
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if snapshot.etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
@@ -0,0 +1,149 @@
+""" Password hashing off the request threads, with admission control.
+
+Hashing is deliberately CPU-heavy. Every call site (login, password updates,
+user creation, bulk import) goes through `password_hasher`, which runs the
+work on a dedicated process pool and admits at most `workers + queue` jobs
+at a time. When every slot is taken the caller gets an immediate 503 with
+`Retry-After` instead of tying up a threadpool thread, so a 9am login storm
+cannot starve floor listings and other cheap endpoints. A bulk import holds
+only a share of the slots, so it cannot starve logins either.
+
+The hash method (and so its cost) comes from `Config.HASH_METHOD`; hashes
+created with another method or cost are upgraded on the next successful
+login (see `needs_rehash`). werkzeug is imported on first use, so a worker
+that never hashes never pays for it.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from fastapi import HTTPException
+from config import Config
+
+BULK_CHUNK = 16  # Passwords per bulk job; small, so a login never waits long behind one
+
+class HashingBusy(HTTPException):
+    """ Every hashing slot is taken; the client should retry shortly """
+
+    def __init__(self):
+        super().__init__(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+def canonical_method(method: str):
+    """ Spell out werkzeug's defaults, e.g. "scrypt" -> "scrypt:32768:8:1", to compare against stored hashes """
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    if name == "pbkdf2":
+        from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+        hash_name = args[0] if args else "sha256"
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+def _hash(password: str, method: str):
+    from werkzeug.security import generate_password_hash
+
+    return generate_password_hash(password, method)
+
+
+def _hash_chunk(passwords, method: str):
+    return [_hash(password, method) for password in passwords]
+
+
+def _check(password_hash: str, password: str):
+    from werkzeug.security import check_password_hash
+
+    return check_password_hash(password_hash, password)
+
+# -------------------- 🟢 HASHING SERVICE --------------------
+
+class PasswordHasher:
+    """ Bounded front end to a lazily started process pool """
+
+    def __init__(self, method: str = "scrypt", workers: int = 0, queue_size: int = 0, use_pool: bool = True, bulk_slots: int = 0):
+        self.method = method
+        self.method_id = canonical_method(method)
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + (queue_size or self.workers)
+        self.bulk_slots = min(bulk_slots or max(1, self.workers // 2), self.capacity - 1)
+        self.use_pool = use_pool
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_slots)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # Not fork: the pool starts lazily inside a threaded server, and a forked
+                # child would inherit the parent's locks and open DB connections
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                context = multiprocessing.get_context(method)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def _run(self, fn, *args, wait: bool = False):
+        """ Admit one job or raise HashingBusy (with `wait`, block for a slot); returns a concurrent.futures.Future """
+        if not self._slots.acquire(blocking=wait):
+            self.rejected += 1
+            raise HashingBusy()
+        try:
+            if self.use_pool:
+                future = self._get_pool().submit(fn, *args)
+            else:
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str):
+        return self._run(_hash, password, self.method).result()
+
+    def verify(self, password_hash: str, password: str):
+        return self._run(_check, password_hash, password).result()
+
+    async def hash_async(self, password: str):
+        return await asyncio.wrap_future(self._run(_hash, password, self.method))
+
+    async def verify_async(self, password_hash: str, password: str):
+        return await asyncio.wrap_future(self._run(_check, password_hash, password))
+
+    def hash_many(self, passwords):
+        """ Hash a batch (bulk import), preserving order.
+
+        Chunks of `BULK_CHUNK` go through the same admission as single jobs,
+        but bulk work holds at most `bulk_slots` slots at once and waits for a
+        slot instead of failing, so an import always leaves the rest to logins.
+        """
+        if len(passwords) < 2 or not self.use_pool:
+            return _hash_chunk(passwords, self.method)
+        futures = []
+        for start in range(0, len(passwords), BULK_CHUNK):
+            self._bulk_slots.acquire()
+            try:
+                future = self._run(_hash_chunk, passwords[start:start + BULK_CHUNK], self.method, wait=True)
+            except BaseException:
+                self._bulk_slots.release()
+                raise
+            future.add_done_callback(lambda _: self._bulk_slots.release())
+            futures.append(future)
+        return [password_hash for future in futures for password_hash in future.result()]
+
+    def needs_rehash(self, password_hash: str):
+        """ True when `password_hash` was made with a different method or cost than the configured one """
+        return password_hash.split("$", 1)[0] != self.method_id
+
+
+password_hasher = PasswordHasher(
+    Config.HASH_METHOD, Config.HASH_WORKERS, Config.HASH_QUEUE_SIZE, Config.HASH_PROCESS_POOL, Config.HASH_BULK_SLOTS
+)
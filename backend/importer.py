@@ -0,0 +1,254 @@
+import codecs
+import json
+import re
+import time
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from config import Config
+from models import User, Desk
+from changelog import log_desk_changes, bump_layout_version
+from hashing import password_hasher
+
+CHUNK_SIZE = 64 * 1024
+LOOKUP_CHUNK = 5000  # Usernames per IN (...) lookup, well under SQLite's bound-parameter limit
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+# -------------------- 🟢 INCREMENTAL JSON PARSING --------------------
+
+def iter_json_section(fileobj, key: str, chunk_size: int = CHUNK_SIZE):
+    """ Incrementally yield the members of the top-level `key` container.
+
+    For `{"users": [ {...}, {...} ]}` this yields each list item; for
+    `{"desks": {"id": {...}, ...}}` it yields `(id, value)` pairs. Only one
+    member is held in memory at a time besides the current read chunk.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def fill():
+        nonlocal buf, pos, eof
+        raw = fileobj.read(chunk_size)
+        chunk = utf8.decode(raw, final=not raw) if isinstance(raw, bytes) else raw
+        if not raw:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+                if end < len(buf) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r} in '{key}' section")
+        pos += 1
+        return buf[pos - 1]
+
+    # Locate `"<key>": [` or `"<key>": {`
+    opener = re.compile(r'"%s"\s*:\s*([\[{])' % re.escape(key))
+    while True:
+        match = opener.search(buf, pos)
+        if match:
+            container = match.group(1)
+            pos = match.end()
+            break
+        if eof:
+            raise ValueError(f"Missing '{key}' section")
+        fill()
+
+    closer = "]" if container == "[" else "}"
+    skip_ws()
+    if pos < len(buf) and buf[pos] == closer:
+        return
+    while True:
+        if container == "[":
+            skip_ws()
+            yield decode()
+        else:
+            skip_ws()
+            member_key = decode()
+            expect(":")
+            skip_ws()
+            yield member_key, decode()
+        if expect("," + closer) == closer:
+            return
+
+# -------------------- 🔵 BATCHED IMPORTS --------------------
+
+class ImportReport:
+    """ Counters and per-phase timings for one import run """
+
+    def __init__(self):
+        self.inserted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self.timings = {}
+        self.floors = set()  # Floors that received new desks
+
+    def timed(self, phase, started):
+        self.timings[phase] = self.timings.get(phase, 0.0) + (time.perf_counter() - started)
+
+    def fail(self, count, reason):
+        self.failed += count
+        if len(self.errors) < 20:
+            self.errors.append(reason)
+
+    def as_dict(self):
+        return {
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "timings_ms": {phase: round(seconds * 1000, 2) for phase, seconds in self.timings.items()},
+        }
+
+def _timed_iter(items, report, phase):
+    """ Wrap a generator so the time spent producing items is charged to `phase` """
+    iterator = iter(items)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            report.timed(phase, started)
+            return
+        report.timed(phase, started)
+        yield item
+
+def _insert_batch(db: Session, model, rows, report):
+    started = time.perf_counter()
+    try:
+        db.execute(insert(model), rows)
+        if model is Desk:
+            db.execute(log_desk_changes(Desk.desk_id.in_([row["desk_id"] for row in rows])))
+            db.execute(bump_layout_version())  # Other workers' indexes rebuild on it (see changelog.py)
+        db.commit()
+        report.inserted += len(rows)
+        if model is Desk:
+            report.floors.update(row["floor"] for row in rows)
+    except Exception as e:
+        db.rollback()
+        report.fail(len(rows), f"Batch of {len(rows)} rows failed: {e}")
+    report.timed("insert", started)
+
+def import_users(db: Session, fileobj, batch_size: int = None):
+    """ Stream users from a `{"users": [...]}` upload into the database """
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    report = ImportReport()
+    pending = {}  # username -> record; duplicates within the batch are skipped here
+
+    def flush():
+        # Usernames already in the table are looked up per batch, never all at once; a
+        # duplicate from an earlier batch is found here because that batch is committed
+        started = time.perf_counter()
+        names = list(pending)
+        for start in range(0, len(names), LOOKUP_CHUNK):
+            for (username,) in db.query(User.username).filter(User.username.in_(names[start:start + LOOKUP_CHUNK])):
+                del pending[username]
+                report.skipped += 1
+        report.timed("lookup", started)
+
+        users = list(pending.values())
+        pending.clear()
+        if not users:
+            return
+        started = time.perf_counter()
+        hashes = password_hasher.hash_many([user["password"] for user in users])
+        report.timed("hash", started)
+        rows = [
+            {"username": user["username"], "password_hash": password_hash,
+             "tech_area": user["tech_area"], "role": user.get("role", "user")}
+            for user, password_hash in zip(users, hashes)
+        ]
+        _insert_batch(db, User, rows, report)
+
+    for user in _timed_iter(iter_json_section(fileobj, "users"), report, "parse"):
+        missing = [field for field in ("username", "password", "tech_area") if field not in user]
+        if missing:
+            report.fail(1, f"Invalid user record: missing {', '.join(missing)}")
+            continue
+        if user["username"] in pending:
+            report.skipped += 1
+            continue
+        pending[user["username"]] = user
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+    return report
+
+def desk_position(details: dict):
+    """ The optional `x`, `y` and `zone` of a desk record; raises ValueError if they are malformed """
+    x, y, zone = details.get("x"), details.get("y"), details.get("zone") or None
+    if (x is None) != (y is None):
+        raise ValueError("x and y must be given together")
+    if x is not None and not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (x, y)):
+        raise ValueError("x and y must be numbers")
+    if zone is not None and not isinstance(zone, str):
+        raise ValueError("zone must be a string")
+    return {"x": None if x is None else float(x), "y": None if y is None else float(y), "zone": zone}
+
+def import_desks(db: Session, fileobj, batch_size: int = None):
+    """ Stream desks from a `{"desks": {"<desk_id>": {...}}}` upload into the database.
+
+    Each desk needs `floor`, `status` and `tech_area`, and may carry `x`/`y`
+    floor-plan coordinates and a `zone`.
+    """
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    report = ImportReport()
+
+    started = time.perf_counter()
+    existing = {desk_id for (desk_id,) in db.query(Desk.desk_id)}
+    report.timed("prefetch", started)
+
+    pending = []
+    for desk_id, details in _timed_iter(iter_json_section(fileobj, "desks"), report, "parse"):
+        if desk_id in existing:
+            report.skipped += 1
+            continue
+        try:
+            row = {
+                "desk_id": desk_id,
+                "floor": details["floor"],
+                "status": details["status"],
+                "tech_area": details["tech_area"],
+                **desk_position(details),
+            }
+        except (KeyError, TypeError) as e:
+            report.fail(1, f"Invalid desk record '{desk_id}': missing {e}")
+            continue
+        except ValueError as e:
+            report.fail(1, f"Invalid desk record '{desk_id}': {e}")
+            continue
+        existing.add(desk_id)
+        pending.append(row)
+        if len(pending) >= batch_size:
+            _insert_batch(db, Desk, pending, report)
+            pending = []
+    if pending:
+        _insert_batch(db, Desk, pending, report)
+    return report
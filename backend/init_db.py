@@ -1,9 +1,9 @@
-from database import engine, Base
-from models import User, Desk  # Ensure models are imported
+from migrations import upgrade
 
 print("🔄 Initializing database...")
 
-# Create tables in the database
-Base.metadata.create_all(bind=engine)
+# Create or upgrade tables through the versioned migrations
+for version, description in upgrade():
+    print(f"   applied {version}: {description}")
 
 print("✅ Database tables created successfully!")
@@ -0,0 +1,65 @@
+import csv
+import io
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import User
+from floor_cache import DESK_COLUMNS
+from responses import dumps
+
+# Projected columns for the admin user listing; password_hash is never selected
+USER_COLUMNS = (User.id, User.username, User.role, User.tech_area)
+
+EXPORT_PATTERN = "^(json|ndjson|csv)$"
+EXPORT_BATCH_SIZE = 1000
+
+# -------------------- 🟢 KEYSET PAGINATION --------------------
+
+def keyset_page(db: Session, columns, criteria=(), cursor: int = None, limit: int = 100):
+    """ One page ordered by primary key, starting after `cursor` (the previous page's last id).
+
+    Unlike OFFSET paging, the cost of a page does not grow with its depth.
+    """
+    key = columns[0]
+    stmt = select(*columns).where(*criteria).order_by(key).limit(limit + 1)
+    if cursor is not None:
+        stmt = stmt.where(key > cursor)
+    rows = db.execute(stmt).all()
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = items[-1][key.key] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+# -------------------- 🔵 STREAMING EXPORT --------------------
+
+def _export_rows(columns, criteria, fmt: str):
+    """ Yield encoded chunks from a server-side cursor, one batch at a time.
+
+    The generator opens its own session because request-scoped sessions are
+    closed before a streaming body is sent.
+    """
+    names = [column.key for column in columns]
+    stmt = select(*columns).where(*criteria).order_by(columns[0]).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for batch in result.partitions():
+                writer.writerows(batch)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            for batch in result.partitions():
+                yield b"".join(dumps(dict(zip(names, row))) + b"\n" for row in batch)
+    finally:
+        db.close()
+
+def export_response(columns, criteria, fmt: str, name: str):
+    """ StreamingResponse dumping every matching row as NDJSON or CSV in constant memory """
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    return StreamingResponse(_export_rows(columns, tuple(criteria), fmt), media_type=media_type, headers=headers)
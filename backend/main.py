@@ -1,21 +1,86 @@
+""" Desk Management API.
+
+Importing this module is cheap: routers and middleware load in
+`create_app()`, NumPy and werkzeug only when first needed, migrations run in
+the lifespan (a single version check once the schema is current) and the
+occupancy bitmaps warm up in the background. `uvicorn main:app` builds the
+app on first access to `main.app`; `uvicorn main:create_app --factory` does
+the same explicitly.
+"""
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from database import engine, Base
-from auth import auth_router
-from routes.desks import desk_router
-from routes.users import user_router
-from routes.admin import admin_router
-from routes.search import search_router
-
-app = FastAPI(title="Desk Management API")
-
-Base.metadata.create_all(bind=engine)
-
-app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
-app.include_router(user_router, prefix="/users", tags=["User Management"])
-app.include_router(desk_router, prefix="/desk", tags=["Desk Management"])
-app.include_router(admin_router, prefix="/admin", tags=["Admin Controls"])
-app.include_router(search_router, prefix="/search", tags=["Search Functionality"])
-
-@app.get("/")
-def home():
-    return {"message": "Desk Management API is running!"}
+from config import Config
+
+def _warm_caches():
+    from database import SessionLocal
+    from occupancy_engine import occupancy_engine
+
+    db = SessionLocal()
+    try:
+        occupancy_engine.ensure_built(db)  # Warm the availability bitmaps before the first availability query
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if Config.AUTO_MIGRATE:
+        from migrations import upgrade
+
+        await asyncio.to_thread(upgrade)  # Versioned migrations (see migrations.py)
+    tasks = []
+    if Config.WARM_CACHES:
+        tasks.append(asyncio.create_task(asyncio.to_thread(_warm_caches)))  # In the background; requests don't wait for it
+    if Config.ANALYTICS_INTERVAL > 0:
+        from analytics import run_aggregator
+
+        tasks.append(asyncio.create_task(run_aggregator(Config.ANALYTICS_INTERVAL)))
+    yield
+    for task in tasks:
+        task.cancel()
+
+def create_app():
+    """ Build the FastAPI app with every router mounted """
+    from metrics import MetricsMiddleware, metrics_router
+    from auth import auth_router
+    from routes.desks import desk_router
+    from routes.users import user_router
+    from routes.admin import admin_router
+    from routes.search import search_router
+    from routes.reservations import reservation_router
+    from routes.analytics import analytics_router
+
+    app = FastAPI(title="Desk Management API", lifespan=lifespan)
+    app.add_middleware(MetricsMiddleware)
+
+    if Config.ASYNC_DB:
+        # Async handlers are registered first so they shadow their sync twins;
+        # routes without an async version fall through to the sync routers below.
+        from routes.async_routes import async_desk_router, async_user_router, async_admin_router, async_search_router
+
+        app.include_router(async_user_router, prefix="/users", tags=["User Management"])
+        app.include_router(async_desk_router, prefix="/desk", tags=["Desk Management"])
+        app.include_router(async_admin_router, prefix="/admin", tags=["Admin Controls"])
+        app.include_router(async_search_router, prefix="/search", tags=["Search Functionality"])
+
+    app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+    app.include_router(user_router, prefix="/users", tags=["User Management"])
+    app.include_router(desk_router, prefix="/desk", tags=["Desk Management"])
+    app.include_router(admin_router, prefix="/admin", tags=["Admin Controls"])
+    app.include_router(search_router, prefix="/search", tags=["Search Functionality"])
+    app.include_router(reservation_router, prefix="/reservations", tags=["Reservations"])
+    app.include_router(analytics_router, prefix="/analytics", tags=["Analytics"])
+    app.include_router(metrics_router)
+
+    @app.get("/")
+    def home():
+        return {"message": "Desk Management API is running!"}
+
+    return app
+
+def __getattr__(name):
+    # `main.app` is built on first access so `uvicorn main:app` keeps working
+    if name == "app":
+        globals()["app"] = app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,211 @@
+""" Per-request timings and SQL query accounting, exposed in Prometheus text format.
+
+`MetricsMiddleware` times every request until its last body chunk is sent and
+opens a `RequestStats` in a context variable. The engine event hooks
+(`instrument_engine`, attached in database.py) add each cursor execution to
+the current request's stats; FastAPI copies the context into the threadpool,
+so sync routes and dependencies report into the same object.
+
+Requests that run more than `Config.QUERY_BUDGET` statements are logged with
+their most repeated statements (the usual shape of an N+1), and statements
+slower than `Config.SLOW_QUERY_MS` are logged by statement text only: bound
+parameters can carry password hashes and personal data, so they never reach
+the log.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Request latency buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# -------------------- 🟢 REQUEST ACCOUNTING --------------------
+
+class RequestStats:
+    """ Queries run on behalf of one request """
+
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+class Registry:
+    """ Process-wide counters and latency histograms keyed by route template """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()      # (method, route, status) -> count
+            self.latency = {}              # (method, route) -> [bucket counts..., sum, count]
+            self.queries = Counter()       # (method, route) -> statements executed
+            self.db_seconds = Counter()    # (method, route) -> seconds spent in the database
+            self.over_budget = Counter()   # (method, route) -> requests over the query budget
+            self.slow_queries = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            histogram = self.latency.setdefault(key, [0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            self.queries[key] += stats.queries
+            self.db_seconds[key] += stats.db_time
+            if stats.queries > Config.QUERY_BUDGET:
+                self.over_budget[key] += 1
+
+    def slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self):
+        """ Prometheus text exposition format (version 0.0.4) """
+        def labels(**values):
+            return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in values.items()) + "}"
+
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests by route template and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{labels(method=method, route=route, status=status)} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Time until the last response byte was sent.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.latency.items()):
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(f"http_request_duration_seconds_bucket{labels(method=method, route=route, le=bound)} {count}")
+                lines.append(f"http_request_duration_seconds_bucket{labels(method=method, route=route, le='+Inf')} {histogram[-1]}")
+                lines.append(f"http_request_duration_seconds_sum{labels(method=method, route=route)} {histogram[-2]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{labels(method=method, route=route)} {histogram[-1]}")
+
+            for name, kind, text, values in (
+                ("db_queries_total", "counter", "SQL statements executed while serving the route.", self.queries),
+                ("db_query_seconds_total", "counter", "Time spent in SQL statements while serving the route.", self.db_seconds),
+                ("db_query_budget_exceeded_total", "counter", "Requests that ran more statements than QUERY_BUDGET.", self.over_budget),
+            ):
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for (method, route), value in sorted(values.items()):
+                    lines.append(f"{name}{labels(method=method, route=route)} {value}")
+
+            lines += [
+                "# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS.",
+                "# TYPE db_slow_queries_total counter",
+                f"db_slow_queries_total {self.slow_queries}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+# -------------------- 🔵 SQLALCHEMY EVENTS --------------------
+
+def instrument_engine(engine):
+    """ Count and time every cursor execution on `engine` (pass `async_engine.sync_engine` for async engines) """
+    if not Config.METRICS_ENABLED:
+        return engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[statement] += 1
+        if elapsed * 1000 >= Config.SLOW_QUERY_MS:
+            registry.slow_query()
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+    return engine
+
+# -------------------- 🔴 MIDDLEWARE & ENDPOINT --------------------
+
+def route_template(scope):
+    """ Full path template of the matched route, e.g. "/desk/desks/{floor}", or "unmatched".
+
+    The matched route's own path may lack its router prefix (it depends on how
+    the FastAPI version nests included routers), but it is always a suffix of
+    the request path, so the prefix is taken from the leading raw segments.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    raw = scope.get("raw_path")
+    segments = (raw.decode("latin-1") if raw else scope["path"]).split("/")
+    prefix = segments[:max(1, len(segments) - len(template.split("/")) + 1)]
+    return "/".join(prefix) + template
+
+
+class MetricsMiddleware:
+    """ ASGI middleware recording latency, status and query counts per route template """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Config.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = route_template(scope)
+            method = scope["method"]
+            registry.observe(method, route, status, time.perf_counter() - started, stats)
+            if stats.queries > Config.QUERY_BUDGET:
+                repeated = ", ".join(f"{count}x {sql[:80]!r}" for sql, count in stats.statements.most_common(3))
+                logger.warning("%s %s ran %d queries (budget %d); most repeated: %s",
+                               method, route, stats.queries, Config.QUERY_BUDGET, repeated)
+
+
+metrics_router = APIRouter()
+
+@metrics_router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """ Prometheus scrape endpoint """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
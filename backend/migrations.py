@@ -0,0 +1,166 @@
+""" Versioned schema migrations.
+
+Replaces the old `Base.metadata.create_all` calls. Each migration is a
+numbered function applied once, in order, and recorded in `schema_version`.
+Steps are written to be idempotent (`checkfirst`), so a `database.db` that
+was created by `create_all`, by an older build or by a worker racing this
+one upgrades cleanly.
+
+Usage (from backend/):
+    python migrations.py            # upgrade to the latest version
+    python migrations.py --status   # show the applied versions
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import IntegrityError
+from database import engine as default_engine
+from models import User, Desk, DeskChange, SyncState, Reservation, DeskEvent, AnalyticsDeskState, OccupancyHourly, OccupancyDaily
+from user_search import create_search_index
+from analytics import create_event_capture, start_analytics
+from reservations import create_overlap_constraint
+from changelog import LAYOUT_KEY, RESERVATIONS_KEY, start_version
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+def migration(version: int, description: str):
+    """ Register `fn(connection)` as schema version `version` """
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+def _create_tables(conn, *models):
+    for model in models:
+        model.__table__.create(conn, checkfirst=True)
+
+def _create_indexes(conn, model, *names):
+    for index in model.__table__.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+def _add_columns(conn, model, *names):
+    existing = {column["name"] for column in inspect(conn).get_columns(model.__tablename__)}
+    for name in names:
+        if name not in existing:
+            spec = CreateColumn(model.__table__.c[name]).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {spec}"))
+
+# -------------------- 🟢 MIGRATIONS --------------------
+
+@migration(1, "baseline users and desks tables")
+def _baseline(conn):
+    _create_tables(conn, User, Desk)
+
+@migration(2, "desk change log and sync state")
+def _change_log(conn):
+    _create_tables(conn, DeskChange, SyncState)
+
+@migration(3, "indexes for floor, tech area, status and user lookups")
+def _hot_path_indexes(conn):
+    _create_indexes(conn, Desk, "ix_desks_floor_covering", "ix_desks_tech_area_id", "ix_desks_status_user_id", "ix_desks_user_id")
+    _create_indexes(conn, User, "ix_users_tech_area_id")
+
+@migration(4, "time-windowed desk reservations")
+def _reservations(conn):
+    _create_tables(conn, Reservation)
+
+@migration(5, "reservation end-time index for the occupancy engine")
+def _reservation_end_index(conn):
+    _create_indexes(conn, Reservation, "ix_reservations_end")
+
+@migration(6, "deleted flag on the desk change log")
+def _change_log_deletes(conn):
+    _add_columns(conn, DeskChange, "deleted")
+
+@migration(7, "trigram username search index")
+def _user_search_index(conn):
+    create_search_index(conn)
+
+@migration(8, "desk event log and occupancy rollups")
+def _occupancy_analytics(conn):
+    _create_tables(conn, DeskEvent, AnalyticsDeskState, OccupancyHourly, OccupancyDaily)
+    create_event_capture(conn)
+    start_analytics(conn)  # Snapshot of every desk, so the first run starts from the real occupancy
+
+@migration(9, "desk coordinates and zones")
+def _desk_positions(conn):
+    _add_columns(conn, Desk, "x", "y", "zone")
+
+@migration(10, "reservation overlap constraint (PostgreSQL)")
+def _reservation_overlap_constraint(conn):
+    create_overlap_constraint(conn)
+
+@migration(11, "desk layout version")
+def _desk_layout_version(conn):
+    start_version(conn, LAYOUT_KEY)
+
+@migration(12, "case-insensitive username prefix index")
+def _username_lower_index(conn):
+    # Raw DDL: SQLAlchemy cannot reflect expression indexes, so `checkfirst` would not work
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))"))
+
+@migration(13, "reservations version")
+def _reservations_version(conn):
+    start_version(conn, RESERVATIONS_KEY)
+
+# -------------------- 🔵 RUNNER --------------------
+
+def current_version(conn):
+    schema_version.create(conn, checkfirst=True)
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)).scalar() or 0
+
+def upgrade(engine=None, target: int = None):
+    """ Apply every migration newer than the database's version; returns the list applied """
+    engine = engine or default_engine
+    latest = MIGRATIONS[-1][0] if target is None else min(target, MIGRATIONS[-1][0])
+    with engine.begin() as conn:
+        if current_version(conn) >= latest:
+            return []  # Already current: one query on a warm start
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            if version <= current_version(conn):
+                continue
+            fn(conn)
+            try:
+                with conn.begin_nested():
+                    conn.execute(schema_version.insert().values(version=version, description=description, applied_at=datetime.utcnow()))
+            except IntegrityError:
+                continue  # Another worker recorded this version first
+        applied.append((version, description))
+    return applied
+
+def status(engine=None):
+    engine = engine or default_engine
+    with engine.begin() as conn:
+        current_version(conn)
+        return conn.execute(select(schema_version).order_by(schema_version.c.version)).all()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema")
+    parser.add_argument("--status", action="store_true", help="Show applied migrations and exit")
+    parser.add_argument("--target", type=int, help="Stop after this version")
+    args = parser.parse_args()
+
+    if args.status:
+        for row in status():
+            print(f"{row.version:>4}  {row.applied_at:%Y-%m-%d %H:%M}  {row.description}")
+        print(f"latest available: {MIGRATIONS[-1][0]}")
+    else:
+        applied = upgrade(target=args.target)
+        for version, description in applied:
+            print(f"✅ Applied migration {version}: {description}")
+        if not applied:
+            print("✅ Database schema is up to date")
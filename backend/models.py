@@ -1,28 +1,38 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Float, Integer, String, ForeignKey, DateTime, Index, false, func
 from sqlalchemy.orm import relationship
 from database import Base
-from werkzeug.security import generate_password_hash, check_password_hash
+from hashing import password_hasher
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_tech_area_id", "tech_area", "id"),  # Tech-area listings, keyset-ordered by id
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, nullable=False)
+    username = Column(String, unique=True, nullable=False)  # Also indexed as lower(username), see migration 12
     password_hash = Column(String, nullable=False)
     role = Column(String, default="user")  # "admin" or "user"
     tech_area = Column(String, nullable=False)  # Restrict seat booking
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def verify_password(self, password: str):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
     # 🔹 Fix: Ensure correct back_populates reference
     desks = relationship("Desk", back_populates="assigned_user")
 
 class Desk(Base):
     __tablename__ = "desks"
+    __table_args__ = (
+        # Covers the floor listing, so /desk/desks/{floor} never touches the table itself
+        Index("ix_desks_floor_covering", "floor", "desk_id", "status", "user_id", "tech_area"),
+        Index("ix_desks_tech_area_id", "tech_area", "id"),
+        Index("ix_desks_status_user_id", "status", "user_id"),
+        Index("ix_desks_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     desk_id = Column(String, unique=True, nullable=False)
@@ -30,6 +40,113 @@ class Desk(Base):
     status = Column(String, default="available")  # "available" or "occupied"
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     tech_area = Column(String, nullable=False)  # Ensures users only book in their area
+    x = Column(Float, nullable=True)  # Position on the floor plan, in the floor file's units
+    y = Column(Float, nullable=True)
+    zone = Column(String, nullable=True)  # Named area of the floor, e.g. "North wing"
 
     # 🔹 Fix: Use matching back_populates reference
     assigned_user = relationship("User", back_populates="desks")
+
+class DeskChange(Base):
+    """ Append-only log of desk states; `seq` orders changes across all workers """
+    __tablename__ = "desk_changes"
+    __table_args__ = (
+        Index("ix_desk_changes_floor_seq", "floor", "seq"),
+        {"sqlite_autoincrement": True},  # Never reuse a seq, even after compaction
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    desk_id = Column(String, nullable=False)
+    floor = Column(String, nullable=False)
+    status = Column(String)
+    user_id = Column(Integer, nullable=True)
+    tech_area = Column(String, nullable=False)
+    changed_at = Column(DateTime, nullable=False, server_default=func.current_timestamp(), index=True)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false())  # The desk itself was removed
+
+class SyncState(Base):
+    """ Small key/value table for cross-worker bookkeeping (e.g. change-log compaction watermark) """
+    __tablename__ = "sync_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class Reservation(Base):
+    """ A desk held by a user for [start_at, end_at); rows are never rewritten when they expire """
+    __tablename__ = "reservations"
+    __table_args__ = (
+        # Interval index: durations are capped (Config.RESERVATION_MAX_HOURS), so an overlap
+        # probe only walks start_at in (T1 - max, T2) instead of the desk's whole history
+        Index("ix_reservations_desk_start", "desk_id", "start_at", "end_at"),
+        Index("ix_reservations_user_end", "user_id", "end_at"),
+        Index("ix_reservations_end", "end_at"),  # Loading the reservations still in effect
+    )
+
+    id = Column(Integer, primary_key=True)
+    desk_id = Column(String, nullable=False)
+    floor = Column(String, nullable=False)
+    tech_area = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    start_at = Column(DateTime, nullable=False)
+    end_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+class DeskEvent(Base):
+    """ Append-only desk history for analytics; copied from `desk_changes` by a trigger and never compacted """
+    __tablename__ = "desk_events"
+    __table_args__ = (
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    desk_id = Column(String, nullable=False)
+    floor = Column(String, nullable=False)
+    tech_area = Column(String, nullable=False)
+    status = Column(String)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false())
+    snapshot = Column(Boolean, nullable=False, default=False, server_default=false())  # State recorded when analytics started, not a change
+    occurred_at = Column(DateTime, nullable=False, index=True)
+
+class AnalyticsDeskState(Base):
+    """ Each desk's area and occupancy as of the analytics watermark """
+    __tablename__ = "analytics_desk_state"
+    __table_args__ = (
+        Index("ix_analytics_desk_state_area", "floor", "tech_area", "occupied"),  # Per-area counts at the start of a run
+    )
+
+    desk_id = Column(String, primary_key=True)
+    floor = Column(String, nullable=False)
+    tech_area = Column(String, nullable=False)
+    occupied = Column(Boolean, nullable=False)
+
+class OccupancyHourly(Base):
+    """ Occupancy per UTC hour, floor and tech area, maintained by analytics.py """
+    __tablename__ = "occupancy_hourly"
+    __table_args__ = (
+        Index("ix_occupancy_hourly_floor_bucket", "floor", "bucket", "tech_area"),  # One floor over time, already in series order
+    )
+
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour
+    floor = Column(String, primary_key=True)
+    tech_area = Column(String, primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    releases = Column(Integer, nullable=False, default=0)
+    occupied_seconds = Column(Float, nullable=False, default=0)
+    desk_seconds = Column(Float, nullable=False, default=0)  # Utilisation = occupied_seconds / desk_seconds
+    peak_occupied = Column(Integer, nullable=False, default=0)
+
+class OccupancyDaily(Base):
+    """ Occupancy per UTC day, floor and tech area, maintained by analytics.py """
+    __tablename__ = "occupancy_daily"
+    __table_args__ = (
+        Index("ix_occupancy_daily_floor_bucket", "floor", "bucket", "tech_area"),
+    )
+
+    bucket = Column(DateTime, primary_key=True)  # Midnight UTC
+    floor = Column(String, primary_key=True)
+    tech_area = Column(String, primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    releases = Column(Integer, nullable=False, default=0)
+    occupied_seconds = Column(Float, nullable=False, default=0)
+    desk_seconds = Column(Float, nullable=False, default=0)
+    peak_occupied = Column(Integer, nullable=False, default=0)
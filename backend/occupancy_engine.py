@@ -0,0 +1,223 @@
+""" Vectorized desk availability across every floor.
+
+For each floor the engine keeps a bitmap of desks x time slots (one bit per
+slot, packed eight to a byte) marking reserved slots, a vector of desks that
+are occupied right now (walk-in bookings in `desks.status`) and a tech-area
+code per desk. "N free desks in tech area X between T1 and T2" is then a
+handful of NumPy AND / any / count operations per floor instead of one ORM
+query per floor.
+
+Slots are `Config.OCCUPANCY_SLOT_MINUTES` wide and rounded outwards, so a
+desk reserved for part of a slot counts as busy for the whole slot; the
+engine may under-report free desks but never offers a reserved one. The
+booking statement in reservations.py stays the authority on conflicts.
+"""
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import Config
+from models import Desk, Reservation
+from desk_hooks import DeskListener, desk_hooks
+from changelog import changes_after, high_water_mark, layout_version, reservations_version
+
+# -------------------- 🟢 FLOOR BITMAPS --------------------
+
+class FloorBitmap:
+    """ Reservation bitmap, walk-in vector and tech-area codes for the desks on one floor """
+
+    __slots__ = ("desk_ids", "rows", "tech", "walk_in", "busy")
+
+    def __init__(self, desk_ids, tech_codes, walk_in, busy):
+        self.desk_ids = desk_ids                               # row -> desk_id
+        self.rows = {desk_id: row for row, desk_id in enumerate(desk_ids)}
+        self.tech = np.asarray(tech_codes, dtype=np.int32)     # row -> tech-area code
+        self.walk_in = np.asarray(walk_in, dtype=bool)         # row -> occupied right now
+        self.busy = busy                                       # rows x ceil(slots / 8) uint8, bit set = reserved
+
+
+class OccupancyEngine(DeskListener):
+    """ In-memory availability engine, built from one pass over desks and reservations.
+
+    Built on first use (and warmed at startup), rebuilt when the UTC day
+    rolls over so the slot window moves forward, and otherwise kept current
+    through the `desk_hooks` listener methods. Other workers' writes are
+    picked up on the next query: walk-in bookings are replayed from the desk
+    change log, and a moved layout or reservations version forces a rebuild.
+    """
+
+    def __init__(self, slot_minutes: int = 30, horizon_days: int = 32):
+        self.slot = timedelta(minutes=slot_minutes)
+        self.slots = int(timedelta(days=horizon_days) / self.slot)
+        self._lock = threading.RLock()
+        self._built = False
+        self._epoch = None        # Midnight UTC of the day the bitmaps start at
+        self._layout = None       # Layout version the bitmaps were built from
+        self._reservations = None # Reservations version the bitmaps were built from
+        self._seq = 0             # Change-log seq the walk-in vectors have caught up to
+        self._floors = {}         # floor -> FloorBitmap
+        self._tech_codes = {}     # tech_area -> int code
+        self._intervals = {}      # desk_id -> {reservation_id: (first slot, end slot)}
+
+    def ensure_built(self, db: Session, now: datetime = None):
+        """ Build, rebuild or catch up with the database so no desk reserved or taken anywhere is offered """
+        today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+        versions = (today, db.scalar(layout_version()), db.scalar(reservations_version()))
+        seq = high_water_mark(db)
+        if self._built and self._versions() == versions and self._seq == seq:
+            return
+        with self._lock:
+            if self._built and self._versions() == versions:
+                if self._seq == seq:
+                    return
+                changes = changes_after(db, self._seq, seq)
+                if changes is not None:
+                    for desk_id, floor, tech_area, status, _, deleted in changes:
+                        self.desk_changed(desk_id, floor, tech_area, None if deleted else status)
+                    if self._built:  # An unknown desk invalidates; rebuild below
+                        self._seq = seq
+                        return
+            self._build(db, today)
+            _, self._layout, self._reservations = versions
+            self._seq = seq
+
+    def _versions(self):
+        return self._epoch, self._layout, self._reservations
+
+    def invalidate(self):
+        """ Drop every bitmap so the next query rebuilds from the database """
+        with self._lock:
+            self._built = False
+            self._floors, self._intervals = {}, {}
+
+    def _build(self, db: Session, epoch: datetime):
+        horizon = epoch + self.slots * self.slot
+        desks = db.execute(select(Desk.desk_id, Desk.floor, Desk.tech_area, Desk.status).order_by(Desk.floor)).all()
+        reservations = db.execute(
+            select(Reservation.id, Reservation.desk_id, Reservation.start_at, Reservation.end_at)
+            .where(Reservation.end_at > epoch, Reservation.start_at < horizon)
+        ).all()
+
+        self._epoch = epoch
+        self._tech_codes = {}
+        self._intervals = {}
+        for reservation_id, desk_id, start_at, end_at in reservations:
+            span = self._span(start_at, end_at)
+            if span:
+                self._intervals.setdefault(desk_id, {})[reservation_id] = span
+
+        by_floor = {}
+        for desk_id, floor, tech_area, status in desks:
+            by_floor.setdefault(floor, []).append((desk_id, tech_area, status))
+
+        self._floors = {}
+        for floor, rows in by_floor.items():
+            dense = np.zeros((len(rows), self.slots), dtype=bool)
+            for row, (desk_id, _, _) in enumerate(rows):
+                for first, end in self._intervals.get(desk_id, {}).values():
+                    dense[row, first:end] = True
+            self._floors[floor] = FloorBitmap(
+                [desk_id for desk_id, _, _ in rows],
+                [self._code(tech_area) for _, tech_area, _ in rows],
+                [status == "occupied" for _, _, status in rows],
+                np.packbits(dense, axis=1),
+            )
+        self._built = True
+
+    def _code(self, tech_area: str):
+        return self._tech_codes.setdefault(tech_area, len(self._tech_codes))
+
+    def _span(self, start_at: datetime, end_at: datetime):
+        """ [first, end) slot indexes covering the window, rounded outwards and clipped to the horizon """
+        first = max(0, (start_at - self._epoch) // self.slot)
+        end = min(self.slots, -((self._epoch - end_at) // self.slot))  # Ceiling division
+        return (first, end) if first < end else None
+
+    def _repaint(self, bitmap: FloorBitmap, desk_id: str):
+        row = np.zeros(self.slots, dtype=bool)
+        for first, end in self._intervals.get(desk_id, {}).values():
+            row[first:end] = True
+        bitmap.busy[bitmap.rows[desk_id]] = np.packbits(row)
+
+    # -------------------- 🔵 QUERIES --------------------
+
+    def free_desks(self, tech_area: str, start_at: datetime, end_at: datetime, limit: int = 10, now: datetime = None):
+        """ Up to `limit` desks in `tech_area` free for all of [start_at, end_at), plus per-floor free counts """
+        now = now or datetime.utcnow()
+        with self._lock:
+            code = self._tech_codes.get(tech_area)
+            span = self._span(start_at, end_at)
+            if code is None or span is None:
+                return {"total": 0, "floors": {}, "desks": []}
+
+            first, end = span
+            mask = np.zeros(self.slots, dtype=bool)
+            mask[first:end] = True
+            lo, hi = first // 8, (end - 1) // 8 + 1  # Only the bytes the window touches
+            packed_mask = np.packbits(mask)[lo:hi]
+            includes_now = start_at <= now
+
+            counts, desks = {}, []
+            for floor in sorted(self._floors):
+                bitmap = self._floors[floor]
+                free = (bitmap.tech == code) & ~np.any(bitmap.busy[:, lo:hi] & packed_mask, axis=1)
+                if includes_now:
+                    free &= ~bitmap.walk_in
+                count = int(np.count_nonzero(free))
+                if not count:
+                    continue
+                counts[floor] = count
+                if len(desks) < limit:
+                    rows = np.flatnonzero(free)[:limit - len(desks)]
+                    desks.extend({"desk_id": bitmap.desk_ids[row], "floor": floor} for row in rows)
+            return {"total": sum(counts.values()), "floors": counts, "desks": desks}
+
+    # -------------------- 🔴 INCREMENTAL UPDATES --------------------
+
+    def _bitmap(self, floor: str, desk_id: str):
+        """ The floor's bitmap if it knows `desk_id`; an unknown desk forces a rebuild """
+        bitmap = self._floors.get(floor)
+        if bitmap is None or desk_id not in bitmap.rows:
+            self.invalidate()
+            return None
+        return bitmap
+
+    def desk_changed(self, desk_id, floor, tech_area, status, username=None):
+        with self._lock:
+            if self._built and (bitmap := self._bitmap(floor, desk_id)):
+                bitmap.walk_in[bitmap.rows[desk_id]] = status == "occupied"
+
+    def floor_reset(self, floor):
+        with self._lock:
+            bitmap = self._floors.get(floor)
+            if bitmap is not None:
+                bitmap.walk_in[:] = False
+
+    def desks_loaded(self, floors):
+        self.invalidate()
+
+    def user_removed(self, user_id, username):
+        self.invalidate()  # Their walk-in desks and reservations are gone; the engine does not track owners
+
+    def reserved(self, reservation_id, desk_id, floor, start_at, end_at):
+        with self._lock:
+            if not self._built or not (bitmap := self._bitmap(floor, desk_id)):
+                return
+            span = self._span(start_at, end_at)
+            if span:
+                self._intervals.setdefault(desk_id, {})[reservation_id] = span
+                self._repaint(bitmap, desk_id)
+
+    def reservation_cancelled(self, reservation_id, desk_id, floor):
+        with self._lock:
+            if not self._built or not (bitmap := self._bitmap(floor, desk_id)):
+                return
+            if self._intervals.get(desk_id, {}).pop(reservation_id, None):
+                self._repaint(bitmap, desk_id)  # Rebuilt from the remaining intervals, since slots can be shared
+
+
+occupancy_engine = desk_hooks.register(OccupancyEngine(
+    Config.OCCUPANCY_SLOT_MINUTES,
+    Config.RESERVATION_MAX_DAYS_AHEAD + 2,  # Covers every window a reservation may be made for
+))
@@ -0,0 +1,158 @@
+""" Time-windowed desk reservations.
+
+A reservation holds a desk for a half-open window [start_at, end_at). Nothing
+expires them: every query is bounded by time, so a reservation simply stops
+mattering once `end_at` passes and no nightly job has to rewrite floors.
+
+Durations are capped at `Config.RESERVATION_MAX_HOURS`, which turns the
+interval-overlap test into a range scan on `(desk_id, start_at)`: a window
+[T1, T2) can only overlap reservations that start in (T1 - max, T2). Raising
+the cap later is safe; lowering it only once longer reservations have ended.
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, delete, exists, insert, literal, or_, select, text
+from sqlalchemy.orm import Session
+from config import Config
+from models import Desk, Reservation
+
+RESERVATION_COLUMNS = (Reservation.id, Reservation.desk_id, Reservation.floor, Reservation.tech_area, Reservation.start_at, Reservation.end_at)
+RESERVATION_KEYS = tuple(column.key for column in RESERVATION_COLUMNS)
+
+# PostgreSQL does not serialize writers, so the overlap check in reserve_desk is backed by a constraint there
+OVERLAP_CONSTRAINT = "reservations_no_overlap"
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{OVERLAP_CONSTRAINT}') THEN
+            ALTER TABLE reservations ADD CONSTRAINT {OVERLAP_CONSTRAINT}
+                EXCLUDE USING gist (desk_id WITH =, tsrange(start_at, end_at) WITH &&);
+        END IF;
+    END $$
+    """,
+)
+
+def create_overlap_constraint(conn):
+    """ Add the EXCLUDE constraint on PostgreSQL; SQLite's single writer already makes reserve_desk atomic """
+    if conn.dialect.name == "postgresql":
+        for statement in POSTGRES_DDL:
+            conn.execute(text(statement))
+
+# -------------------- 🟢 WINDOWS --------------------
+
+def to_utc(moment: datetime):
+    """ Naive UTC, the form every DateTime column in this schema is stored in """
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def window_error(start_at: datetime, end_at: datetime, now: datetime):
+    """ Why [start_at, end_at) cannot be reserved, or None if it can """
+    if end_at <= start_at:
+        return "end_at must be after start_at"
+    if end_at - start_at > timedelta(hours=Config.RESERVATION_MAX_HOURS):
+        return f"Reservations are limited to {Config.RESERVATION_MAX_HOURS:g} hours"
+    if end_at <= now:
+        return "The reservation window has already ended"
+    if start_at > now + timedelta(days=Config.RESERVATION_MAX_DAYS_AHEAD):
+        return f"Reservations open {Config.RESERVATION_MAX_DAYS_AHEAD} days ahead"
+    return None
+
+def overlapping(start_at: datetime, end_at: datetime, desk_id=Reservation.desk_id):
+    """ Criteria for reservations of `desk_id` (a value or a correlated column) that overlap the window """
+    earliest = start_at - timedelta(hours=Config.RESERVATION_MAX_HOURS)
+    return and_(
+        Reservation.desk_id == desk_id,
+        Reservation.start_at > earliest,  # Bounded by the duration cap, so this is a range scan
+        Reservation.start_at < end_at,
+        Reservation.end_at > start_at,
+    )
+
+def _held_now(now: datetime, user_id: int = None):
+    """ Criteria for reservations in force at `now` that belong to someone other than `user_id` (anyone when None) """
+    criteria = [
+        Reservation.start_at > now - timedelta(hours=Config.RESERVATION_MAX_HOURS),
+        Reservation.start_at <= now,
+        Reservation.end_at > now,
+    ]
+    if user_id is not None:
+        criteria.append(Reservation.user_id != user_id)
+    return criteria
+
+def reserved_now(now: datetime, user_id: int = None):
+    """ EXISTS over the correlated desk's reservations in force at `now` for someone else; walk-in bookings add `~` it """
+    return exists().where(Reservation.desk_id == Desk.desk_id, *_held_now(now, user_id))
+
+def reserved_desk_ids(desk_ids, now: datetime, user_id: int = None):
+    """ SELECT of the desks in `desk_ids` reserved at `now` for someone other than `user_id` """
+    return select(Reservation.desk_id).where(Reservation.desk_id.in_(desk_ids), *_held_now(now, user_id))
+
+def _walk_in_free(start_at: datetime, now: datetime, user_id: int = None):
+    """ Desks booked on the spot (desks.status) only block windows that include the present """
+    if start_at > now:
+        return literal(True)
+    if user_id is None:
+        return Desk.status == "available"
+    return or_(Desk.status == "available", Desk.user_id == user_id)
+
+# -------------------- 🔵 BOOKING --------------------
+
+def reserve_desk(desk_id: str, floor: str, user_id: int, tech_area: str, start_at: datetime, end_at: datetime, now: datetime):
+    """ INSERT ... SELECT that creates the reservation only if the desk is free for the whole window.
+
+    The desk lookup, the tech-area check and both overlap checks (the desk,
+    and the user holding another desk at the same time) run in one statement
+    that returns the new reservation id, or no row on any conflict. SQLite
+    serializes writers, which makes the check-and-insert atomic; on
+    PostgreSQL a racing overlap is rejected by the `reservations_no_overlap`
+    EXCLUDE constraint (migration 10) with an IntegrityError instead.
+    """
+    desk_taken = exists().where(overlapping(start_at, end_at, Desk.desk_id))
+    user_busy = exists().where(
+        Reservation.user_id == user_id,
+        Reservation.end_at > start_at,
+        Reservation.start_at < end_at,
+    )
+    source = select(
+        Desk.desk_id, Desk.floor, Desk.tech_area,
+        literal(user_id), literal(start_at), literal(end_at),
+    ).where(
+        Desk.desk_id == desk_id,
+        Desk.floor == floor,
+        Desk.tech_area == tech_area,
+        _walk_in_free(start_at, now, user_id),
+        ~desk_taken,
+        ~user_busy,
+    )
+    columns = ["desk_id", "floor", "tech_area", "user_id", "start_at", "end_at"]
+    return insert(Reservation).from_select(columns, source).returning(Reservation.id)
+
+def cancel_user_reservations(user_id: int):
+    """ DELETE for every reservation held by `user_id`; run it in the transaction that deletes the user """
+    return delete(Reservation).where(Reservation.user_id == user_id)
+
+# -------------------- 🔴 QUERIES --------------------
+
+def free_desks(db: Session, floor: str, tech_area: str, start_at: datetime, end_at: datetime, now: datetime):
+    """ Desk IDs on `floor` in `tech_area` with no reservation overlapping [start_at, end_at).
+
+    Desks come from the floor covering index; each is checked with one
+    bounded probe of the reservation interval index, so months of history
+    do not slow the query down.
+    """
+    taken = exists().where(overlapping(start_at, end_at, Desk.desk_id))
+    rows = db.execute(
+        select(Desk.desk_id)
+        .where(Desk.floor == floor, Desk.tech_area == tech_area, _walk_in_free(start_at, now), ~taken)
+        .order_by(Desk.desk_id)
+    )
+    return rows.scalars().all()
+
+def user_reservations(db: Session, user_id: int, now: datetime):
+    """ The user's reservations that have not ended yet, soonest first """
+    rows = db.execute(
+        select(*RESERVATION_COLUMNS)
+        .where(Reservation.user_id == user_id, Reservation.end_at > now)
+        .order_by(Reservation.start_at)
+    )
+    return [dict(zip(RESERVATION_KEYS, row)) for row in rows]
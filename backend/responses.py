@@ -0,0 +1,41 @@
+""" Fast JSON encoding for responses and pre-encoded payloads.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise; both produce compact JSON with naive datetimes in ISO format.
+
+Routes that return plain dicts make FastAPI walk them with
+`jsonable_encoder` before the response class ever sees them, so hot list
+routes return a `FastJSONResponse` themselves (their `response_model` still
+documents the shape). Small typed responses are left to FastAPI, which
+serializes them straight to bytes through Pydantic.
+"""
+import json
+from datetime import date, datetime
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):  # NumPy scalars and arrays
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """ Compact JSON bytes for `content` (dicts, lists, tuples, str/int/float/None, datetimes) """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """ JSONResponse rendered with `dumps` """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
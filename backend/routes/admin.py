@@ -1,156 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User, Desk
-import jwt
-import os
-import json
-from werkzeug.security import generate_password_hash
-
-SECRET_KEY = os.getenv("SECRET_KEY", "myjwtsecret")
+from auth import Principal, verify_admin, invalidate_user
+from importer import import_users, import_desks
+from crud import bulk_desk_status, reset_all_desks_on_floor, delete_user as remove_user
+from hashing import password_hasher
+from desk_hooks import desk_hooks
+from changelog import log_desk_changes, compact_desk_changes
+from listing import USER_COLUMNS, DESK_COLUMNS, EXPORT_PATTERN, keyset_page, export_response
+from schemas import UserPage, DeskPage, DeskBulkStatus, BatchOut, MessageOut, ImportOut, CompactionOut, DESK_STATUSES
+from responses import FastJSONResponse
 
 admin_router = APIRouter()
 
-def verify_admin(token: str, db: Session):
-    """ Verify if the token belongs to an admin user """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        user_id = payload["user_id"]
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or user.role != "admin":
-            raise HTTPException(status_code=403, detail="Admin access required")
-        return user
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
 # -------------------- 🟢 LOAD JSON DATA --------------------
 
-@admin_router.post("/load-users/")
-def load_users(file: UploadFile = File(...), token: str = None, db: Session = Depends(get_db)):
+@admin_router.post("/load-users/", response_model=ImportOut)
+def load_users(file: UploadFile = File(...), batch_size: int = Query(None, ge=1, le=50000), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Load users from a JSON file (Admin only) """
-    verify_admin(token, db)
     try:
-        contents = file.file.read()
-        users_data = json.loads(contents)
-        
-        for user in users_data["users"]:
-            existing_user = db.query(User).filter(User.username == user["username"]).first()
-            if not existing_user:
-                new_user = User(
-                    username=user["username"],
-                    password_hash=generate_password_hash(user["password"]),
-                    tech_area=user["tech_area"],
-                    role=user["role"]
-                )
-                db.add(new_user)
-        db.commit()
-        return {"message": "Users imported successfully"}
-    
+        report = import_users(db, file.file, batch_size)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error importing users: {str(e)}")
+    return {"message": "Users imported successfully", **report.as_dict()}
 
-@admin_router.post("/load-desks/")
-def load_desks(file: UploadFile = File(...), token: str = None, db: Session = Depends(get_db)):
+@admin_router.post("/load-desks/", response_model=ImportOut)
+def load_desks(file: UploadFile = File(...), batch_size: int = Query(None, ge=1, le=50000), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Load desks from a JSON file (Admin only) """
-    verify_admin(token, db)
     try:
-        contents = file.file.read()
-        desks_data = json.loads(contents)
-        
-        for desk_id, details in desks_data["desks"].items():
-            existing_desk = db.query(Desk).filter(Desk.desk_id == desk_id).first()
-            if not existing_desk:
-                new_desk = Desk(
-                    desk_id=desk_id,
-                    floor=details["floor"],
-                    status=details["status"],
-                    tech_area=details["tech_area"]
-                )
-                db.add(new_desk)
-        db.commit()
-        return {"message": "Desks imported successfully"}
-    
+        report = import_desks(db, file.file, batch_size)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error importing desks: {str(e)}")
+    desk_hooks.desks_loaded(report.floors)
+    return {"message": "Desks imported successfully", **report.as_dict()}
 
 
 # -------------------- 🔵 VIEW USERS & DESKS --------------------
+#
+# All four listings are keyset-paginated (`?limit=&cursor=`) and return only
+# projected columns. `?format=ndjson|csv` streams every matching row instead.
 
-@admin_router.get("/users/")
-def list_users(token: str, db: Session = Depends(get_db)):
+def _list(db, columns, criteria, cursor, limit, fmt, name):
+    if fmt != "json":
+        return export_response(columns, criteria, fmt, name)
+    return FastJSONResponse(keyset_page(db, columns, criteria, cursor, limit))
+
+@admin_router.get("/users/", response_model=UserPage)
+def list_users(cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Get all users (Admin only) """
-    verify_admin(token, db)
-    return db.query(User).all()
+    return _list(db, USER_COLUMNS, (), cursor, limit, fmt, "users")
 
-@admin_router.get("/users/{tech_area}")
-def list_users_by_tech_area(tech_area: str, token: str, db: Session = Depends(get_db)):
+@admin_router.get("/users/{tech_area}", response_model=UserPage)
+def list_users_by_tech_area(tech_area: str, cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Get users by tech area (Admin only) """
-    verify_admin(token, db)
-    return db.query(User).filter(User.tech_area == tech_area).all()
+    return _list(db, USER_COLUMNS, (User.tech_area == tech_area,), cursor, limit, fmt, "users")
 
-@admin_router.get("/desks/")
-def list_desks(token: str, db: Session = Depends(get_db)):
+@admin_router.get("/desks/", response_model=DeskPage)
+def list_desks(cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Get all desks (Admin only) """
-    verify_admin(token, db)
-    return db.query(Desk).all()
+    return _list(db, DESK_COLUMNS, (), cursor, limit, fmt, "desks")
 
-@admin_router.get("/desks/{tech_area}")
-def list_desks_by_tech_area(tech_area: str, token: str, db: Session = Depends(get_db)):
+@admin_router.get("/desks/{tech_area}", response_model=DeskPage)
+def list_desks_by_tech_area(tech_area: str, cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Get desks by tech area (Admin only) """
-    verify_admin(token, db)
-    return db.query(Desk).filter(Desk.tech_area == tech_area).all()
+    return _list(db, DESK_COLUMNS, (Desk.tech_area == tech_area,), cursor, limit, fmt, "desks")
 
 
 # -------------------- 🔴 USER MANAGEMENT --------------------
 
-@admin_router.delete("/user/{user_id}")
-def delete_user(user_id: int, token: str, db: Session = Depends(get_db)):
+@admin_router.delete("/user/{user_id}", response_model=MessageOut)
+def delete_user(user_id: int, admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Delete a user (Admin only) """
-    verify_admin(token, db)
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    if not remove_user(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    
-    db.delete(user)
-    db.commit()
     return {"message": "User deleted successfully"}
 
-@admin_router.put("/user/update-password/{user_id}")
-def update_user_password(user_id: int, new_password: str, token: str, db: Session = Depends(get_db)):
+@admin_router.put("/user/update-password/{user_id}", response_model=MessageOut)
+def update_user_password(user_id: int, new_password: str, admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Update a user's password (Admin only) """
-    verify_admin(token, db)
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.password_hash = generate_password_hash(new_password)
+    user.password_hash = password_hasher.hash(new_password)
     db.commit()
+    invalidate_user(user_id)
     return {"message": "User password updated successfully"}
 
-@admin_router.put("/user/update-tech-area/{user_id}")
-def update_user_tech_area(user_id: int, new_tech_area: str, token: str, db: Session = Depends(get_db)):
+@admin_router.put("/user/update-tech-area/{user_id}", response_model=MessageOut)
+def update_user_tech_area(user_id: int, new_tech_area: str, admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Update a user's tech area (Admin only) """
-    verify_admin(token, db)
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.tech_area = new_tech_area
     db.commit()
+    invalidate_user(user_id)
     return {"message": "User tech area updated successfully"}
 
 
 # -------------------- 🟠 RESET FLOOR DESKS --------------------
 
-@admin_router.post("/reset-floor/{floor}")
-def reset_floor(floor: str, token: str, db: Session = Depends(get_db)):
+@admin_router.post("/reset-floor/{floor}", response_model=MessageOut)
+def reset_floor(floor: str, admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
     """ Reset all desks on a floor (Admin only) """
-    verify_admin(token, db)
-    desks = db.query(Desk).filter(Desk.floor == floor).all()
-    for desk in desks:
-        desk.status = "available"
-        desk.user_id = None
-    db.commit()
+    reset_all_desks_on_floor(db, floor)
     return {"message": f"All desks on {floor} have been reset"}
+
+@admin_router.post("/desks/bulk-status/{floor}", response_model=BatchOut)
+def bulk_update_desk_status(floor: str, bulk: DeskBulkStatus, admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
+    """ Set the status of the named desks, or of every desk on the floor, clearing their users (Admin only) """
+    if bulk.status not in DESK_STATUSES:
+        raise HTTPException(status_code=400, detail="Status must be 'available' or 'occupied'")
+    if bulk.desk_ids:
+        found = {desk_id for (desk_id,) in db.query(Desk.desk_id).filter(Desk.floor == floor, Desk.desk_id.in_(bulk.desk_ids))}
+        missing = [desk_id for desk_id in dict.fromkeys(bulk.desk_ids) if desk_id not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Desks not found: {', '.join(missing)}")
+
+    changed = db.execute(bulk_desk_status(floor, bulk.status, bulk.desk_ids)).all()
+    if changed:
+        db.execute(log_desk_changes(Desk.desk_id.in_([desk_id for desk_id, _ in changed])))
+    db.commit()
+
+    if bulk.desk_ids is None and bulk.status == "available":
+        desk_hooks.floor_reset(floor)
+    else:
+        for desk_id, tech_area in changed:
+            desk_hooks.desk_changed(desk_id, floor, tech_area, bulk.status)
+    return {"message": f"{len(changed)} desks on {floor} set to {bulk.status}", "updated": len(changed)}
+
+
+# -------------------- 🟤 CHANGE LOG --------------------
+
+@admin_router.post("/compact-changes", response_model=CompactionOut)
+def compact_changes(max_age_hours: float = Query(None, ge=0), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
+    """ Drop desk change-log entries older than the retention window (Admin only) """
+    return compact_desk_changes(db, max_age_hours)
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database import get_db
+from models import OccupancyHourly, OccupancyDaily
+from schemas import OccupancyBucket, OccupancySummary
+from responses import FastJSONResponse
+from auth import Principal, verify_admin
+from reservations import to_utc
+
+analytics_router = APIRouter()
+
+# Every route reads the rollups only; analytics.py keeps them current
+ROLLUPS = {"hour": OccupancyHourly, "day": OccupancyDaily}
+MAX_SPAN = {"hour": timedelta(days=93), "day": timedelta(days=3660)}
+
+def _range(start: datetime, end: datetime, span: timedelta):
+    start, end = to_utc(start), to_utc(end or datetime.utcnow())
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > span:
+        raise HTTPException(status_code=400, detail=f"The range is limited to {span.days} days")
+    return start, end
+
+def _measures(bookings, releases, desk_seconds, occupied_seconds):
+    return {
+        "bookings": bookings,
+        "releases": releases,
+        "desk_hours": round(desk_seconds / 3600, 3),
+        "occupied_hours": round(occupied_seconds / 3600, 3),
+        "utilization": round(occupied_seconds / desk_seconds, 4) if desk_seconds else 0.0,
+    }
+
+# -------------------- 🟢 TIME SERIES --------------------
+
+@analytics_router.get("/occupancy", response_model=List[OccupancyBucket])
+def occupancy(start: datetime, end: datetime = None, granularity: str = Query("hour", pattern="^(hour|day)$"), floor: str = None, tech_area: str = None, admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
+    """ Occupancy per UTC hour or day, floor and tech area for buckets starting in [start, end) (Admin only) """
+    start, end = _range(start, end, MAX_SPAN[granularity])
+    model = ROLLUPS[granularity]
+    criteria = [model.bucket >= start, model.bucket < end]
+    if floor is not None:
+        criteria.append(model.floor == floor)
+    if tech_area is not None:
+        criteria.append(model.tech_area == tech_area)
+
+    rows = db.execute(
+        select(model.bucket, model.floor, model.tech_area, model.bookings, model.releases,
+               model.desk_seconds, model.occupied_seconds, model.peak_occupied)
+        .where(*criteria)
+        .order_by(model.bucket, model.floor, model.tech_area)
+    )
+    return FastJSONResponse([
+        {"bucket": bucket, "floor": row_floor, "tech_area": row_tech_area,
+         **_measures(bookings, releases, desk_seconds, occupied_seconds), "peak_occupied": peak}
+        for bucket, row_floor, row_tech_area, bookings, releases, desk_seconds, occupied_seconds, peak in rows
+    ])
+
+# -------------------- 🔵 TOTALS --------------------
+
+@analytics_router.get("/summary", response_model=List[OccupancySummary])
+def summary(start: datetime, end: datetime = None, by: str = Query("floor", pattern="^(floor|tech_area)$"), admin: Principal = Depends(verify_admin), db: Session = Depends(get_db)):
+    """ Totals per floor or tech area over the UTC days starting in [start, end) (Admin only) """
+    start, end = _range(start, end, MAX_SPAN["day"])
+    group = getattr(OccupancyDaily, by)
+    rows = db.execute(
+        select(group, func.sum(OccupancyDaily.bookings), func.sum(OccupancyDaily.releases),
+               func.sum(OccupancyDaily.desk_seconds), func.sum(OccupancyDaily.occupied_seconds))
+        .where(OccupancyDaily.bucket >= start, OccupancyDaily.bucket < end)
+        .group_by(group)
+        .order_by(group)
+    )
+    return FastJSONResponse([{"group": name, **_measures(*totals)} for name, *totals in rows])
@@ -0,0 +1,243 @@
+""" Async twins of the hot desk, search, user and admin routes.
+
+These routers are only mounted when `Config.ASYNC_DB` is enabled. `main.py`
+includes them ahead of the sync routers under the same prefixes, so any path
+not overridden here (the bulk imports, login) keeps being served by the sync
+handlers on the sync engine.
+"""
+from datetime import datetime
+from typing import List, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from database import get_async_db
+from models import Desk, User
+from schemas import DeskUpdate, DeskBatchUpdate, DeskBulkStatus, BatchOut, UserLogin, UserPage, DeskPage, DESK_STATUSES, MessageOut, ProfileOut, DeskLocation, UserMatch, OccupantOut, DeskOut, FloorDelta, FLOOR_RESPONSES
+from responses import FastJSONResponse
+from crud import desk_transition, desk_batch_transition, bulk_desk_status, reset_all_desks_on_floor, delete_user as remove_user
+from routes.desks import transition_error, batch_transition_error
+from reservations import reserved_desk_ids
+from auth import Principal, verify_token_async, verify_admin_async, invalidate_user
+from search_index import occupancy_index
+from desk_hooks import desk_hooks
+from changelog import log_desk_changes, floor_delta
+from listing import USER_COLUMNS, EXPORT_PATTERN, keyset_page, export_response
+from floor_cache import floor_cache, floor_seq, snapshot_response, DESK_COLUMNS
+from hashing import password_hasher
+from user_search import search_statement, top_matches
+
+async_desk_router = APIRouter()
+async_search_router = APIRouter()
+async_user_router = APIRouter()
+async_admin_router = APIRouter()
+
+# -------------------- 🟢 DESKS --------------------
+
+@async_desk_router.get("/desks/{floor}", response_model=Union[List[DeskOut], FloorDelta], responses=FLOOR_RESPONSES)
+async def get_desks(floor: str, request: Request, since: int = Query(None, ge=0), db=Depends(get_async_db)):
+    """ Get all desks for a specific floor (cached; honours If-None-Match), or the changes after `?since=` """
+    if since is not None:
+        return FastJSONResponse(await db.run_sync(floor_delta, floor, since))
+
+    seq = await db.scalar(floor_seq(floor)) or 0
+    snapshot = floor_cache.get(floor, seq)
+    if snapshot is None:
+        version = floor_cache.version(floor)
+        result = await db.execute(select(*DESK_COLUMNS).where(Desk.floor == floor))
+        snapshot = floor_cache.store(floor, version, seq, result.all())
+    return snapshot_response(request, snapshot)
+
+@async_desk_router.post("/desk/update/{floor}/{desk_id}", response_model=MessageOut)
+async def update_desk(floor: str, desk_id: str, desk_update: DeskUpdate, user: Principal = Depends(verify_token_async), db=Depends(get_async_db)):
+    """ Book or release a desk in one conditional UPDATE (409 if someone else got there first) """
+    if desk_update.status not in DESK_STATUSES:
+        raise HTTPException(status_code=400, detail="Status must be 'available' or 'occupied'")
+
+    now = datetime.utcnow()
+    stmt = desk_transition(desk_id, desk_update.status, user.id, floor=floor, tech_area=user.tech_area, now=now)
+    changed = (await db.execute(stmt)).all()
+    if not changed:
+        await db.rollback()
+        result = await db.execute(select(Desk).where(Desk.desk_id == desk_id, Desk.floor == floor))
+        desk = result.scalars().first()
+        reserved = desk_update.status == "occupied" and (await db.execute(reserved_desk_ids([desk_id], now, user.id))).first() is not None
+        error = transition_error(desk, user, desk_update.status, reserved)
+        if error:
+            raise error
+        return {"message": "Desk updated successfully"}
+    await db.execute(log_desk_changes(Desk.desk_id == desk_id))
+    await db.commit()
+
+    (_, tech_area), = changed
+    desk_hooks.desk_changed(desk_id, floor, tech_area, desk_update.status, user.username)
+
+    return {"message": "Desk updated successfully"}
+
+@async_desk_router.post("/batch-update/{floor}", response_model=BatchOut)
+async def batch_update_desks(floor: str, batch: DeskBatchUpdate, user: Principal = Depends(verify_token_async), db=Depends(get_async_db)):
+    """ Book or release several desks at once; all of them change or none do (one UPDATE, one commit) """
+    if batch.status not in DESK_STATUSES:
+        raise HTTPException(status_code=400, detail="Status must be 'available' or 'occupied'")
+
+    desk_ids = list(dict.fromkeys(batch.desk_ids))
+    now = datetime.utcnow()
+    stmt = desk_batch_transition(desk_ids, batch.status, user.id, floor, tech_area=user.tech_area, now=now)
+    changed = (await db.execute(stmt)).all()
+    if len(changed) != len(desk_ids):
+        await db.rollback()
+        result = await db.execute(select(Desk.desk_id, Desk.tech_area, Desk.status, Desk.user_id).where(Desk.floor == floor, Desk.desk_id.in_(desk_ids)))
+        desks = result.all()
+        reserved = (await db.execute(reserved_desk_ids(desk_ids, now, user.id))).scalars().all() if batch.status == "occupied" else ()
+        raise batch_transition_error(desks, desk_ids, user, batch.status, reserved)
+    await db.execute(log_desk_changes(Desk.desk_id.in_(desk_ids)))
+    await db.commit()
+
+    for desk_id, tech_area in changed:
+        desk_hooks.desk_changed(desk_id, floor, tech_area, batch.status, user.username)
+
+    return {"message": f"{len(desk_ids)} desks updated successfully", "updated": len(desk_ids)}
+
+@async_desk_router.get("/search/{username}", response_model=Union[DeskLocation, List[UserMatch]])
+async def search_user_desk(username: str, limit: int = Query(None, ge=1, le=100), db=Depends(get_async_db)):
+    """ Ranked, typo-tolerant user search returning desk & floor """
+    result = await db.execute(search_statement(db.bind.dialect.name, username, limit or 1))
+    matches = top_matches(result, limit or 1)
+    if not matches:
+        raise HTTPException(status_code=404, detail="User not found")
+    if limit:
+        return FastJSONResponse(matches)
+
+    if matches[0]["desk_id"] is None:
+        raise HTTPException(status_code=404, detail="User is not currently occupying any desk")
+    return {"desk_id": matches[0]["desk_id"], "floor": matches[0]["floor"]}
+
+# -------------------- 🔍 SEARCH --------------------
+
+@async_search_router.get("/search/{user_name}", response_model=Union[OccupantOut, List[OccupantOut]])
+async def search_user(user_name: str, limit: int = Query(None, ge=1, le=100), db=Depends(get_async_db)):
+    """ Search for a user’s desk across all floors """
+    await db.run_sync(occupancy_index.ensure_built)
+    results = occupancy_index.search(user_name, limit or 1)
+
+    if not results:
+        raise HTTPException(status_code=404, detail="User not found on any floor")
+    return FastJSONResponse(results if limit else results[0])
+
+# -------------------- 🔵 USERS --------------------
+
+async def _delete_user(db, user_id: int):
+    """ crud.delete_user on the async session's connection """
+    return await db.run_sync(remove_user, user_id)
+
+@async_user_router.get("/profile", response_model=ProfileOut)
+async def get_profile(user: Principal = Depends(verify_token_async)):
+    """ Get the profile of the logged-in user """
+    return {"username": user.username, "tech_area": user.tech_area}
+
+@async_user_router.put("/update-password", response_model=MessageOut)
+async def update_password(user_login: UserLogin, principal: Principal = Depends(verify_token_async), db=Depends(get_async_db)):
+    """ Update user password """
+    user = await db.get(User, principal.id)
+
+    if not await password_hasher.verify_async(user.password_hash, user_login.password):
+        raise HTTPException(status_code=401, detail="Incorrect password")
+
+    user.password_hash = await password_hasher.hash_async(user_login.password)
+    await db.commit()
+    invalidate_user(user.id)
+
+    return {"message": "Password updated successfully"}
+
+@async_user_router.delete("/delete", response_model=MessageOut)
+async def delete_account(principal: Principal = Depends(verify_token_async), db=Depends(get_async_db)):
+    """ Delete user account """
+    await _delete_user(db, principal.id)
+
+    return {"message": "User account deleted successfully"}
+
+# -------------------- 🔴 ADMIN --------------------
+
+async def _list(db, columns, criteria, cursor, limit, fmt, name):
+    if fmt != "json":
+        return export_response(columns, criteria, fmt, name)
+    return FastJSONResponse(await db.run_sync(keyset_page, columns, criteria, cursor, limit))
+
+@async_admin_router.get("/users/", response_model=UserPage)
+async def list_users(cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Get all users (Admin only) """
+    return await _list(db, USER_COLUMNS, (), cursor, limit, fmt, "users")
+
+@async_admin_router.get("/users/{tech_area}", response_model=UserPage)
+async def list_users_by_tech_area(tech_area: str, cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Get users by tech area (Admin only) """
+    return await _list(db, USER_COLUMNS, (User.tech_area == tech_area,), cursor, limit, fmt, "users")
+
+@async_admin_router.get("/desks/", response_model=DeskPage)
+async def list_desks(cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Get all desks (Admin only) """
+    return await _list(db, DESK_COLUMNS, (), cursor, limit, fmt, "desks")
+
+@async_admin_router.get("/desks/{tech_area}", response_model=DeskPage)
+async def list_desks_by_tech_area(tech_area: str, cursor: int = None, limit: int = Query(100, ge=1, le=1000), fmt: str = Query("json", alias="format", pattern=EXPORT_PATTERN), admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Get desks by tech area (Admin only) """
+    return await _list(db, DESK_COLUMNS, (Desk.tech_area == tech_area,), cursor, limit, fmt, "desks")
+
+@async_admin_router.delete("/user/{user_id}", response_model=MessageOut)
+async def delete_user(user_id: int, admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Delete a user (Admin only) """
+    if not await _delete_user(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "User deleted successfully"}
+
+@async_admin_router.put("/user/update-password/{user_id}", response_model=MessageOut)
+async def update_user_password(user_id: int, new_password: str, admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Update a user's password (Admin only) """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user.password_hash = await password_hasher.hash_async(new_password)
+    await db.commit()
+    invalidate_user(user_id)
+    return {"message": "User password updated successfully"}
+
+@async_admin_router.put("/user/update-tech-area/{user_id}", response_model=MessageOut)
+async def update_user_tech_area(user_id: int, new_tech_area: str, admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Update a user's tech area (Admin only) """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user.tech_area = new_tech_area
+    await db.commit()
+    invalidate_user(user_id)
+    return {"message": "User tech area updated successfully"}
+
+@async_admin_router.post("/reset-floor/{floor}", response_model=MessageOut)
+async def reset_floor(floor: str, admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Reset all desks on a floor (Admin only) """
+    await db.run_sync(reset_all_desks_on_floor, floor)
+    return {"message": f"All desks on {floor} have been reset"}
+
+@async_admin_router.post("/desks/bulk-status/{floor}", response_model=BatchOut)
+async def bulk_update_desk_status(floor: str, bulk: DeskBulkStatus, admin: Principal = Depends(verify_admin_async), db=Depends(get_async_db)):
+    """ Set the status of the named desks, or of every desk on the floor, clearing their users (Admin only) """
+    if bulk.status not in DESK_STATUSES:
+        raise HTTPException(status_code=400, detail="Status must be 'available' or 'occupied'")
+    if bulk.desk_ids:
+        result = await db.execute(select(Desk.desk_id).where(Desk.floor == floor, Desk.desk_id.in_(bulk.desk_ids)))
+        found = set(result.scalars())
+        missing = [desk_id for desk_id in dict.fromkeys(bulk.desk_ids) if desk_id not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Desks not found: {', '.join(missing)}")
+
+    changed = (await db.execute(bulk_desk_status(floor, bulk.status, bulk.desk_ids))).all()
+    if changed:
+        await db.execute(log_desk_changes(Desk.desk_id.in_([desk_id for desk_id, _ in changed])))
+    await db.commit()
+
+    if bulk.desk_ids is None and bulk.status == "available":
+        desk_hooks.floor_reset(floor)
+    else:
+        for desk_id, tech_area in changed:
+            desk_hooks.desk_changed(desk_id, floor, tech_area, bulk.status)
+    return {"message": f"{len(changed)} desks on {floor} set to {bulk.status}", "updated": len(changed)}
@@ -1,58 +1,198 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import List, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Desk, User
-from schemas import DeskUpdate
-import jwt
-import os
-
-SECRET_KEY = os.getenv("SECRET_KEY", "myjwtsecret")
+from schemas import DeskUpdate, DeskBatchUpdate, BatchOut, DESK_STATUSES, MessageOut, DeskLocation, UserMatch, AvailabilityOut, NearbyDesk, DeskOut, FloorDelta, FLOOR_RESPONSES
+from responses import FastJSONResponse
+from crud import desk_transition, desk_batch_transition
+from changelog import log_desk_changes, floor_delta
+from desk_stream import desk_broker, sse_events
+from desk_hooks import desk_hooks
+from floor_cache import floor_cache, floor_seq, snapshot_response, DESK_COLUMNS
+from auth import Principal, verify_token
+from spatial_index import spatial_index
+from reservations import to_utc, window_error, reserved_desk_ids
+from user_search import search_users
 
 desk_router = APIRouter()
 
-def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-@desk_router.get("/desks/{floor}")
-def get_desks(floor: str, db: Session = Depends(get_db)):
-    """ Get all desks for a specific floor """
-    desks = db.query(Desk).filter(Desk.floor == floor).all()
-    return desks
-
-@desk_router.post("/desk/update/{floor}/{desk_id}")
-def update_desk(floor: str, desk_id: str, desk_update: DeskUpdate, token: str, db: Session = Depends(get_db)):
-    """ Update desk status only if user is authorized """
-    user_data = verify_token(token)
-    user = db.query(User).filter(User.id == user_data["user_id"]).first()
-    
-    desk = db.query(Desk).filter(Desk.desk_id == desk_id, Desk.floor == floor).first()
-    if not desk:
-        raise HTTPException(status_code=404, detail="Desk not found")
+@desk_router.get("/desks/{floor}", response_model=Union[List[DeskOut], FloorDelta], responses=FLOOR_RESPONSES)
+def get_desks(floor: str, request: Request, since: int = Query(None, ge=0), db: Session = Depends(get_db)):
+    """ Get all desks for a specific floor (cached; honours If-None-Match).
+
+    With `?since=<seq>` only the desks changed after that change-log sequence
+    are returned, together with the new high-water mark `seq`.
+    """
+    if since is not None:
+        return FastJSONResponse(floor_delta(db, floor, since))
+
+    seq = db.scalar(floor_seq(floor)) or 0
+    snapshot = floor_cache.get(floor, seq)
+    if snapshot is None:
+        version = floor_cache.version(floor)
+        rows = db.query(*DESK_COLUMNS).filter(Desk.floor == floor).all()
+        snapshot = floor_cache.store(floor, version, seq, rows)
+    return snapshot_response(request, snapshot)
+
+@desk_router.get("/available", response_model=AvailabilityOut)
+def get_available_desks(start_at: datetime, end_at: datetime, tech_area: str = None, limit: int = Query(10, ge=1, le=500), user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Free desks for a tech area (default: yours) across all floors for a time window.
+
+    Answered from the in-memory occupancy bitmaps; `floors` gives the free
+    count per floor and `desks` the first `limit` free desks.
+    """
+    now = datetime.utcnow()
+    start_at, end_at = to_utc(start_at), to_utc(end_at)
+    error = window_error(start_at, end_at, now)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    from occupancy_engine import occupancy_engine  # NumPy loads on the first availability query, not at startup
+
+    occupancy_engine.ensure_built(db, now)
+    tech_area = tech_area or user.tech_area
+    result = occupancy_engine.free_desks(tech_area, start_at, end_at, limit, now)
+    return FastJSONResponse({"tech_area": tech_area, "start_at": start_at, "end_at": end_at, **result})
+
+@desk_router.get("/nearest/{username}", response_model=List[NearbyDesk])
+def get_nearest_free_desks(username: str, k: int = Query(5, ge=1, le=50), same_zone: bool = False, user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ The `k` free desks in your tech area closest to a colleague's current desk, on that desk's floor.
+
+    Answered from the in-memory spatial index; only desks with floor-plan
+    coordinates are considered. `same_zone` keeps to the colleague's zone.
+    """
+    anchor = db.execute(
+        select(Desk.desk_id, Desk.floor, Desk.x, Desk.y, Desk.zone)
+        .join(User, User.id == Desk.user_id)
+        .where(User.username == username)
+        .order_by(Desk.desk_id)
+        .limit(1)
+    ).first()
+    if anchor is None:
+        raise HTTPException(status_code=404, detail="User is not currently occupying any desk")
+    if anchor.x is None or anchor.y is None:
+        raise HTTPException(status_code=404, detail=f"Desk {anchor.desk_id} has no floor-plan coordinates")
+
+    spatial_index.ensure_built(db)
+    zone = anchor.zone if same_zone else None
+    return FastJSONResponse(spatial_index.nearest(anchor.floor, anchor.x, anchor.y, user.tech_area, k, zone))
+
+@desk_router.get("/stream/{floor}")
+async def stream_desks(floor: str, request: Request, tech_area: str = None):
+    """ Server-sent events for status changes on a floor (optionally one tech area) """
+    subscription = desk_broker.subscribe(floor, tech_area)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(sse_events(request, subscription), media_type="text/event-stream", headers=headers)
+
+def transition_error(desk, user: Principal, status: str, reserved: bool = False):
+    """ Explain why a conditional desk update matched no row; None means it was already in that state.
 
+    `reserved` says whether someone else holds a reservation on the desk right now.
+    """
+    if not desk:
+        return HTTPException(status_code=404, detail="Desk not found")
     if desk.tech_area != user.tech_area:
-        raise HTTPException(status_code=403, detail="You can only book desks in your tech area")
+        return HTTPException(status_code=403, detail="You can only book desks in your tech area")
+    if status == "occupied":
+        if desk.status == "occupied" and desk.user_id == user.id:
+            return None
+        if reserved:
+            return HTTPException(status_code=409, detail="Desk is reserved for another user right now")
+        return HTTPException(status_code=409, detail="Desk is already occupied")
+    if desk.status == "available":
+        return None
+    return HTTPException(status_code=409, detail="Desk is occupied by another user")
+
+@desk_router.post("/desk/update/{floor}/{desk_id}", response_model=MessageOut)
+def update_desk(floor: str, desk_id: str, desk_update: DeskUpdate, user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Book or release a desk in one conditional UPDATE (409 if someone else got there first) """
+    if desk_update.status not in DESK_STATUSES:
+        raise HTTPException(status_code=400, detail="Status must be 'available' or 'occupied'")
 
-    desk.status = desk_update.status
-    desk.user_id = user.id if desk_update.status == "occupied" else None
+    now = datetime.utcnow()
+    stmt = desk_transition(desk_id, desk_update.status, user.id, floor=floor, tech_area=user.tech_area, now=now)
+    changed = db.execute(stmt).all()
+    if not changed:
+        db.rollback()
+        desk = db.query(Desk).filter(Desk.desk_id == desk_id, Desk.floor == floor).first()
+        reserved = desk_update.status == "occupied" and db.execute(reserved_desk_ids([desk_id], now, user.id)).first() is not None
+        error = transition_error(desk, user, desk_update.status, reserved)
+        if error:
+            raise error
+        return {"message": "Desk updated successfully"}
+    db.execute(log_desk_changes(Desk.desk_id == desk_id))
     db.commit()
 
+    (_, tech_area), = changed  # The desk's tech area: a release may come from a holder who has since moved areas
+    desk_hooks.desk_changed(desk_id, floor, tech_area, desk_update.status, user.username)
+
     return {"message": "Desk updated successfully"}
 
-@desk_router.get("/search/{username}")
-def search_user(username: str, db: Session = Depends(get_db)):
-    """ Search for a user and return their desk & floor """
-    user = db.query(User).filter(User.username.ilike(f"%{username}%")).first()
-    if not user:
+def batch_transition_error(desks, desk_ids, user: Principal, status: str, reserved=()):
+    """ Explain why a batch UPDATE matched fewer rows than desks named.
+
+    `desks` are the rows found on the floor and `reserved` the desk ids someone
+    else holds a reservation on right now.
+    """
+    found = {desk.desk_id: desk for desk in desks}
+    missing = [desk_id for desk_id in desk_ids if desk_id not in found]
+    if missing:
+        return HTTPException(status_code=404, detail=f"Desks not found: {', '.join(missing)}")
+    if status == "occupied":
+        foreign = [desk.desk_id for desk in desks if desk.tech_area != user.tech_area]
+        if foreign:
+            return HTTPException(status_code=403, detail=f"You can only book desks in your tech area: {', '.join(foreign)}")
+        if reserved:
+            return HTTPException(status_code=409, detail=f"Desks reserved for another user right now: {', '.join(reserved)}")
+    taken = [desk.desk_id for desk in desks if desk.status != "available" and desk.user_id != user.id]
+    if taken:
+        return HTTPException(status_code=409, detail=f"Desks occupied by another user: {', '.join(taken)}")
+    if status == "available":
+        free = [desk.desk_id for desk in desks if desk.user_id != user.id]
+        if free:
+            return HTTPException(status_code=409, detail=f"Desks not booked by you: {', '.join(free)}")
+    return HTTPException(status_code=409, detail="Desks changed while booking, please retry")
+
+@desk_router.post("/batch-update/{floor}", response_model=BatchOut)
+def batch_update_desks(floor: str, batch: DeskBatchUpdate, user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Book or release several desks at once; all of them change or none do (one UPDATE, one commit) """
+    if batch.status not in DESK_STATUSES:
+        raise HTTPException(status_code=400, detail="Status must be 'available' or 'occupied'")
+
+    desk_ids = list(dict.fromkeys(batch.desk_ids))
+    now = datetime.utcnow()
+    stmt = desk_batch_transition(desk_ids, batch.status, user.id, floor, tech_area=user.tech_area, now=now)
+    changed = db.execute(stmt).all()
+    if len(changed) != len(desk_ids):
+        db.rollback()
+        desks = db.query(Desk.desk_id, Desk.tech_area, Desk.status, Desk.user_id).filter(Desk.floor == floor, Desk.desk_id.in_(desk_ids)).all()
+        reserved = db.execute(reserved_desk_ids(desk_ids, now, user.id)).scalars().all() if batch.status == "occupied" else ()
+        raise batch_transition_error(desks, desk_ids, user, batch.status, reserved)
+    db.execute(log_desk_changes(Desk.desk_id.in_(desk_ids)))
+    db.commit()
+
+    for desk_id, tech_area in changed:
+        desk_hooks.desk_changed(desk_id, floor, tech_area, batch.status, user.username)
+
+    return {"message": f"{len(desk_ids)} desks updated successfully", "updated": len(desk_ids)}
+
+@desk_router.get("/search/{username}", response_model=Union[DeskLocation, List[UserMatch]])
+def search_user(username: str, limit: int = Query(None, ge=1, le=100), db: Session = Depends(get_db)):
+    """ Ranked, typo-tolerant user search returning desk & floor.
+
+    Without `limit` the best match's desk is returned; with `limit` the top-N
+    users are returned as a list (`desk_id`/`floor` null for users without one).
+    """
+    matches = search_users(db, username, limit or 1)
+    if not matches:
         raise HTTPException(status_code=404, detail="User not found")
+    if limit:
+        return FastJSONResponse(matches)
 
-    desk = db.query(Desk).filter(Desk.user_id == user.id).first()
-    if not desk:
+    if matches[0]["desk_id"] is None:
         raise HTTPException(status_code=404, detail="User is not currently occupying any desk")
-
-    return {"desk_id": desk.desk_id, "floor": desk.floor}
\ No newline at end of file
+    return {"desk_id": matches[0]["desk_id"], "floor": matches[0]["floor"]}
\ No newline at end of file
@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Desk, Reservation
+from schemas import ReservationCreate, ReservationOut, FreeDesksOut, MessageOut
+from responses import FastJSONResponse
+from auth import Principal, verify_token
+from desk_hooks import desk_hooks
+from changelog import bump_reservations_version
+from reservations import to_utc, window_error, reserve_desk, free_desks, user_reservations, overlapping
+
+reservation_router = APIRouter()
+
+def _window(start_at: datetime, end_at: datetime, now: datetime):
+    start_at, end_at = to_utc(start_at), to_utc(end_at)
+    error = window_error(start_at, end_at, now)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return start_at, end_at
+
+@reservation_router.get("/free/{floor}", response_model=FreeDesksOut)
+def get_free_desks(floor: str, start_at: datetime, end_at: datetime, tech_area: str = None, user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Desks on a floor that are free for the whole window (defaults to your tech area) """
+    now = datetime.utcnow()
+    start_at, end_at = _window(start_at, end_at, now)
+    tech_area = tech_area or user.tech_area
+    return FastJSONResponse({"floor": floor, "tech_area": tech_area, "start_at": start_at, "end_at": end_at,
+                             "desks": free_desks(db, floor, tech_area, start_at, end_at, now)})
+
+@reservation_router.post("/{floor}/{desk_id}", response_model=ReservationOut, status_code=201)
+def create_reservation(floor: str, desk_id: str, window: ReservationCreate, user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Reserve a desk for a time window (409 if it overlaps another reservation) """
+    now = datetime.utcnow()
+    start_at, end_at = _window(window.start_at, window.end_at, now)
+
+    try:
+        reservation_id = db.execute(reserve_desk(desk_id, floor, user.id, user.tech_area, start_at, end_at, now)).scalar()
+    except IntegrityError:  # A concurrent overlapping reservation won (PostgreSQL's EXCLUDE constraint)
+        reservation_id = None
+    if reservation_id is None:
+        db.rollback()
+        desk = db.query(Desk).filter(Desk.desk_id == desk_id, Desk.floor == floor).first()
+        if not desk:
+            raise HTTPException(status_code=404, detail="Desk not found")
+        if desk.tech_area != user.tech_area:
+            raise HTTPException(status_code=403, detail="You can only book desks in your tech area")
+        if db.query(Reservation.id).filter(overlapping(start_at, end_at, desk_id)).first():
+            raise HTTPException(status_code=409, detail="Desk is already reserved for part of that window")
+        if start_at <= now and desk.status == "occupied" and desk.user_id != user.id:
+            raise HTTPException(status_code=409, detail="Desk is occupied right now")
+        raise HTTPException(status_code=409, detail="You already hold a reservation overlapping that window")
+    db.execute(bump_reservations_version())
+    db.commit()
+
+    desk_hooks.reserved(reservation_id, desk_id, floor, start_at, end_at)
+
+    return ReservationOut(id=reservation_id, desk_id=desk_id, floor=floor, tech_area=user.tech_area, start_at=start_at, end_at=end_at)
+
+@reservation_router.get("/mine", response_model=List[ReservationOut])
+def get_my_reservations(user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Your current and upcoming reservations; expired ones drop out on their own """
+    return FastJSONResponse(user_reservations(db, user.id, datetime.utcnow()))
+
+@reservation_router.delete("/{reservation_id}", response_model=MessageOut)
+def cancel_reservation(reservation_id: int, user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    """ Cancel one of your reservations (admins can cancel any) """
+    reservation = db.get(Reservation, reservation_id)
+    if not reservation or (reservation.user_id != user.id and user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    desk_id, floor = reservation.desk_id, reservation.floor
+    db.delete(reservation)
+    db.execute(bump_reservations_version())
+    db.commit()
+
+    desk_hooks.reservation_cancelled(reservation_id, desk_id, floor)
+    return {"message": "Reservation cancelled"}
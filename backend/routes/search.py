@@ -1,30 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Union
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
-from models import User, Desk
+from search_index import occupancy_index
+from schemas import OccupantOut
+from responses import FastJSONResponse
 
 search_router = APIRouter()
 
-@search_router.get("/search/{user_name}")
-def search_user(user_name: str, db: Session = Depends(get_db)):
-    """ Search for a user’s desk across all floors """
-    user_name = user_name.strip().lower()
-    result = None
+@search_router.get("/search/{user_name}", response_model=Union[OccupantOut, List[OccupantOut]])
+def search_user(user_name: str, limit: int = Query(None, ge=1, le=100), db: Session = Depends(get_db)):
+    """ Search for a user’s desk across all floors.
 
-    # Iterate through all desks to find a match
-    desks = db.query(Desk).filter(Desk.status == "occupied").all()
-    for desk in desks:
-        user = db.query(User).filter(User.id == desk.user_id).first()
-        if user and user.username.lower().startswith(user_name):  # Partial match
-            result = {
-                "desk_id": desk.desk_id,
-                "floor": desk.floor,
-                "tech_area": desk.tech_area,
-                "user": user.username
-            }
-            break  # Stop on first match
+    Without `limit` the first match is returned; with `limit` the top-N
+    matches (ordered by username) are returned as a list.
+    """
+    occupancy_index.ensure_built(db)
+    results = occupancy_index.search(user_name, limit or 1)
 
-    if result:
-        return result
-    else:
+    if not results:
         raise HTTPException(status_code=404, detail="User not found on any floor")
+    return FastJSONResponse(results if limit else results[0])
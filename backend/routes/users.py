@@ -2,38 +2,35 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
-from schemas import UserLogin
-from auth import verify_token
-from werkzeug.security import generate_password_hash
+from schemas import UserLogin, ProfileOut, MessageOut
+from auth import Principal, verify_token, invalidate_user
+from hashing import password_hasher
+from crud import delete_user
 
 user_router = APIRouter()
 
-@user_router.get("/profile")
-def get_profile(user: User = Depends(verify_token), db: Session = Depends(get_db)):
+@user_router.get("/profile", response_model=ProfileOut)
+def get_profile(user: Principal = Depends(verify_token)):
     """ Get the profile of the logged-in user """
     return {"username": user.username, "tech_area": user.tech_area}
 
-@user_router.put("/update-password")
-def update_password(user_login: UserLogin, token: str, db: Session = Depends(get_db)):
+@user_router.put("/update-password", response_model=MessageOut)
+def update_password(user_login: UserLogin, principal: Principal = Depends(verify_token), db: Session = Depends(get_db)):
     """ Update user password """
-    user_data = verify_token(token)
-    user = db.query(User).filter(User.id == user_data["user_id"]).first()
+    user = db.query(User).filter(User.id == principal.id).first()
     
     if not user.verify_password(user_login.password):
         raise HTTPException(status_code=401, detail="Incorrect password")
     
-    user.password_hash = generate_password_hash(user_login.password)
+    user.password_hash = password_hasher.hash(user_login.password)
     db.commit()
+    invalidate_user(user.id)
     
     return {"message": "Password updated successfully"}
 
-@user_router.delete("/delete")
-def delete_account(token: str, db: Session = Depends(get_db)):
+@user_router.delete("/delete", response_model=MessageOut)
+def delete_account(principal: Principal = Depends(verify_token), db: Session = Depends(get_db)):
     """ Delete user account """
-    user_data = verify_token(token)
-    user = db.query(User).filter(User.id == user_data["user_id"]).first()
-    
-    db.delete(user)
-    db.commit()
+    delete_user(db, principal.id)
     
     return {"message": "User account deleted successfully"}
@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from config import Config
+
+DESK_STATUSES = ("available", "occupied")
 
 class UserCreate(BaseModel):
     username: str
@@ -16,3 +21,160 @@ class DeskCreate(BaseModel):
 
 class DeskUpdate(BaseModel):
     status: str
+
+class DeskBatchUpdate(BaseModel):
+    status: str
+    desk_ids: List[str] = Field(min_length=1, max_length=Config.DESK_BATCH_MAX)
+
+class DeskBulkStatus(BaseModel):
+    status: str
+    desk_ids: Optional[List[str]] = Field(None, min_length=1, max_length=Config.DESK_BATCH_MAX)  # None = the whole floor
+
+# -------------------- 📄 ADMIN LISTINGS --------------------
+
+class UserOut(BaseModel):
+    id: int
+    username: str
+    role: Optional[str] = None
+    tech_area: str
+
+class DeskOut(BaseModel):
+    id: int
+    desk_id: str
+    floor: str
+    status: Optional[str] = None
+    user_id: Optional[int] = None
+    tech_area: str
+
+class UserPage(BaseModel):
+    items: List[UserOut]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= for the next page
+
+class DeskPage(BaseModel):
+    items: List[DeskOut]
+    next_cursor: Optional[int] = None
+
+# -------------------- 📅 RESERVATIONS --------------------
+
+class ReservationCreate(BaseModel):
+    start_at: datetime  # Naive values are taken as UTC
+    end_at: datetime
+
+class ReservationOut(BaseModel):
+    id: int
+    desk_id: str
+    floor: str
+    tech_area: str
+    start_at: datetime
+    end_at: datetime
+
+# -------------------- 📤 RESPONSES --------------------
+#
+# Lightweight shapes for the remaining routes. Small ones are serialized by
+# FastAPI through Pydantic; the hot list routes return pre-encoded
+# `responses.FastJSONResponse` bodies and use these only for the docs.
+
+class MessageOut(BaseModel):
+    message: str
+
+class TokenOut(BaseModel):
+    access_token: str
+    token_type: str
+
+class BatchOut(BaseModel):
+    message: str
+    updated: int  # Desks whose state changed
+
+class ProfileOut(BaseModel):
+    username: str
+    tech_area: str
+
+class DeskLocation(BaseModel):
+    desk_id: str
+    floor: str
+
+class UserMatch(BaseModel):
+    username: str
+    desk_id: Optional[str] = None  # Null when the user holds no desk
+    floor: Optional[str] = None
+
+class NearbyDesk(BaseModel):
+    desk_id: str
+    floor: str
+    zone: Optional[str] = None
+    x: float
+    y: float
+    distance: float  # From the colleague's desk, in floor-plan units
+
+class OccupantOut(BaseModel):
+    desk_id: str
+    floor: str
+    tech_area: str
+    user: str
+
+class DeskState(BaseModel):
+    id: Optional[int] = None  # Full floors only; deltas come from the change log
+    desk_id: str
+    floor: str
+    status: Optional[str] = None
+    user_id: Optional[int] = None
+    tech_area: str
+    deleted: bool = False  # Removed from the floor (deltas only)
+
+class FloorDelta(BaseModel):
+    full: bool
+    since: int
+    seq: int
+    desks: List[DeskState]
+
+# /desk/desks/{floor} sends pre-serialized bytes, so its models only document the response
+FLOOR_RESPONSES = {
+    200: {"description": "The whole floor, or with `?since=` a FloorDelta"},
+    304: {"description": "The snapshot named in If-None-Match is still current"},
+}
+
+class FreeDesksOut(BaseModel):
+    floor: str
+    tech_area: str
+    start_at: datetime
+    end_at: datetime
+    desks: List[str]
+
+class AvailabilityOut(BaseModel):
+    tech_area: str
+    start_at: datetime
+    end_at: datetime
+    total: int
+    floors: Dict[str, int]
+    desks: List[DeskLocation]
+
+class ImportOut(BaseModel):
+    message: str
+    inserted: int
+    skipped: int
+    failed: int
+    errors: List[str]
+    timings_ms: Dict[str, float]
+
+class CompactionOut(BaseModel):
+    deleted: int
+    compacted_through: int
+
+class OccupancyBucket(BaseModel):
+    bucket: datetime  # Start of the UTC hour or day
+    floor: str
+    tech_area: str
+    bookings: int
+    releases: int
+    desk_hours: float
+    occupied_hours: float
+    utilization: float  # occupied_hours / desk_hours
+    peak_occupied: int
+
+class OccupancySummary(BaseModel):
+    group: str  # The floor or tech area
+    bookings: int
+    releases: int
+    desk_hours: float
+    occupied_hours: float
+    utilization: float
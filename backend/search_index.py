@@ -0,0 +1,153 @@
+import bisect
+import threading
+from sqlalchemy.orm import Session
+from models import Desk, User
+from desk_hooks import DeskListener, desk_hooks
+from changelog import changes_after, high_water_mark, layout_version
+
+# -------------------- 🟢 OCCUPANCY PREFIX INDEX --------------------
+
+class OccupancyIndex(DeskListener):
+    """ In-process prefix index from lowercase username to the desk(s) that user occupies.
+
+    Keys are kept in a sorted list so a prefix lookup is a bisect plus a short
+    forward walk. The index is built once from a single joined query and then
+    kept current through the `desk_hooks` listener methods below; writes made
+    by other workers are replayed from the change log on the next search.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._layout = None  # Layout version the index was built from
+        self._seq = 0        # Change-log seq the index has caught up to
+        self._keys = []      # sorted list of (lowercase username, desk_id)
+        self._desks = {}     # desk_id -> record dict
+        self._floors = {}    # floor -> set of desk_ids
+
+    def ensure_built(self, db: Session):
+        """ Build the index on first use (again after a bulk desk load) and catch up with the change log """
+        layout, seq = db.scalar(layout_version()), high_water_mark(db)
+        if self._built and self._layout == layout and self._seq == seq:
+            return
+        with self._lock:
+            if self._built and self._layout == layout:
+                if self._seq == seq:
+                    return
+                changes = changes_after(db, self._seq, seq)
+                if changes is not None:
+                    for desk_id, floor, tech_area, status, username, deleted in changes:
+                        self.desk_changed(desk_id, floor, tech_area, None if deleted else status, username)
+                    self._seq = seq
+                    return
+            rows = (
+                db.query(Desk.desk_id, Desk.floor, Desk.tech_area, User.username)
+                .join(User, User.id == Desk.user_id)
+                .filter(Desk.status == "occupied")
+                .all()
+            )
+            self._keys, self._desks, self._floors = [], {}, {}
+            for desk_id, floor, tech_area, username in rows:
+                self._add(desk_id, floor, tech_area, username)
+            self._layout, self._seq = layout, seq
+            self._built = True
+
+    def invalidate(self):
+        """ Drop the index so the next search rebuilds it from the database """
+        with self._lock:
+            self._built = False
+            self._keys, self._desks, self._floors = [], {}, {}
+
+    # -------------------- 🔵 INCREMENTAL UPDATES --------------------
+
+    def occupy(self, desk_id: str, floor: str, tech_area: str, username: str):
+        """ Record that `username` now occupies `desk_id` """
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(desk_id)
+            self._add(desk_id, floor, tech_area, username)
+
+    def release(self, desk_id: str):
+        """ Record that `desk_id` is no longer occupied """
+        with self._lock:
+            if self._built:
+                self._remove(desk_id)
+
+    def release_floor(self, floor: str):
+        """ Record that every desk on `floor` has been freed """
+        with self._lock:
+            if not self._built:
+                return
+            for desk_id in list(self._floors.get(floor, ())):
+                self._remove(desk_id)
+
+    def remove_user(self, username: str):
+        """ Drop every desk entry held by `username` (e.g. after the user is deleted) """
+        with self._lock:
+            if not self._built:
+                return
+            key = username.lower()
+            pos = bisect.bisect_left(self._keys, (key, ""))
+            desk_ids = []
+            while pos < len(self._keys) and self._keys[pos][0] == key:
+                desk_ids.append(self._keys[pos][1])
+                pos += 1
+            for desk_id in desk_ids:
+                self._remove(desk_id)
+
+    # Listener hooks fired by the mutation paths
+
+    def desk_changed(self, desk_id, floor, tech_area, status, username=None):
+        if status == "occupied" and username:
+            self.occupy(desk_id, floor, tech_area, username)
+        else:
+            self.release(desk_id)
+
+    def floor_reset(self, floor):
+        self.release_floor(floor)
+
+    def user_removed(self, user_id, username):
+        self.remove_user(username)
+
+    def desks_loaded(self, floors):
+        self.invalidate()  # Bulk loads can assign users, so rebuild on the next search
+
+    # -------------------- 🔴 LOOKUP --------------------
+
+    def search(self, prefix: str, limit: int = 1):
+        """ Return up to `limit` desk records whose username starts with `prefix` """
+        prefix = prefix.strip().lower()
+        with self._lock:
+            pos = bisect.bisect_left(self._keys, (prefix, ""))
+            results = []
+            while pos < len(self._keys) and len(results) < limit:
+                key, desk_id = self._keys[pos]
+                if not key.startswith(prefix):
+                    break
+                results.append(dict(self._desks[desk_id]))
+                pos += 1
+            return results
+
+    def _add(self, desk_id, floor, tech_area, username):
+        self._desks[desk_id] = {
+            "desk_id": desk_id,
+            "floor": floor,
+            "tech_area": tech_area,
+            "user": username,
+        }
+        self._floors.setdefault(floor, set()).add(desk_id)
+        bisect.insort(self._keys, (username.lower(), desk_id))
+
+    def _remove(self, desk_id):
+        record = self._desks.pop(desk_id, None)
+        if record is None:
+            return
+        self._floors.get(record["floor"], set()).discard(desk_id)
+        entry = (record["user"].lower(), desk_id)
+        pos = bisect.bisect_left(self._keys, entry)
+        if pos < len(self._keys) and self._keys[pos] == entry:
+            del self._keys[pos]
+
+
+occupancy_index = desk_hooks.register(OccupancyIndex())
@@ -1,37 +1,260 @@
+""" Sync the desk layout in data/*.json into the database.
+
+Each floor file looks like data/L2.json: `{"desks": {"<desk_id>": {"status",
+"user", "tech_area"}}}`, with the floor taken from the file name (or a
+per-desk "floor" key). Desks may also carry "x"/"y" floor-plan coordinates
+and a "zone", which feed the nearest-desk index. Files are parsed in parallel, usernames are resolved
+with one bulk lookup, and the result is diffed against the database so only
+real inserts, updates and deletes are applied, in batched transactions that
+also write the desk change log. Running it twice changes nothing.
+
+Existing desks only get their layout (floor, tech area, position, zone)
+synced; their occupancy belongs to the running app and is left as booked
+unless `--reset-occupancy` is given. New desks take "status" and "user" from
+the file. Desks that are missing from a floor file are deleted from that
+floor; floors without a file are left alone.
+
+API workers learn about a sync through the database, not through
+`desk_hooks`: every change is in the change log (floor snapshots) and the
+layout version is bumped (nearest-desk, availability and search indexes).
+
+Usage (from backend/):
+    python seed_db.py                       # sync every file in ../data
+    python seed_db.py ../data/L2.json       # sync one floor
+    python seed_db.py --dry-run             # show the diff without writing
+    python seed_db.py --reset-occupancy     # also overwrite status/user of existing desks
+"""
+import argparse
+import glob
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models import Desk, User
-
-def load_json_to_db():
-    db: Session = SessionLocal()
-
-    # Load JSON file
-    with open("..\\data\\L2.json", "r") as f:
-        data = json.load(f)
-
-    # Insert desks into database
-    for desk_id, details in data["desks"].items():
-        user = None
-
-        # If a user is present, find their ID
-        if details["user"]:
-            user = db.query(User).filter(User.username == details["user"]).first()
-            if not user:
-                print(f"⚠️ User '{details['user']}' not found in database!")
-
-        new_desk = Desk(
-            desk_id=desk_id,
-            floor="L2",  # Fixed floor since we're importing L2.json
-            status=details["status"],
-            tech_area=details["tech_area"],
-            user_id=user.id if user else None  # Assign user_id if found
-        )
-        db.add(new_desk)
-
-    db.commit()
-    db.close()
-    print("✅ Successfully imported L2.json into the database!")
+from models import Desk, User, Reservation
+from schemas import DESK_STATUSES
+from changelog import log_desk_changes, bump_layout_version, bump_reservations_version
+from importer import desk_position
+from desk_hooks import desk_hooks
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+LAYOUT_FIELDS = ("floor", "tech_area", "x", "y", "zone")  # Synced onto existing desks
+OCCUPANCY_FIELDS = ("status", "user_id")                   # Only set on insert, or with --reset-occupancy
+LOOKUP_CHUNK = 5000  # Usernames per IN (...) lookup, well under SQLite's bound-parameter limit
+
+# -------------------- 🟢 READING FLOOR FILES --------------------
+
+def load_floor_file(path: str):
+    """ Parse one floor file into (desk records, skipped desk_ids, errors); runs in a worker process """
+    floor = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding="utf-8") as f:
+        desks = json.load(f).get("desks", {})
+    records, skipped, errors = [], [], []
+    for desk_id, details in desks.items():
+        status = details.get("status") or "available"
+        position, problem = None, ""
+        try:
+            position = desk_position(details)
+        except ValueError as e:
+            problem = f" ({e})"
+        if not details.get("tech_area") or status not in DESK_STATUSES or position is None:
+            errors.append(f"{os.path.basename(path)}: invalid desk record '{desk_id}'{problem} left unchanged")
+            skipped.append(desk_id)
+            continue
+        records.append({
+            "desk_id": desk_id,
+            "floor": details.get("floor") or floor,
+            "status": status,
+            "tech_area": details["tech_area"],
+            "user": details.get("user") or None,
+            **position,
+        })
+    return records, skipped, errors
+
+def read_floor_files(paths, workers: int = None):
+    """ Parse every file, in parallel when there is more than one; returns (records, skipped, errors) """
+    if len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers or min(len(paths), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(load_floor_file, paths))
+    else:
+        results = [load_floor_file(path) for path in paths]
+
+    records, skipped, errors, seen = [], set(), [], set()
+    for file_records, file_skipped, file_errors in results:
+        skipped.update(file_skipped)
+        errors += file_errors
+        for record in file_records:
+            if record["desk_id"] in seen:
+                errors.append(f"duplicate desk '{record['desk_id']}' ignored on floor {record['floor']}")
+                continue
+            seen.add(record["desk_id"])
+            records.append(record)
+    return records, skipped, errors
+
+# -------------------- 🔵 DIFF --------------------
+
+class SyncPlan:
+    """ Rows to insert, update and delete, plus bookkeeping for the report """
+
+    def __init__(self):
+        self.inserts = []          # Desk column dicts
+        self.updates = []          # Desk column dicts including the primary key `id`
+        self.moved = []            # desk_ids changing floor (logged as deleted on their old floor)
+        self.deletes = []          # (id, desk_id) of desks missing from their floor file
+        self.unknown_users = set()
+        self.floors = set()
+        self.timings = {}
+
+    def timed(self, phase: str, started: float):
+        self.timings[phase] = round((time.perf_counter() - started) * 1000, 2)
+
+    def summary(self):
+        return {
+            "inserts": len(self.inserts), "updates": len(self.updates), "deletes": len(self.deletes),
+            "unknown_users": sorted(self.unknown_users), "timings_ms": self.timings,
+        }
+
+def resolve_usernames(db: Session, usernames):
+    """ username -> id for every name in `usernames`, in as few queries as possible """
+    names = sorted(usernames)
+    ids = {}
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        chunk = names[start:start + LOOKUP_CHUNK]
+        ids.update(db.execute(select(User.username, User.id).where(User.username.in_(chunk))).all())
+    return ids
+
+def plan_sync(db: Session, records, skipped=(), delete_missing: bool = True, reset_occupancy: bool = False):
+    """ Compare the parsed records with the database and return a SyncPlan.
+
+    Existing desks are diffed on their layout only, plus their occupancy when
+    `reset_occupancy` is set.
+    """
+    plan = SyncPlan()
+    plan.floors = {record["floor"] for record in records}
+    fields = LAYOUT_FIELDS + OCCUPANCY_FIELDS if reset_occupancy else LAYOUT_FIELDS
+
+    started = time.perf_counter()
+    user_ids = resolve_usernames(db, {record["user"] for record in records if record["user"]})
+    plan.timed("lookup", started)
+
+    started = time.perf_counter()
+    current = {
+        row.desk_id: row
+        for row in db.execute(select(Desk.id, Desk.desk_id, *[getattr(Desk, field) for field in fields]))
+    }
+    incoming = set(skipped)  # Invalid records are reported and left alone, never deleted
+    for record in records:
+        username = record.pop("user")
+        record["user_id"] = user_ids.get(username)
+        incoming.add(record["desk_id"])
+
+        existing = current.get(record["desk_id"])
+        if existing is None or reset_occupancy:
+            if username and record["user_id"] is None:
+                plan.unknown_users.add(username)
+        if existing is None:
+            plan.inserts.append(record)
+        elif any(getattr(existing, field) != record[field] for field in fields):
+            plan.updates.append({"id": existing.id, "desk_id": record["desk_id"], **{field: record[field] for field in fields}})
+            if existing.floor != record["floor"]:
+                plan.moved.append(record["desk_id"])
+                plan.floors.add(existing.floor)
+
+    if delete_missing:
+        plan.deletes = [
+            (row.id, row.desk_id) for row in current.values()
+            if row.floor in plan.floors and row.desk_id not in incoming
+        ]
+    plan.timed("diff", started)
+    return plan
+
+# -------------------- 🔴 APPLY --------------------
+
+def _batches(rows, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def apply_sync(db: Session, plan: SyncPlan, batch_size: int = 1000):
+    """ Apply the plan in batched transactions, logging every change; returns the plan's summary """
+    started = time.perf_counter()
+    for batch in _batches(plan.deletes, batch_size):
+        ids, desk_ids = [row[0] for row in batch], [row[1] for row in batch]
+        db.execute(log_desk_changes(Desk.id.in_(ids), deleted=True))
+        db.execute(delete(Reservation).where(Reservation.desk_id.in_(desk_ids)))
+        db.execute(bump_reservations_version())
+        db.execute(delete(Desk).where(Desk.id.in_(ids)))
+        db.execute(bump_layout_version())
+        db.commit()
+    plan.timed("delete", started)
+
+    started = time.perf_counter()
+    moved = set(plan.moved)
+    for batch in _batches(plan.updates, batch_size):
+        desk_ids = [row["desk_id"] for row in batch]
+        leaving = [desk_id for desk_id in desk_ids if desk_id in moved]
+        if leaving:
+            db.execute(log_desk_changes(Desk.desk_id.in_(leaving), deleted=True))  # Gone from the old floor
+        db.execute(update(Desk), batch)
+        db.execute(log_desk_changes(Desk.desk_id.in_(desk_ids)))
+        db.execute(bump_layout_version())
+        db.commit()
+    plan.timed("update", started)
+
+    started = time.perf_counter()
+    for batch in _batches(plan.inserts, batch_size):
+        db.execute(insert(Desk), batch)
+        db.execute(log_desk_changes(Desk.desk_id.in_([row["desk_id"] for row in batch])))
+        db.execute(bump_layout_version())
+        db.commit()
+    plan.timed("insert", started)
+
+    if plan.inserts or plan.updates or plan.deletes:
+        desk_hooks.desks_loaded(plan.floors)  # Caches in this process only; workers see the layout version
+    return plan.summary()
+
+def sync_floor_files(db: Session, paths, dry_run: bool = False, delete_missing: bool = True, batch_size: int = 1000, workers: int = None,
+                     reset_occupancy: bool = False):
+    """ Read, diff and (unless `dry_run`) apply; returns (summary, errors, plan) """
+    started = time.perf_counter()
+    records, skipped, errors = read_floor_files(paths, workers)
+    parse_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    plan = plan_sync(db, records, skipped, delete_missing, reset_occupancy)
+    plan.timings = {"parse": parse_ms, **plan.timings}
+    summary = plan.summary() if dry_run else apply_sync(db, plan, batch_size)
+    return summary, errors, plan
 
 if __name__ == "__main__":
-    load_json_to_db()
+    parser = argparse.ArgumentParser(description="Sync floor layout files into the database")
+    parser.add_argument("files", nargs="*", help="Floor files (default: every *.json in ../data)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the diff without writing anything")
+    parser.add_argument("--keep-missing", action="store_true", help="Do not delete desks missing from their floor file")
+    parser.add_argument("--reset-occupancy", action="store_true", help="Also overwrite status and user of existing desks")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: one per file, up to the CPU count)")
+    args = parser.parse_args()
+
+    paths = args.files or sorted(glob.glob(os.path.join(DATA_DIR, "*.json")))
+    db = SessionLocal()
+    try:
+        summary, errors, plan = sync_floor_files(db, paths, args.dry_run, not args.keep_missing, args.batch_size, args.workers,
+                                                 args.reset_occupancy)
+    finally:
+        db.close()
+
+    for error in errors:
+        print(f"⚠️ {error}")
+    for username in summary["unknown_users"]:
+        print(f"⚠️ User '{username}' not found in database; desk left unassigned")
+    if args.dry_run:
+        for label, rows in (("+", plan.inserts), ("~", plan.updates)):
+            for row in rows[:10]:
+                print(f"  {label} {row['floor']} {row['desk_id']} {row.get('status', '')} {row['tech_area']}")
+        for _, desk_id in plan.deletes[:10]:
+            print(f"  - {desk_id}")
+    verb = "Would apply" if args.dry_run else "✅ Applied"
+    print(f"{verb} {summary['inserts']} inserts, {summary['updates']} updates, {summary['deletes']} deletes "
+          f"across {len(paths)} file(s) on {len(plan.floors)} floor(s)")
+    print("   " + ", ".join(f"{phase} {ms} ms" for phase, ms in summary["timings_ms"].items()))
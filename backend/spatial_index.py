@@ -0,0 +1,173 @@
+""" Per-floor grid index of desk coordinates for nearest-free-desk queries.
+
+Desks that have `x`/`y` coordinates are bucketed into a uniform grid per
+floor, sized so a cell holds a handful of desks. Every cell keeps one set of
+free desk ids per tech area, so "the K nearest available desks in tech area T
+to point P" walks rings of cells outwards from P and stops as soon as the next
+ring cannot hold anything closer than the K-th desk found so far. Occupied
+desks and other tech areas are never touched.
+
+Availability follows `desks.status`, as on the floor listing. The index is
+built once from a single query and then kept current through the
+`desk_hooks` listener methods, plus a replay of the desk change log on each
+use for bookings made by other workers.
+"""
+import heapq
+import math
+import threading
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Desk
+from changelog import changes_after, high_water_mark, layout_version
+from desk_hooks import DeskListener, desk_hooks
+
+DESKS_PER_CELL = 4
+
+# -------------------- 🟢 FLOOR GRIDS --------------------
+
+class FloorGrid:
+    """ Uniform grid over one floor's placed desks """
+
+    __slots__ = ("origin_x", "origin_y", "cell", "columns", "rows", "cells", "desks")
+
+    def __init__(self, placed):
+        xs, ys = [x for _, _, x, _, _ in placed], [y for _, _, _, y, _ in placed]
+        self.origin_x, self.origin_y = min(xs), min(ys)
+        span = max(max(xs) - self.origin_x, max(ys) - self.origin_y)
+        per_side = max(1, int(math.sqrt(len(placed) / DESKS_PER_CELL)))
+        self.cell = span / per_side or 1.0
+        self.columns = int((max(xs) - self.origin_x) / self.cell) + 1
+        self.rows = int((max(ys) - self.origin_y) / self.cell) + 1
+        self.cells = {}  # (column, row) -> {tech_area: set of free desk_ids}
+        self.desks = {}  # desk_id -> (tech_area, x, y, zone, (column, row))
+        for desk_id, tech_area, x, y, zone in placed:
+            self.desks[desk_id] = (tech_area, x, y, zone, self.locate(x, y))
+
+    def locate(self, x: float, y: float):
+        """ The cell holding (x, y), clamped to the grid """
+        column = min(self.columns - 1, max(0, int((x - self.origin_x) / self.cell)))
+        row = min(self.rows - 1, max(0, int((y - self.origin_y) / self.cell)))
+        return column, row
+
+    def set_free(self, desk_id: str, free: bool):
+        tech_area, _, _, _, cell = self.desks[desk_id]
+        if free:
+            self.cells.setdefault(cell, {}).setdefault(tech_area, set()).add(desk_id)
+        elif (members := self.cells.get(cell, {}).get(tech_area)) is not None:
+            members.discard(desk_id)
+
+    def nearest(self, x: float, y: float, tech_area: str, k: int, zone: str = None):
+        """ Up to `k` (distance, desk_id) pairs of free desks in `tech_area`, closest first """
+        center_column, center_row = self.locate(x, y)
+        best = []  # Max-heap of (-distance, desk_id), at most k long
+        widest = max(center_column, self.columns - 1 - center_column, center_row, self.rows - 1 - center_row)
+        for ring in range(widest + 1):
+            # Everything in this ring or beyond is at least (ring - 1) cells away from the point
+            if len(best) == k and (ring - 1) * self.cell > -best[0][0]:
+                break
+            for cell in _ring(center_column, center_row, ring):
+                for desk_id in self.cells.get(cell, {}).get(tech_area, ()):
+                    _, desk_x, desk_y, desk_zone, _ = self.desks[desk_id]
+                    if zone is not None and desk_zone != zone:
+                        continue
+                    entry = (-math.hypot(desk_x - x, desk_y - y), desk_id)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+        return sorted((-distance, desk_id) for distance, desk_id in best)
+
+def _ring(column: int, row: int, ring: int):
+    """ Cells whose Chebyshev distance from (column, row) is exactly `ring` """
+    if ring == 0:
+        yield column, row
+        return
+    for offset in range(-ring, ring + 1):
+        yield column + offset, row - ring
+        yield column + offset, row + ring
+    for offset in range(-ring + 1, ring):
+        yield column - ring, row + offset
+        yield column + ring, row + offset
+
+# -------------------- 🔵 INDEX --------------------
+
+class SpatialIndex(DeskListener):
+    """ FloorGrid per floor, built on first use and kept current through `desk_hooks` """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._layout = None  # Layout version the grids were built from
+        self._seq = 0        # Change-log seq the grids have caught up to
+        self._floors = {}    # floor -> FloorGrid
+
+    def ensure_built(self, db: Session):
+        """ Build the grids on first use (again after a bulk desk load by any process) and catch up with the change log """
+        layout, seq = db.scalar(layout_version()), high_water_mark(db)
+        if self._built and self._layout == layout and self._seq == seq:
+            return
+        with self._lock:
+            if self._built and self._layout == layout:
+                if self._seq == seq:
+                    return
+                changes = changes_after(db, self._seq, seq)
+                if changes is not None:
+                    for desk_id, floor, tech_area, status, username, deleted in changes:
+                        self.desk_changed(desk_id, floor, tech_area, None if deleted else status, username)
+                    self._seq = seq
+                    return
+            rows = db.execute(
+                select(Desk.desk_id, Desk.floor, Desk.tech_area, Desk.status, Desk.x, Desk.y, Desk.zone)
+                .where(Desk.x.is_not(None), Desk.y.is_not(None))
+            ).all()
+            by_floor = {}
+            for desk_id, floor, tech_area, status, x, y, zone in rows:
+                by_floor.setdefault(floor, []).append((desk_id, tech_area, x, y, zone, status))
+            self._floors = {}
+            for floor, desks in by_floor.items():
+                grid = FloorGrid([desk[:5] for desk in desks])
+                for desk_id, _, _, _, _, status in desks:
+                    grid.set_free(desk_id, status == "available")
+                self._floors[floor] = grid
+            self._layout, self._seq = layout, seq
+            self._built = True
+
+    def invalidate(self):
+        """ Drop every grid so the next query rebuilds from the database """
+        with self._lock:
+            self._built = False
+            self._floors = {}
+
+    def nearest(self, floor: str, x: float, y: float, tech_area: str, k: int, zone: str = None):
+        """ Up to `k` free desks in `tech_area` on `floor` closest to (x, y), as dicts with their distance """
+        with self._lock:
+            grid = self._floors.get(floor)
+            if grid is None:
+                return []
+            results = []
+            for distance, desk_id in grid.nearest(x, y, tech_area, k, zone):
+                _, desk_x, desk_y, desk_zone, _ = grid.desks[desk_id]
+                results.append({"desk_id": desk_id, "floor": floor, "zone": desk_zone, "x": desk_x, "y": desk_y,
+                                "distance": round(distance, 3)})
+            return results
+
+    # -------------------- 🔴 INCREMENTAL UPDATES --------------------
+
+    def desk_changed(self, desk_id, floor, tech_area, status, username=None):
+        with self._lock:
+            grid = self._floors.get(floor)
+            if grid is not None and desk_id in grid.desks:
+                grid.set_free(desk_id, status == "available")  # Desks without coordinates are never indexed
+
+    def floor_reset(self, floor):
+        with self._lock:
+            grid = self._floors.get(floor)
+            if grid is not None:
+                for desk_id in grid.desks:
+                    grid.set_free(desk_id, True)
+
+    def desks_loaded(self, floors):
+        self.invalidate()  # New desks, moved desks or new coordinates
+
+
+spatial_index = desk_hooks.register(SpatialIndex())
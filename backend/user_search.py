@@ -0,0 +1,129 @@
+""" Ranked, typo-tolerant username search backed by a trigram index.
+
+SQLite keeps an FTS5 `trigram` table (`users_fts`) over `users.username`;
+PostgreSQL uses a pg_trgm GIN index. Both are created by migration 7 and
+maintained by the database itself (triggers on SQLite), so every path that
+creates, renames, deletes or bulk-imports users keeps the index current.
+
+A query is split into its trigrams and matched with OR, so a username that
+shares most trigrams with a misspelt query still matches. The best
+candidates by trigram score are then joined to their desks in the same
+statement; exact substring matches always rank first.
+"""
+from sqlalchemy import Integer, case, column, exists, func, literal, literal_column, or_, select, table, text, union_all
+from models import Desk, User
+
+users_fts = table("users_fts", column("rowid", Integer), column("rank"))
+
+# -------------------- 🟢 INDEX DDL --------------------
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(username, content='users', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+        INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username);
+    END""",
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",  # Index the users that already exist
+)
+
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+)
+
+def create_search_index(conn):
+    """ Create the trigram index for the connection's dialect (other dialects fall back to ILIKE) """
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(conn.dialect.name, ())
+    for statement in ddl:
+        conn.execute(text(statement))
+
+# -------------------- 🔵 QUERIES --------------------
+
+def trigrams(query: str):
+    """ The distinct lowercase trigrams of `query`, in order """
+    query = query.lower()
+    return list(dict.fromkeys(query[i:i + 3] for i in range(len(query) - 2)))
+
+def _like_pattern(query: str):
+    return "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _quoted(term: str):
+    return '"' + term.replace('"', '""') + '"'
+
+def _candidates(dialect: str, query: str, limit: int):
+    """ (id, tier, score) rows for the best `limit` users; tier 0 contains `query`, lower score is better """
+    match = literal_column("users_fts").match
+    if dialect == "sqlite" and len(query) >= 3:
+        # A quoted phrase is a substring match under the trigram tokenizer; the OR of
+        # single trigrams (typo tolerant, but broad) only runs when that finds nothing
+        exact = (
+            select(users_fts.c.rowid.label("id"), literal(0).label("tier"), users_fts.c.rank.label("score"))
+            .where(match(_quoted(query)))
+            .order_by(users_fts.c.rank)
+            .limit(limit)
+            .cte("exact")
+        )
+        # An empty phrase matches nothing. It is chosen inside MATCH because FTS5
+        # runs its query before SQLite checks any other WHERE term
+        fuzzy_match = case((exists(select(exact.c.id)), '""'), else_=" OR ".join(map(_quoted, trigrams(query))))
+        fuzzy = (
+            select(users_fts.c.rowid, literal(1), users_fts.c.rank)
+            .where(match(fuzzy_match))
+            .order_by(users_fts.c.rank)
+            .limit(limit)
+        )
+        return union_all(select(exact.c.id, exact.c.tier, exact.c.score), select(fuzzy.subquery("fuzzy")))
+    if dialect == "sqlite":
+        # Too short for a trigram: case-insensitive prefix match, a range scan of ix_users_username_lower
+        prefix, lowered = query.lower(), func.lower(User.username)
+        return (
+            select(User.id, literal(0).label("tier"), literal(0.0).label("score"))
+            .where(lowered >= prefix, lowered < prefix + "\U0010ffff")
+            .order_by(lowered)
+            .limit(limit)
+        )
+
+    pattern = _like_pattern(query)
+    contains = User.username.ilike(pattern, escape="\\")
+    if dialect == "postgresql":
+        similarity = func.similarity(User.username, query)
+        tier = case((contains, 0), else_=1)
+        return (
+            select(User.id, tier.label("tier"), (-similarity).label("score"))
+            .where(or_(User.username.op("%")(query), contains))
+            .order_by(tier, similarity.desc())
+            .limit(limit)
+        )
+    return select(User.id, literal(0).label("tier"), literal(0.0).label("score")).where(contains).limit(limit)
+
+def search_statement(dialect: str, query: str, limit: int):
+    """ One statement returning (id, username, tier, score, desk_id, floor) for the top users matching `query` """
+    candidates = _candidates(dialect, query, limit).cte("candidates")
+    return (
+        select(User.id, User.username, candidates.c.tier, candidates.c.score, Desk.desk_id, Desk.floor)
+        .join_from(candidates, User, User.id == candidates.c.id)
+        .outerjoin(Desk, Desk.user_id == User.id)
+        .order_by(candidates.c.tier, candidates.c.score, User.username, Desk.desk_id)
+    )
+
+def top_matches(rows, limit: int):
+    """ Collapse joined rows into at most `limit` users, one entry per desk held (desk fields null when none) """
+    matches, users = [], set()
+    for user_id, username, _, _, desk_id, floor in rows:
+        if user_id not in users:
+            if len(users) == limit:
+                break
+            users.add(user_id)
+        matches.append({"username": username, "desk_id": desk_id, "floor": floor})
+    return matches
+
+def search_users(db, query: str, limit: int = 10):
+    """ Top `limit` users matching `query` with their desks, best first """
+    rows = db.execute(search_statement(db.get_bind().dialect.name, query, limit))
+    return top_matches(rows, limit)